@@ -0,0 +1,52 @@
+"""
+Benchmark: time to split a large SQL script into statements with sqlparse.split
+and sql.parse.split_statements (used by %sql before running each statement)
+
+    python benchmarks/split_statements.py
+"""
+import random
+import timeit
+
+import sqlparse
+
+from sql.parse import split_statements
+
+
+def make_script(n_rows):
+    random.seed(0)
+    statements = [
+        "-- generated script",
+        'DROP TABLE IF EXISTS "numbers";',
+        'CREATE TABLE "numbers" (id INT, x DOUBLE PRECISION, label VARCHAR);',
+    ]
+
+    for idx in range(n_rows):
+        statements.append(
+            f"INSERT INTO \"numbers\" VALUES ({idx}, {random.random()}, 'row; {idx}');"
+        )
+
+    statements.append(
+        "SELECT CASE WHEN x > 0.5 THEN 'high' ELSE 'low' END AS bucket, COUNT(*) "
+        'FROM "numbers" GROUP BY bucket;'
+    )
+
+    return "\n".join(statements)
+
+
+def main():
+    for n_rows in (1_000, 10_000, 50_000):
+        script = make_script(n_rows)
+        assert split_statements(script) == sqlparse.split(script)
+
+        fast = min(timeit.repeat(lambda: split_statements(script), number=1, repeat=3))
+        slow = min(timeit.repeat(lambda: sqlparse.split(script), number=1, repeat=3))
+
+        print(
+            f"{n_rows:>6} statements ({len(script) / 1e6:.1f} MB): "
+            f"sqlparse.split {slow:.3f}s, split_statements {fast:.3f}s "
+            f"({slow / fast:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
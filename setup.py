@@ -42,6 +42,8 @@ DEV = [
     "duckdb==0.7.1",
     "duckdb-engine",
     "pyodbc",
+    # Arrow-based fetching and exporting (sql.adapters, sql.export)
+    "pyarrow",
     # sql.plot module tests
     "matplotlib",
     "black",
@@ -0,0 +1,186 @@
+"""
+Native result adapters. Each adapter knows how to convert the results of a query
+into pandas/polars data frames, Arrow tables, and rows as fast as the driver allows
+(e.g., DuckDB can return a pandas data frame directly). Adapters are registered by
+dialect/driver name; if there isn't one for the current connection, we use
+``ResultAdapter``, which fetches rows via the DB-API methods.
+
+To add support for a new driver::
+
+    from sql.adapters import ResultAdapter, register_adapter
+
+    @register_adapter("mydialect")
+    class MyAdapter(ResultAdapter):
+        def to_arrow_batches(self, results, batch_size=None):
+            ...
+"""
+from sql import arrow
+from sql.parse import is_query
+
+# maps dialect/driver names (as reported by SQLAlchemy) and DB-API modules
+# (e.g., "duckdb") to adapter instances
+_ADAPTERS = {}
+
+
+def register_adapter(*names):
+    """Register a ``ResultAdapter`` subclass for the given dialect/driver names"""
+
+    def decorator(cls):
+        adapter = cls()
+
+        for name in names:
+            _ADAPTERS[name] = adapter
+
+        return cls
+
+    return decorator
+
+
+def get_adapter(dialect=None, driver=None, results=None):
+    """Returns the adapter for the given dialect/driver names, if there isn't any,
+    the adapter is looked up using the module that implements the DB-API cursor in
+    ``results``. Falls back to ``ResultAdapter``
+    """
+    names = [dialect, driver]
+
+    if results is not None:
+        cursor = arrow.get_dbapi_cursor(results)
+        names.append(_module_name(cursor))
+
+    for name in names:
+        if name in _ADAPTERS:
+            return _ADAPTERS[name]
+
+    return _DEFAULT_ADAPTER
+
+
+def _module_name(obj):
+    return type(obj).__module__.split(".")[0]
+
+
+class ResultAdapter:
+    """Default adapter, fetches rows using the DB-API methods
+
+    Subclasses should override the methods that the driver can implement faster.
+    All methods (except ``execute``) receive the results of a query (a SQLAlchemy
+    result or a DB-API cursor) and the maximum number of rows to fetch (``limit``).
+    The ``to_*`` methods return None if the driver doesn't support the operation,
+    in such case, no rows must be fetched. Overriding ``to_arrow_batches`` is
+    enough to fetch data frames in Arrow format and to stream exports
+    """
+
+    def execute(self, conn, statement):
+        """
+        Execute a statement using the driver's native API, only called when the
+        results are converted to a data frame. Returns None if not supported
+        (in such case, we execute the statement via SQLAlchemy)
+        """
+        return None
+
+    def fetchmany(self, results, size):
+        """Fetch the next ``size`` rows as tuples"""
+        return results.fetchmany(size)
+
+    def fetchall(self, results):
+        """Fetch all the remaining rows as tuples"""
+        return results.fetchall()
+
+    def to_arrow_batches(self, results, batch_size=None):
+        """
+        Returns an iterable with the remaining rows as ``pyarrow.RecordBatch``
+        objects (e.g., a ``pyarrow.RecordBatchReader``), batches are fetched from
+        the database as the iterable is consumed
+        """
+        if isinstance(results, arrow.ArrowResult):
+            return results.fetch_arrow_batches(batch_size)
+
+        return None
+
+    def to_arrow(self, results, limit=None):
+        """Fetch the remaining rows as a ``pyarrow.Table``"""
+        if arrow.pa is None:
+            return None
+
+        batches = self.to_arrow_batches(results)
+        return None if batches is None else arrow.read_batches(batches, limit=limit)
+
+    def to_pandas(self, results, limit=None):
+        """Fetch the remaining rows as a ``pandas.DataFrame``"""
+        table = self.to_arrow(results, limit=limit)
+        return None if table is None else table.to_pandas()
+
+    def to_polars(self, results, limit=None, **polars_dataframe_kwargs):
+        """Fetch the remaining rows as a ``polars.DataFrame``"""
+        table = self.to_arrow(results, limit=limit)
+
+        if table is None:
+            return None
+
+        import polars as pl
+
+        return pl.DataFrame(table, **polars_dataframe_kwargs)
+
+
+_DEFAULT_ADAPTER = ResultAdapter()
+
+
+@register_adapter("duckdb", "duckdb_engine")
+class DuckDBAdapter(ResultAdapter):
+    """Uses DuckDB's native methods (``.df()``, ``.pl()``, ``.fetch_record_batch()``)"""
+
+    def to_arrow_batches(self, results, batch_size=None):
+        cursor = arrow.get_dbapi_cursor(results)
+
+        if batch_size is None:
+            return cursor.fetch_record_batch()
+
+        return cursor.fetch_record_batch(batch_size)
+
+    def to_pandas(self, results, limit=None):
+        if limit is not None:
+            return super().to_pandas(results, limit=limit)
+
+        return arrow.get_dbapi_cursor(results).df()
+
+    def to_polars(self, results, limit=None, **polars_dataframe_kwargs):
+        if limit is not None or polars_dataframe_kwargs:
+            return super().to_polars(results, limit=limit, **polars_dataframe_kwargs)
+
+        return arrow.get_dbapi_cursor(results).pl()
+
+
+@register_adapter("adbc_driver_manager")
+class ADBCAdapter(ResultAdapter):
+    """Arrow Database Connectivity (ADBC) drivers return Arrow natively"""
+
+    def to_arrow_batches(self, results, batch_size=None):
+        return arrow.get_dbapi_cursor(results).fetch_record_batch()
+
+
+@register_adapter("snowflake")
+class SnowflakeAdapter(ResultAdapter):
+    """Uses the Snowflake connector's Arrow batches"""
+
+    def to_arrow_batches(self, results, batch_size=None):
+        return arrow.get_dbapi_cursor(results).fetch_arrow_batches()
+
+    def to_pandas(self, results, limit=None):
+        if limit is not None:
+            return super().to_pandas(results, limit=limit)
+
+        return arrow.get_dbapi_cursor(results).fetch_pandas_all()
+
+
+@register_adapter("clickhousedb")
+class ClickHouseAdapter(ResultAdapter):
+    """
+    clickhouse-connect's DB-API cursor returns rows, so we execute the query with
+    the client's native columnar (Arrow) output instead
+    """
+
+    def execute(self, conn, statement):
+        if arrow.pa is None or not is_query(statement):
+            return None
+
+        client = conn.session.connection.dbapi_connection.client
+        return arrow.ArrowResult(client.query_arrow(str(statement)))
@@ -0,0 +1,132 @@
+"""
+Approximate statistics for large tables (``%sqlplot boxplot --approx`` and
+``%sqlcmd profile --approx``): use the sketches each database provides
+(T-Digest/KLL for percentiles, HyperLogLog for distinct counts) and, if it has
+none, compute the statistics on a sample of the table (``TABLESAMPLE``)
+"""
+import math
+
+# percentage of the table to sample when the database doesn't have approximate
+# functions
+SAMPLE_PERCENT = 1
+
+# confidence of the error bounds of the statistics computed on a sample
+CONFIDENCE = 0.95
+
+# SQL expressions to compute approximate percentiles and distinct counts ({pct}
+# is a fraction and {permille} the same value in thousandths). Databases without
+# functions compute the statistics on a sample (TABLESAMPLE BERNOULLI), None means
+# they don't support sampling either
+_FUNCTIONS = {
+    "duckdb": {
+        "quantile": "approx_quantile({column}, {pct})",
+        "count_distinct": "approx_count_distinct({column})",
+    },
+    "snowflake": {
+        "quantile": "APPROX_PERCENTILE({column}, {pct})",
+        "count_distinct": "APPROX_COUNT_DISTINCT({column})",
+    },
+    "bigquery": {
+        "quantile": "APPROX_QUANTILES({column}, 1000)[OFFSET({permille})]",
+        "count_distinct": "APPROX_COUNT_DISTINCT({column})",
+    },
+    "trino": {
+        "quantile": "approx_percentile({column}, {pct})",
+        "count_distinct": "approx_distinct({column})",
+    },
+    "presto": {
+        "quantile": "approx_percentile({column}, {pct})",
+        "count_distinct": "approx_distinct({column})",
+    },
+    "redshift": {
+        "quantile": (
+            "APPROXIMATE PERCENTILE_DISC({pct}) WITHIN GROUP (ORDER BY {column})"
+        ),
+        "count_distinct": "APPROXIMATE COUNT(DISTINCT {column})",
+    },
+    "clickhouse": {
+        "quantile": "quantile({pct})({column})",
+        "count_distinct": "uniq({column})",
+    },
+    "mssql": {
+        "quantile": "APPROX_PERCENTILE_DISC({pct}) WITHIN GROUP (ORDER BY {column})",
+        "count_distinct": "APPROX_COUNT_DISTINCT({column})",
+    },
+    "oracle": {
+        "quantile": "APPROX_PERCENTILE({pct}) WITHIN GROUP (ORDER BY {column})",
+        "count_distinct": "APPROX_COUNT_DISTINCT({column})",
+    },
+    "mysql": None,
+    "sqlite": None,
+}
+
+# descriptions of the error of the approximate statistics
+QUANTILE_ERROR = "computed with a sketch, typically within 1% of the rank"
+
+COUNT_DISTINCT_ERROR = "computed with HyperLogLog, typically within 2%"
+
+EXACT = "computed exactly, the database doesn't support approximate functions"
+
+EXACT_SMALL = "computed exactly, the sample is empty (the table is small)"
+
+
+def _get_function(dialect, name):
+    return (_FUNCTIONS.get(dialect) or {}).get(name)
+
+
+def quantile(dialect, column, pct):
+    """
+    Returns the SQL expression to compute an approximate percentile (``pct`` is
+    a fraction) of ``column``, or None if the database doesn't have one
+    """
+    template = _get_function(dialect, "quantile")
+
+    if template is None:
+        return None
+
+    return template.format(column=column, pct=float(pct), permille=round(pct * 1000))
+
+
+def count_distinct(dialect, column):
+    """
+    Returns the SQL expression to compute the approximate number of distinct
+    values of ``column``, or None if the database doesn't have one
+    """
+    template = _get_function(dialect, "count_distinct")
+
+    if template is None:
+        return None
+
+    return template.format(column=column)
+
+
+def tablesample(dialect):
+    """
+    Returns the clause to sample ``SAMPLE_PERCENT`` of a table (added after its
+    name), or None if the database doesn't support sampling
+    """
+    if dialect in _FUNCTIONS and _FUNCTIONS[dialect] is None:
+        return None
+
+    return f"TABLESAMPLE BERNOULLI ({SAMPLE_PERCENT})"
+
+
+def rank_error(sample_size, confidence=CONFIDENCE):
+    """
+    Maximum error in the rank (as a fraction) of the percentiles computed from
+    ``sample_size`` randomly sampled rows, with probability ``confidence``
+    (Dvoretzky-Kiefer-Wolfowitz inequality)
+    """
+    if not sample_size:
+        return 1.0
+
+    return math.sqrt(math.log(2 / (1 - confidence)) / (2 * sample_size))
+
+
+def describe_sample(sample_size, confidence=CONFIDENCE):
+    """Describe the error of the percentiles computed on a sample"""
+    return (
+        f"computed on a {SAMPLE_PERCENT}% sample ({sample_size:,} rows), within "
+        f"{rank_error(sample_size, confidence):.1%} of the rank with "
+        f"{confidence:.0%} confidence"
+    )
@@ -0,0 +1,101 @@
+"""
+Helpers to work with query results in Apache Arrow format. Some drivers (e.g.,
+DuckDB, ADBC, Snowflake) can return results as Arrow record batches, converting them
+to a pandas/polars data frame is much faster than building it from a list of Python
+tuples since we skip creating a Python object for each value
+"""
+import sqlalchemy
+
+try:
+    import pyarrow as pa
+except ModuleNotFoundError:
+    pa = None
+
+
+def get_dbapi_cursor(results):
+    """Returns the DB-API cursor from a SQLAlchemy result (or the passed object
+    if it's already a DB-API cursor)
+    """
+    if isinstance(results, sqlalchemy.engine.CursorResult):
+        return results.cursor
+
+    return results
+
+
+def iter_batches(batches, limit=None):
+    """Yield the ``pyarrow.RecordBatch``/``pyarrow.Table`` objects in ``batches``
+    until ``limit`` rows are reached (the last one is sliced if needed). Batches are
+    consumed lazily so only one of them is in memory at any given time
+    """
+    n_rows = 0
+
+    for batch in batches:
+        if limit is not None:
+            batch = batch.slice(0, limit - n_rows)
+
+        n_rows += batch.num_rows
+        yield batch
+
+        if limit is not None and n_rows >= limit:
+            break
+
+
+def read_batches(batches, limit=None):
+    """Concatenate an iterable of ``pyarrow.RecordBatch``/``pyarrow.Table`` objects
+
+    Parameters
+    ----------
+    batches
+        Iterable of ``pyarrow.RecordBatch`` or ``pyarrow.Table`` (e.g., a
+        ``pyarrow.RecordBatchReader``)
+
+    limit : int, default None
+        Maximum number of rows to read, once reached, the remaining batches are not
+        consumed
+
+    Returns
+    -------
+    pyarrow.Table or None
+        None if there are no batches and the schema is unknown
+    """
+    tables = [
+        pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+        for batch in iter_batches(batches, limit=limit)
+    ]
+
+    if tables:
+        return pa.concat_tables(tables)
+    elif getattr(batches, "schema", None) is not None:
+        return batches.schema.empty_table()
+    else:
+        return None
+
+
+class ArrowResult:
+    """
+    Wraps a ``pyarrow.Table`` so it can be consumed like a DB-API cursor (so it can
+    be passed to ``sql.run.ResultSet``)
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.description = [(name,) + (None,) * 6 for name in table.column_names]
+        self.rowcount = table.num_rows
+        self._pos = 0
+
+    def fetchmany(self, size):
+        batch = self.table.slice(self._pos, size)
+        self._pos += batch.num_rows
+        columns = [column.to_pylist() for column in batch.columns]
+        return list(zip(*columns))
+
+    def fetchall(self):
+        return self.fetchmany(self.table.num_rows)
+
+    def fetch_arrow_batches(self, batch_size=None):
+        """Returns the remaining rows as a ``pyarrow.RecordBatchReader``"""
+        table = self.table.slice(self._pos)
+        self._pos = self.table.num_rows
+        return pa.RecordBatchReader.from_batches(
+            table.schema, table.to_batches(max_chunksize=batch_size)
+        )
@@ -0,0 +1,322 @@
+"""
+Opt-in cache for query results (``SqlMagic.result_cache``). Results are keyed on
+the connection and the SQL that's sent to the database (after transpiling and
+rendering the ``--with`` CTEs), so re-running a cell, a plot or a profile skips the
+query. Statements that modify the database (DML/DDL) discard the cached results
+of the connection they run on
+"""
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from ploomber_core.dependencies import check_installed
+
+from sql.parse import is_query
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa = None
+    pq = None
+
+# number of rows used to estimate the size of the cached results
+_SAMPLE_SIZE = 100
+
+
+class CachedResult:
+    """
+    Cached rows that can be consumed like a DB-API cursor (so they can be passed to
+    ``sql.run.ResultSet`` or returned by ``Connection.execute``)
+    """
+
+    def __init__(self, keys, rows):
+        self._keys = list(keys)
+        self.rows = rows
+        self.description = [(name,) + (None,) * 6 for name in self._keys]
+        self.rowcount = len(rows)
+        self._pos = 0
+
+    def keys(self):
+        return self._keys
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size):
+        rows = self.rows[self._pos : self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows) - self._pos)
+
+    def close(self):
+        self._pos = len(self.rows)
+
+
+class _Entry:
+    def __init__(self, keys, rows, nbytes, created):
+        self.keys = keys
+        self.rows = rows
+        self.nbytes = nbytes
+        self.created = created
+
+
+def _estimate_size(rows):
+    """Estimate the memory used by a list of rows (in bytes)"""
+    if not rows:
+        return sys.getsizeof(rows)
+
+    sample = rows[:_SAMPLE_SIZE]
+    sample_size = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+    return sys.getsizeof(rows) + sample_size * len(rows) // len(sample)
+
+
+def _is_persistent(conn):
+    """True if the database outlives the connection (i.e., not in-memory/custom)"""
+    url = conn.url
+    return not isinstance(url, str) and url.database not in (None, "", ":memory:")
+
+
+def _connection_key(conn):
+    """
+    Identifies the database, connections to the same URL share the cached
+    results, except for in-memory databases (each connection has its own database)
+    and custom connections
+    """
+    if isinstance(conn.url, str):
+        return conn.url
+
+    if not _is_persistent(conn):
+        return f"{conn.url!r}@{id(conn)}"
+
+    return repr(conn.url)
+
+
+def _hash(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize(query):
+    """Normalize a statement so trailing whitespace/semicolons don't matter"""
+    return str(query).strip().rstrip(";").rstrip()
+
+
+class ResultCache:
+    """LRU cache of query results with a size limit (in bytes) and a TTL
+
+    Parameters
+    ----------
+    enabled : bool, default False
+        Cache results
+
+    max_bytes : int, default 256 MB
+        Maximum (approximate) size of the results kept in memory, the least
+        recently used results are evicted first
+
+    ttl : int or float, default None
+        Seconds after which a result expires (None means they never expire)
+
+    directory : str, default None
+        Also store the results in this directory (as Parquet files, requires
+        pyarrow) so they survive kernel restarts
+    """
+
+    def __init__(
+        self, enabled=False, max_bytes=256 * 1024**2, ttl=None, directory=None
+    ):
+        self._entries = OrderedDict()
+        self._size = 0
+        self.configure(
+            enabled=enabled, max_bytes=max_bytes, ttl=ttl, directory=directory
+        )
+
+    def configure(self, enabled, max_bytes, ttl=None, directory=None):
+        if directory is not None:
+            check_installed(["pyarrow"], "SqlMagic.result_cache_dir")
+
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = None if directory is None else Path(directory)
+
+        if not enabled:
+            self.clear(disk=False)
+        else:
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Approximate size (in bytes) of the results kept in memory"""
+        return self._size
+
+    def _key(self, conn, query, autolimit):
+        return (_connection_key(conn), normalize(query), autolimit or None)
+
+    def _path(self, key):
+        conn_key, query, autolimit = key
+        return (
+            self.directory
+            / f"{_hash(conn_key)}-{_hash(f'{autolimit}:{query}')}.parquet"
+        )
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, conn, query, autolimit=None):
+        """Returns a ``CachedResult`` or None if the results aren't cached"""
+        if not self.enabled:
+            return None
+
+        key = self._key(conn, query, autolimit)
+        entry = self._entries.get(key)
+
+        if entry is not None and self._expired(entry.created):
+            self._remove(key)
+            entry = None
+
+        if entry is None and self.directory is not None and _is_persistent(conn):
+            entry = self._read(key)
+
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return CachedResult(entry.keys, entry.rows)
+
+    def put(self, conn, query, keys, rows, autolimit=None):
+        """Cache the results of ``query``, returns a ``CachedResult``"""
+        rows = list(rows)
+
+        if self.enabled:
+            key = self._key(conn, query, autolimit)
+            entry = _Entry(list(keys), rows, _estimate_size(rows), time.time())
+            self._add(key, entry)
+
+            if self.directory is not None and _is_persistent(conn):
+                self._write(key, entry)
+
+        return CachedResult(keys, rows)
+
+    def execute(self, conn, query, execute):
+        """
+        Return the cached results of ``query`` or call ``execute()`` (and cache
+        what it returns, if it's a query)
+        """
+        if not self.enabled or not is_query(query):
+            return execute()
+
+        cached = self.get(conn, query)
+
+        if cached is not None:
+            return cached
+
+        result = execute()
+
+        # e.g., WITH ... INSERT (PostgreSQL)
+        if not getattr(result, "returns_rows", True):
+            conn._data_changed()
+            return result
+
+        if hasattr(result, "keys"):
+            keys = list(result.keys())
+        else:
+            keys = [column[0] for column in result.description or []]
+
+        return self.put(conn, query, keys, result.fetchall())
+
+    def invalidate(self, conn):
+        """Discard the cached results of the connection"""
+        conn_key = _connection_key(conn)
+
+        for key in [key for key in self._entries if key[0] == conn_key]:
+            self._remove(key)
+
+        if self.directory is not None and self.directory.is_dir():
+            for path in self.directory.glob(f"{_hash(conn_key)}-*.parquet"):
+                path.unlink(missing_ok=True)
+
+    def clear(self, disk=True):
+        """Discard all the cached results (including the ones stored on disk)"""
+        self._entries.clear()
+        self._size = 0
+
+        if disk and self.directory is not None and self.directory.is_dir():
+            for path in self.directory.glob("*.parquet"):
+                path.unlink(missing_ok=True)
+
+    def _add(self, key, entry):
+        if key in self._entries:
+            self._remove(key)
+
+        # don't evict everything else to cache a result that doesn't fit
+        if entry.nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._size += entry.nbytes
+        self._evict()
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key).nbytes
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _write(self, key, entry):
+        columns = list(zip(*entry.rows)) if entry.rows else [()] * len(entry.keys)
+
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+
+        try:
+            table = pa.Table.from_arrays(
+                [pa.array(column) for column in columns], names=entry.keys
+            )
+            self.directory.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, tmp)
+        except (pa.ArrowException, TypeError, ValueError):
+            # values that can't be stored in Arrow format are only cached in memory
+            tmp.unlink(missing_ok=True)
+            return
+
+        os.replace(tmp, path)
+
+    def _read(self, key):
+        path = self._path(key)
+
+        if not path.exists():
+            return None
+
+        created = path.stat().st_mtime
+
+        if self._expired(created):
+            path.unlink(missing_ok=True)
+            return None
+
+        try:
+            table = pq.read_table(path)
+        except pa.ArrowException:
+            path.unlink(missing_ok=True)
+            return None
+
+        rows = list(zip(*(column.to_pylist() for column in table.columns)))
+        entry = _Entry(table.column_names, rows, _estimate_size(rows), created)
+        self._add(key, entry)
+        return entry
+
+
+# the cache used by %sql, %sqlplot and %sqlcmd (configured by SqlMagic)
+result_cache = ResultCache()
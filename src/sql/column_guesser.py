@@ -3,15 +3,92 @@ Splits tabular data in the form of a list of rows into columns;
 makes guesses about the role of each column for plotting purposes
 (X values, Y values, and text labels).
 """
+from collections.abc import MutableSequence
 
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
 
-class Column(list):
-    "Store a column of tabular data; record its name and whether it is numeric"
-    is_quantity = True
-    name = ""
 
-    def __init__(self, *arg, **kwarg):
-        pass
+class Column(MutableSequence):
+    """
+    Store a column of tabular data; record its name and whether it is numeric.
+    The values are stored as they're passed (e.g., the NumPy array of a column
+    when using columnar storage) so they're not copied; it has the same methods
+    as a list, and they're converted to one when modifying the column
+    """
+
+    def __init__(self, values=(), name="", is_quantity=True):
+        self.values = values
+        self.name = name
+        self.is_quantity = is_quantity
+
+    def tolist(self):
+        """Returns the values as a list (nulls are None)"""
+        if hasattr(self.values, "tolist"):
+            return self.values.tolist()
+
+        return list(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _as_list(self):
+        if not isinstance(self.values, list):
+            self.values = self.tolist()
+
+        return self.values
+
+    def __getitem__(self, key):
+        value = self.values[key]
+
+        if hasattr(value, "tolist"):
+            return value.tolist()
+
+        return list(value) if isinstance(key, slice) else value
+
+    def __setitem__(self, key, value):
+        self._as_list()[key] = value
+
+    def __delitem__(self, key):
+        del self._as_list()[key]
+
+    def insert(self, index, value):
+        self._as_list().insert(index, value)
+
+    def sort(self, *, key=None, reverse=False):
+        self._as_list().sort(key=key, reverse=reverse)
+
+    def copy(self):
+        return self.tolist()
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __add__(self, other):
+        return self.tolist() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.tolist()
+
+    def __eq__(self, other):
+        if isinstance(other, (Column, list, tuple)):
+            return self.tolist() == list(other)
+
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.values
+
+        # nulls in a numeric column are converted to NaN (as NumPy does for None)
+        if np.ma.getmask(values) is not np.ma.nomask:
+            values = values.astype(float).filled(np.nan)
+
+        return np.asarray(values, dtype=dtype)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.tolist()!r}, name={self.name!r})"
 
 
 def is_quantity(val):
@@ -22,6 +99,22 @@ def is_quantity(val):
     return hasattr(val, "__sub__")
 
 
+def is_quantity_column(values):
+    """Are all the (non-null) ``values`` quantities? See ``is_quantity``
+
+    For NumPy arrays the dtype is used, otherwise, we check each distinct type
+    (instead of each value)
+    """
+    dtype = getattr(values, "dtype", None)
+
+    if dtype is not None and dtype.kind in "biufcmM":
+        return True
+
+    types = set(map(type, values))
+    types.discard(type(None))
+    return all(hasattr(type_, "__sub__") for type_ in types)
+
+
 class ColumnGuesserMixin(object):
     """
     plot: [x, y, y...], y
@@ -31,17 +124,23 @@ class ColumnGuesserMixin(object):
     def __init__(self):
         self.keys = None
 
+    def _get_column_values(self):
+        """Returns a sequence with the values in each column"""
+        rows = list(self)
+
+        if not rows:
+            return [() for _ in self.keys]
+
+        return list(zip(*rows))
+
     def _build_columns(self):
-        self.columns = [Column() for col in self.keys]
-        for row in self:
-            for col_idx, col_val in enumerate(row):
-                col = self.columns[col_idx]
-                col.append(col_val)
-                if (col_val is not None) and (not is_quantity(col_val)):
-                    col.is_quantity = False
+        self.columns = []
 
-        for idx, key_name in enumerate(self.keys):
-            self.columns[idx].name = key_name
+        for key_name, values in zip(self.keys, self._get_column_values()):
+            col = Column(
+                values, name=key_name, is_quantity=is_quantity_column(values)
+            )
+            self.columns.append(col)
 
         self.x = Column()
         self.ys = []
@@ -59,12 +158,8 @@ class ColumnGuesserMixin(object):
                 return True
 
     def _get_xlabel(self, xlabel_sep=" "):
-        self.xlabels = []
-        if self.columns:
-            for row_idx in range(len(self.columns[0])):
-                self.xlabels.append(
-                    xlabel_sep.join(str(c[row_idx]) for c in self.columns)
-                )
+        labels = [map(str, c) for c in self.columns]
+        self.xlabels = [xlabel_sep.join(row) for row in zip(*labels)]
         self.xlabel = ", ".join(c.name for c in self.columns)
 
     def _guess_columns(self):
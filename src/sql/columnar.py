@@ -0,0 +1,162 @@
+"""
+Columnar storage for query results. Rows are stored as one NumPy array per column
+(ints, floats and booleans use typed arrays plus a null mask, other values use
+object arrays) instead of a list of tuples, so each numeric value takes 8 bytes
+and accessing a column doesn't require iterating over the rows
+"""
+from collections.abc import Sequence
+
+from ploomber_core.dependencies import check_installed
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+# Python type -> NumPy type for columns stored in typed arrays
+_TYPED = {int: "int64", float: "float64", bool: "bool"}
+
+# number of rows to convert at once when iterating
+_ITER_BATCH_SIZE = 4096
+
+
+def _to_column(values):
+    """Convert a sequence of values to a (values, mask) tuple, mask is None if the
+    values are stored in an object array (None is stored as is)
+    """
+    mask = np.fromiter((value is None for value in values), bool, len(values))
+    types = {type(value) for value in values if value is not None}
+
+    if len(types) == 1:
+        (type_,) = types
+
+        if type_ in _TYPED:
+            filled = [type_() if value is None else value for value in values]
+
+            try:
+                return np.array(filled, dtype=_TYPED[type_]), mask
+            except OverflowError:
+                pass
+
+    column = np.empty(len(values), dtype=object)
+
+    for idx, value in enumerate(values):
+        column[idx] = value
+
+    return column, None
+
+
+def _concatenate(columns):
+    """Concatenate a list of (values, mask) tuples"""
+    dtypes = {values.dtype for values, _ in columns}
+
+    if len(dtypes) == 1 and all(mask is not None for _, mask in columns):
+        values = np.concatenate([values for values, _ in columns])
+        return values, np.concatenate([mask for _, mask in columns])
+
+    # mixed types: store everything in an object array
+    return np.concatenate([_to_object(values, mask) for values, mask in columns]), None
+
+
+def _to_object(values, mask):
+    if mask is None:
+        return values
+
+    column = np.array(values.tolist(), dtype=object)
+    column[mask] = None
+    return column
+
+
+class ColumnarRows(Sequence):
+    """
+    A sequence of rows (tuples) stored by column, it supports the list operations
+    that ``ResultSet`` uses (``len``, indexing, slicing, ``extend``)
+
+    Parameters
+    ----------
+    n_columns : int
+        Number of columns
+    """
+
+    def __init__(self, n_columns):
+        check_installed(["numpy"], "columnar_storage")
+        self._n_columns = n_columns
+        self._len = 0
+        # list of (values, mask) tuples for each column, batches are concatenated
+        # when the data is read
+        self._chunks = [[] for _ in range(n_columns)]
+
+    def extend(self, rows):
+        rows = list(rows)
+
+        if not rows:
+            return
+
+        for chunks, values in zip(self._chunks, zip(*rows)):
+            chunks.append(_to_column(values))
+
+        self._len += len(rows)
+
+    def _get_column(self, idx):
+        chunks = self._chunks[idx]
+
+        if not chunks:
+            return np.empty(0, dtype=object), None
+
+        if len(chunks) > 1:
+            chunks[:] = [_concatenate(chunks)]
+
+        return chunks[0]
+
+    def column(self, idx):
+        """
+        Returns the values in the ``idx`` column as a ``numpy.ma.MaskedArray``
+        (nulls are masked), no data is copied
+        """
+        values, mask = self._get_column(idx)
+        return np.ma.MaskedArray(values, mask=np.ma.nomask if mask is None else mask)
+
+    def column_values(self, idx):
+        """Returns the values in the ``idx`` column as a list (nulls are None)"""
+        return self.column(idx).tolist()
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            columns = [self.column(idx)[key].tolist() for idx in range(self._n_columns)]
+            return list(zip(*columns))
+
+        if key < 0:
+            key += self._len
+
+        if not 0 <= key < self._len:
+            raise IndexError("ColumnarRows index out of range")
+
+        return tuple(self._get_value(idx, key) for idx in range(self._n_columns))
+
+    def _get_value(self, column_idx, row_idx):
+        values, mask = self._get_column(column_idx)
+
+        if mask is not None and mask[row_idx]:
+            return None
+
+        value = values[row_idx]
+        return value.item() if mask is not None else value
+
+    def __iter__(self):
+        for start in range(0, self._len, _ITER_BATCH_SIZE):
+            yield from self[start : start + _ITER_BATCH_SIZE]
+
+    def __eq__(self, other):
+        if isinstance(other, (ColumnarRows, list, tuple)):
+            return len(self) == len(other) and all(
+                row == other_row for row, other_row in zip(self, other)
+            )
+
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
@@ -72,6 +72,14 @@ class SQLCommand:
             final = store.render(self.parsed["sql"], with_=self.args.with_)
             self.parsed["sql"] = str(final)
 
+    def render_with(self, conn):
+        """
+        Render the --with snippets again now that we know the connection (so they
+        can be read from temporary tables, see SQLStore.materialize)
+        """
+        final = store.render(self.sql_original, with_=self.args.with_, conn=conn)
+        self.parsed["sql"] = str(final)
+
     @property
     def sql(self):
         """
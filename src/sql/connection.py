@@ -1,4 +1,7 @@
+import json
 import os
+import time
+import warnings
 from difflib import get_close_matches
 
 import sqlalchemy
@@ -9,6 +12,8 @@ import difflib
 import sqlglot
 
 from sql.store import store
+from sql.cache import result_cache, _is_persistent
+from sql.parse import is_query
 from sql.telemetry import telemetry
 from sql import exceptions
 
@@ -50,6 +55,9 @@ MISSING_PACKAGE_LIST_EXCEPT_MATCHERS = {
 
 DIALECT_NAME_SQLALCHEMY_TO_SQLGLOT_MAPPING = {"postgresql": "postgres", "mssql": "tsql"}
 
+# arguments passed to sqlalchemy.create_engine to configure the connection pool
+POOL_OPTIONS = ("pool_size", "pool_pre_ping", "pool_recycle")
+
 
 def extract_module_name_from_ModuleNotFoundError(e):
     return e.name
@@ -130,6 +138,10 @@ class Connection:
         self.dialect = self.url.get_dialect()
         self.engine = engine
         self.session = engine.connect()
+        self._connected_at = time.monotonic()
+        # identifies engines created by from_connect_str so aliases to the same
+        # database share them
+        self._engine_key = None
 
         if IS_SQLALCHEMY_ONE:
             self.metadata = sqlalchemy.MetaData(bind=engine)
@@ -145,6 +157,11 @@ class Connection:
 
         self.connect_args = None
         self.alias = alias
+        self._pending_result_set = None
+        # temporary tables with the results of saved snippets: {key: (table,
+        # data version)}, see SQLStore.materialize
+        self._materialized = {}
+        self._data_version = 0
         Connection.current = self
 
     @classmethod
@@ -219,24 +236,70 @@ class Connection:
             f"{e}.{cls._suggest_fix(env_var=False, connect_str=connect_str)}"
         )
 
+    @staticmethod
+    def _get_engine_key(connect_str, connect_args, pool_options):
+        """
+        Returns a key to share the engine with other connections to the same
+        database, or None if it can't be shared (e.g., in-memory databases, since
+        each engine has its own database)
+        """
+        try:
+            url = sqlalchemy.engine.make_url(connect_str)
+            key = json.dumps([connect_args, pool_options], sort_keys=True)
+        except Exception:
+            return None
+
+        if url.database in (None, "", ":memory:"):
+            return None
+
+        return (url.render_as_string(hide_password=False), key)
+
     @classmethod
     def from_connect_str(
-        cls, connect_str=None, connect_args=None, creator=None, alias=None
+        cls,
+        connect_str=None,
+        connect_args=None,
+        creator=None,
+        alias=None,
+        pool_options=None,
     ):
-        """Creates a new connection from a connection string"""
+        """Creates a new connection from a connection string
+
+        Parameters
+        ----------
+        pool_options : dict, default None
+            Arguments to configure the connection pool (``pool_size``,
+            ``pool_pre_ping`` and ``pool_recycle``)
+        """
         connect_args = connect_args or {}
+        pool_options = pool_options or {}
+        engine_key = (
+            None
+            if creator
+            else cls._get_engine_key(connect_str, connect_args, pool_options)
+        )
+        existing = [
+            conn
+            for conn in cls.connections.values()
+            if engine_key is not None
+            and getattr(conn, "_engine_key", None) == engine_key
+        ]
 
         try:
-            if creator:
+            if existing:
+                engine = existing[0].engine
+            elif creator:
                 engine = sqlalchemy.create_engine(
                     connect_str,
                     connect_args=connect_args,
                     creator=creator,
+                    **pool_options,
                 )
             else:
                 engine = sqlalchemy.create_engine(
                     connect_str,
                     connect_args=connect_args,
+                    **pool_options,
                 )
         except (ModuleNotFoundError, NoSuchModuleError) as e:
             suggestion_str = get_missing_package_suggestion_str(e)
@@ -254,11 +317,20 @@ class Connection:
 
         connection = cls(engine, alias=alias)
         connection.connect_args = connect_args
+        connection._engine_key = engine_key
 
         return connection
 
     @classmethod
-    def set(cls, descriptor, displaycon, connect_args=None, creator=None, alias=None):
+    def set(
+        cls,
+        descriptor,
+        displaycon,
+        connect_args=None,
+        creator=None,
+        alias=None,
+        pool_options=None,
+    ):
         """
         Set the current database connection. This method is called from the magic to
         determine which connection to use (either use an existing one or open a new one)
@@ -289,6 +361,7 @@ class Connection:
                     connect_args=connect_args,
                     creator=creator,
                     alias=alias,
+                    pool_options=pool_options,
                 )
 
         else:
@@ -302,6 +375,7 @@ class Connection:
                     connect_args=connect_args,
                     creator=creator,
                     alias=alias,
+                    pool_options=pool_options,
                 )
             else:
                 raise cls._error_no_connection()
@@ -505,7 +579,7 @@ class Connection:
             The key to use in with sql clause
         """
         if with_:
-            query = str(store.render(query, with_=with_))
+            query = str(store.render(query, with_=with_, conn=self))
 
         query = self._transpile_query(query)
 
@@ -516,12 +590,137 @@ class Connection:
 
         return query
 
+    def _set_pending_result_set(self, result_set):
+        """Keep track of a result set whose rows haven't been fetched completely"""
+        self._pending_result_set = result_set
+
+    def _detach_pending_result_set(self):
+        """
+        Stop fetching the rows of a lazily fetched result set (if any). Some
+        drivers (e.g., duckdb) discard the pending rows when executing a new query
+        in the same connection, so we close its cursor before running a new query.
+        Fetching the remaining rows instead could load millions of rows, so the
+        result set keeps the rows fetched so far and is marked as truncated
+        """
+        if self._pending_result_set is not None:
+            self._pending_result_set._detach()
+            self._pending_result_set = None
+
+    def _data_changed(self):
+        """
+        Called before running a statement that may modify the data, so cached
+        results and materialized snippets are discarded
+        """
+        self._data_version += 1
+        result_cache.invalidate(self)
+
+    def _reconnect(self):
+        """
+        Discard the database connection and get a new one from the pool (temporary
+        tables are lost)
+        """
+        self._detach_pending_result_set()
+
+        try:
+            self.session.invalidate()
+            self.session.close()
+        except Exception:
+            pass
+
+        self.session = self.engine.connect()
+        self._connected_at = time.monotonic()
+        self._materialized = {}
+
+    def _is_stale(self):
+        """
+        Checks if the connection should be replaced: it's older than the pool's
+        ``pool_recycle`` or, with ``pool_pre_ping``, the database doesn't respond
+        """
+        pool = self.engine.pool
+        recycle = getattr(pool, "_recycle", -1)
+
+        if recycle >= 0 and time.monotonic() - self._connected_at > recycle:
+            return True
+
+        if getattr(pool, "_pre_ping", False):
+            try:
+                return not self.engine.dialect.do_ping(
+                    self.session.connection.dbapi_connection
+                )
+            except Exception:
+                return True
+
+        return False
+
+    def _check_connection(self):
+        """
+        Called before running a cell, replaces the connection if the database
+        dropped it (or it's stale) and there is no transaction in progress. The
+        pool won't do it for us since we hold the same connection until it's closed
+        """
+        # in-memory databases are gone once we close the connection
+        if not _is_persistent(self):
+            return
+
+        autocommit = (
+            self.session.get_execution_options().get("isolation_level")
+            == "AUTOCOMMIT"
+        )
+
+        if self.session.invalidated or (
+            (autocommit or not self.session.in_transaction()) and self._is_stale()
+        ):
+            self._reconnect()
+
+    def _execute(self, statement):
+        """
+        Executes a statement, if the database dropped the connection, reconnects
+        and runs it again (unless it may have been committed before the
+        connection was lost or it's part of a transaction that was rolled back)
+        """
+        autocommit = (
+            self.session.get_execution_options().get("isolation_level")
+            == "AUTOCOMMIT"
+        )
+        in_transaction = not autocommit and self.session.in_transaction()
+
+        try:
+            return self.session.execute(statement)
+        except sqlalchemy.exc.DBAPIError as e:
+            if not e.connection_invalidated or (
+                autocommit and not is_query(str(statement))
+            ):
+                raise
+
+            if in_transaction:
+                # running only this statement would apply part of the transaction
+                warnings.warn(
+                    "The connection to the database was lost and the transaction "
+                    "in progress was rolled back, reconnecting. Run the "
+                    "transaction again"
+                )
+                self._reconnect()
+                raise
+
+        warnings.warn(
+            "The connection to the database was lost, reconnecting and running "
+            "the statement again"
+        )
+        self._reconnect()
+        return self.session.execute(statement)
+
     def execute(self, query, with_=None):
         """
-        Executes SQL query on a given connection
+        Executes SQL query on a given connection (the results of queries are
+        cached if ``SqlMagic.result_cache`` is enabled)
         """
         query = self._prepare_query(query, with_)
-        return self.session.execute(query)
+        self._detach_pending_result_set()
+
+        if not is_query(query):
+            self._data_changed()
+
+        return result_cache.execute(self, str(query), lambda: self._execute(query))
 
 
 class CustomSession(sqlalchemy.engine.base.Connection):
@@ -570,4 +769,15 @@ class CustomConnection(Connection):
 
         self.connect_args = None
         self.alias = alias
+        self._pending_result_set = None
+        # temporary tables with the results of saved snippets: {key: (table,
+        # data version)}, see SQLStore.materialize
+        self._materialized = {}
+        self._data_version = 0
         Connection.current = self
+
+    def _check_connection(self):
+        pass
+
+    def _execute(self, statement):
+        return self.session.execute(statement)
@@ -0,0 +1,247 @@
+"""
+Export query results to CSV, Parquet and Arrow IPC files. Rows are streamed from the
+database in batches and written as they arrive, so the memory usage doesn't depend
+on the size of the results
+"""
+import csv
+import os.path
+from pathlib import Path
+
+from sql import exceptions
+from sql import arrow
+
+_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+class ExportResultDescriptor:
+    """
+    Provides IPython Notebook-friendly output for the feedback after exporting
+    results
+    """
+
+    def __init__(self, file_path, format):
+        self.file_path = str(file_path)
+        self.format = format
+
+    def __repr__(self):
+        path = os.path.join(os.path.abspath("."), self.file_path)
+        return f"Exported results ({self.format}) to {path}"
+
+    def _repr_html_(self):
+        return '<a href="%s">Exported results (%s)</a>' % (
+            os.path.join(".", "files", self.file_path),
+            self.format,
+        )
+
+
+def infer_format(path):
+    """Infer the export format from the file extension"""
+    suffix = Path(path).suffix.lower()
+
+    if suffix not in _FORMATS:
+        raise exceptions.ValueError(
+            f"Cannot infer the export format from {str(path)!r}, "
+            f"expected one of the following extensions: {', '.join(_FORMATS)}"
+        )
+
+    return _FORMATS[suffix]
+
+
+def export(resultset, path, format=None, batch_size=None, **format_params):
+    """Write the results to a file, the remaining rows are streamed from the
+    database in batches and are not stored in the result set
+
+    Parameters
+    ----------
+    resultset : sql.run.ResultSet
+        Results to export
+
+    path : str or pathlib.Path
+        Output file
+
+    format : str, default None
+        "csv", "parquet" or "arrow" (Arrow IPC). If None, it's inferred from the
+        file extension
+
+    batch_size : int, default None
+        Number of rows to fetch at a time. Defaults to the ``fetch_batch_size``
+        option (or the driver's default batch size when fetching in Arrow format)
+
+    **format_params
+        Passed to ``csv.writer`` (``encoding`` sets the file encoding),
+        ``pyarrow.parquet.ParquetWriter`` or ``pyarrow.ipc.new_file``
+    """
+    format = format or infer_format(path)
+
+    if format not in set(_FORMATS.values()):
+        raise exceptions.ValueError(
+            f"Unknown export format {format!r}, expected one of: csv, parquet, arrow"
+        )
+
+    if not resultset.pretty:
+        raise exceptions.ValueError(
+            "Cannot export the results: the query didn't return any rows"
+        )
+
+    try:
+        if format == "csv":
+            encoding = format_params.pop("encoding", "utf-8")
+
+            with open(path, "w", newline="", encoding=encoding) as file:
+                write_csv(resultset, file, batch_size=batch_size, **format_params)
+        else:
+            write_arrow(
+                resultset, path, format, batch_size=batch_size, **format_params
+            )
+    except BaseException:
+        # don't leave a partially written file
+        Path(path).unlink(missing_ok=True)
+        raise
+
+    return ExportResultDescriptor(path, format)
+
+
+def write_csv(resultset, file, batch_size=None, **format_params):
+    """Write the results to a file-like object in CSV format"""
+    writer = csv.writer(file, **format_params)
+    writer.writerow(resultset.field_names)
+
+    for rows in resultset._iter_batches(batch_size or resultset._batch_size):
+        writer.writerows(rows)
+
+
+def write_arrow(resultset, path, format, batch_size=None, **format_params):
+    """Write the results to a Parquet or Arrow IPC file"""
+    if arrow.pa is None:
+        raise exceptions.MissingPackageError(
+            f"pyarrow is required to export results in {format} format: "
+            "pip install pyarrow"
+        )
+
+    batches = resultset._iter_arrow_batches(batch_size)
+
+    # the driver doesn't support Arrow, convert the rows
+    if batches is None:
+        batches = _rows_to_batches(
+            resultset._iter_batches(batch_size or resultset._batch_size),
+            names=resultset.field_names,
+        )
+
+    writer, schema = None, None
+
+    try:
+        for batch in batches:
+            if writer is None:
+                schema = batch.schema
+                writer = _new_writer(format, path, schema, **format_params)
+            elif batch.schema != schema:
+                # e.g., a column that only had NULLs in the previous batches
+                unified = arrow.pa.unify_schemas([schema, batch.schema])
+
+                if unified != schema:
+                    writer.close()
+                    writer = None
+                    writer = _rewrite(format, path, unified, **format_params)
+                    schema = unified
+
+                batch = _to_table(batch).cast(schema)
+
+            _write_batch(writer, batch)
+
+        # no rows, write an empty file
+        if writer is None:
+            schema = arrow.pa.schema(
+                [(name, arrow.pa.null()) for name in resultset.field_names]
+            )
+            writer = _new_writer(format, path, schema, **format_params)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _new_writer(format, path, schema, **format_params):
+    if format == "parquet":
+        from pyarrow import parquet
+
+        return parquet.ParquetWriter(path, schema, **format_params)
+    else:
+        from pyarrow import ipc
+
+        return ipc.new_file(path, schema, **format_params)
+
+
+def _read_batches(format, path):
+    """Yields the record batches in a Parquet or Arrow IPC file"""
+    with open(path, "rb") as file:
+        if format == "parquet":
+            from pyarrow import parquet
+
+            yield from parquet.ParquetFile(file).iter_batches()
+        else:
+            from pyarrow import ipc
+
+            reader = ipc.open_file(file)
+
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+def _rewrite(format, path, schema, **format_params):
+    """
+    Write the contents of the file again with a wider ``schema`` (the writer's
+    schema can't be changed), returns a writer to append the next batches
+    """
+    previous = Path(f"{path}.tmp")
+    os.replace(path, previous)
+    writer = _new_writer(format, path, schema, **format_params)
+
+    try:
+        for batch in _read_batches(format, previous):
+            _write_batch(writer, _to_table(batch).cast(schema))
+    except BaseException:
+        writer.close()
+        raise
+    finally:
+        previous.unlink(missing_ok=True)
+
+    return writer
+
+
+def _to_table(batch):
+    if isinstance(batch, arrow.pa.RecordBatch):
+        return arrow.pa.Table.from_batches([batch])
+
+    return batch
+
+
+def _write_batch(writer, batch):
+    writer.write_table(_to_table(batch))
+
+
+def _rows_to_batches(batches, names):
+    """Convert batches of rows (tuples) to ``pyarrow.RecordBatch`` objects, the
+    type of each column is inferred from the first batch where it has values
+    """
+    types = [None for _ in names]
+
+    for rows in batches:
+        columns = list(zip(*rows))
+        arrays = []
+
+        for i, column in enumerate(columns):
+            if types[i] is None or arrow.pa.types.is_null(types[i]):
+                array = arrow.pa.array(column)
+                types[i] = array.type
+            else:
+                array = arrow.pa.array(column, type=types[i])
+
+            arrays.append(array)
+
+        yield arrow.pa.RecordBatch.from_arrays(arrays, names=names)
@@ -4,6 +4,7 @@ from ploomber_core.exceptions import modify_exceptions
 from sql.connection import Connection
 from sql.telemetry import telemetry
 from sql import exceptions
+import sql.approx
 import sql.run
 import math
 from sql import util
@@ -130,14 +131,29 @@ class TableDescription(DatabaseInspection):
 
     Freq - Frequency of the top value
 
+    If ``approx=True``, Unique and the percentiles are computed with the
+    database's approximate functions (or the percentiles on a sample of the
+    table if it doesn't have them), and the report describes their error
     """
 
-    def __init__(self, table_name, schema=None) -> None:
+    def __init__(self, table_name, schema=None, approx=False) -> None:
         util.is_table_exists(table_name, schema)
 
         if schema:
             table_name = f"{schema}.{table_name}"
 
+        info = (
+            None
+            if Connection.is_custom_connection()
+            else Connection.current._get_curr_sqlalchemy_connection_info()
+        )
+        dialect = info["dialect"] if info else None
+
+        # approximate statistic -> description of its error
+        approx_notes = {}
+        # smallest sample used to compute the percentiles
+        sample_size = math.inf
+
         columns_query_result = sql.run.raw_run(
             Connection.current, f"SELECT * FROM {table_name} WHERE 1=0"
         )
@@ -192,19 +208,28 @@ class TableDescription(DatabaseInspection):
             except Exception:
                 pass
 
+            count_distinct = approx and sql.approx.count_distinct(dialect, column)
+
             try:
                 # get unique values
                 result_value_values = sql.run.raw_run(
                     Connection.current,
                     f"""
                     SELECT
-                    COUNT(DISTINCT {column}) AS unique_count
+                    {count_distinct or f"COUNT(DISTINCT {column})"} AS unique_count
                     FROM {table_name}
                     WHERE {column} IS NOT NULL
                     """,
                 ).fetchall()
                 table_stats[column]["unique"] = result_value_values[0][0]
 
+                if approx:
+                    approx_notes["unique"] = (
+                        sql.approx.COUNT_DISTINCT_ERROR
+                        if count_distinct
+                        else sql.approx.EXACT
+                    )
+
                 columns_to_include_in_report.update(["unique"])
 
             except Exception:
@@ -229,27 +254,72 @@ class TableDescription(DatabaseInspection):
             # These keys are numeric and work only on duckdb
             special_numeric_keys = ["std", "25%", "50%", "75%"]
 
+            quantiles = [
+                (approx and sql.approx.quantile(dialect, column, pct))
+                or f"percentile_disc({pct}) WITHIN GROUP (ORDER BY {column})"
+                for pct in (0.25, 0.50, 0.75)
+            ]
+            use_functions = approx and sql.approx.quantile(dialect, column, 0.5)
+            sample = (
+                sql.approx.tablesample(dialect)
+                if approx and not use_functions
+                else None
+            )
+
             try:
                 # Note: stddev_pop and PERCENTILE_DISC will work only on DuckDB
-                result = sql.run.raw_run(
-                    Connection.current,
-                    f"""
-                    SELECT
-                        stddev_pop({column}) as key_std,
-                        percentile_disc(0.25) WITHIN GROUP
-                        (ORDER BY {column}) as key_25,
-                        percentile_disc(0.50) WITHIN GROUP
-                        (ORDER BY {column}) as key_50,
-                        percentile_disc(0.75) WITHIN GROUP
-                        (ORDER BY {column}) as key_75
-                    FROM {table_name}
-                    """,
-                ).fetchall()
+                query = f"""
+                SELECT
+                    stddev_pop({column}) as key_std,
+                    {quantiles[0]} as key_25,
+                    {quantiles[1]} as key_50,
+                    {quantiles[2]} as key_75
+                FROM {table_name}
+                """
+
+                if sample:
+                    # compute the percentiles on a sample of the table
+                    result = sql.run.raw_run(
+                        Connection.current,
+                        f"""
+                        SELECT * FROM (
+                            SELECT stddev_pop({column}) as key_std
+                            FROM {table_name}
+                        ) AS _full, (
+                            SELECT
+                                {quantiles[0]} as key_25,
+                                {quantiles[1]} as key_50,
+                                {quantiles[2]} as key_75,
+                                COUNT({column}) as sample_size
+                            FROM {table_name} {sample}
+                        ) AS _sample
+                        """,
+                    ).fetchall()
+                    size = result[0][-1]
+                else:
+                    size = None
+
+                if not size:
+                    # no sample, or an empty one (a small table)
+                    result = sql.run.raw_run(Connection.current, query).fetchall()
 
                 for i, key in enumerate(special_numeric_keys):
                     # r_key = f'key_{key.replace("%", "")}'
                     table_stats[column][key] = float(result[0][i])
 
+                if size:
+                    sample_size = min(sample_size, size)
+                    approx_notes["25%, 50%, 75%"] = sql.approx.describe_sample(
+                        sample_size
+                    )
+                elif use_functions:
+                    approx_notes["25%, 50%, 75%"] = sql.approx.QUANTILE_ERROR
+                elif approx:
+                    approx_notes.setdefault(
+                        "25%, 50%, 75%",
+                        sql.approx.EXACT_SMALL if sample else sql.approx.EXACT,
+                    )
+
                 columns_to_include_in_report.update(special_numeric_keys)
 
             except TypeError:
@@ -298,12 +368,17 @@ class TableDescription(DatabaseInspection):
   background-color: var(--jp-cell-editor-background);
 }
             </style>"""
+        notes = [f"{key}: {note}" for key, note in approx_notes.items()]
+
         self._table_html = HTML(
             sticky_column_css
             + self._table.get_html_string(attributes={"id": "profile-table"})
+            + "".join(f"<p>{note}</p>" for note in notes)
         ).__html__()
 
-        self._table_txt = self._table.get_string()
+        self._table_txt = self._table.get_string() + "".join(
+            f"\n{note}" for note in notes
+        )
 
 
 @telemetry.log_call()
@@ -319,14 +394,15 @@ def get_columns(name, schema=None):
 
 
 @telemetry.log_call()
-def get_table_statistics(name, schema=None):
+def get_table_statistics(name, schema=None, approx=False):
     """Get table statistics for a given connection.
 
     For all data types the results will include `count`, `mean`, `std`, `min`
     `max`, `25`, `50` and `75` percentiles. It will also include `unique`, `top`
-    and `freq` statistics.
+    and `freq` statistics. If `approx=True`, `unique` and the percentiles are
+    approximate.
     """
-    return TableDescription(name, schema=schema)
+    return TableDescription(name, schema=schema, approx=approx)
 
 
 def get_schema_names(conn=None):
@@ -19,8 +19,12 @@ from sqlalchemy.exc import OperationalError, ProgrammingError, DatabaseError
 
 import warnings
 import sql.connection
+import sql.cache
 import sql.parse
 import sql.run
+import sql.pagination
+import sql.persist
+import sql.register
 from sql import exceptions
 from sql.store import store
 from sql.command import SQLCommand
@@ -102,6 +106,106 @@ class SqlMagic(Magics, Configurable):
             "displayed (full result set is still stored)"
         ),
     )
+    lazy_fetch = Bool(
+        False,
+        config=True,
+        help=(
+            "Fetch rows from the database only when they're needed (e.g., to "
+            "display them) instead of fetching all rows after running the query"
+        ),
+    )
+    fetch_batch_size = Int(
+        1000,
+        config=True,
+        help="Number of rows to fetch at a time when lazy_fetch is enabled",
+    )
+    columnar_storage = Bool(
+        False,
+        config=True,
+        help=(
+            "Store results as one NumPy array per column instead of a list of rows "
+            "(uses less memory for numeric columns, requires numpy)"
+        ),
+    )
+    stream_results = Bool(
+        False,
+        config=True,
+        help=(
+            "Use server-side cursors (if the driver supports them) so rows are "
+            "transferred from the database as they're fetched (implies lazy_fetch)"
+        ),
+    )
+    result_cache = Bool(
+        False,
+        config=True,
+        help=(
+            "Cache the results of queries (including the ones run by %sqlplot and "
+            "%sqlcmd) so running them again doesn't hit the database"
+        ),
+    )
+    result_cache_size = Int(
+        256,
+        config=True,
+        help="Maximum size (in MB) of the results cached in memory",
+    )
+    result_cache_ttl = Int(
+        None,
+        config=True,
+        allow_none=True,
+        help="Seconds after which cached results expire (None means never)",
+    )
+    result_cache_dir = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help=(
+            "Also store the cached results in this directory (as Parquet files) so "
+            "they survive kernel restarts"
+        ),
+    )
+    materialize_snippets = Bool(
+        False,
+        config=True,
+        help=(
+            "Store the results of the snippets used with --with in temporary tables "
+            "instead of computing them in every query"
+        ),
+    )
+    snippets_store = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help=(
+            "Keep the snippets saved with --save in this SQLite database (.db, "
+            ".sqlite or .sqlite3 extension) or directory of .sql files so they're "
+            "available in other sessions"
+        ),
+    )
+    pool_size = Int(
+        None,
+        config=True,
+        allow_none=True,
+        help="Number of connections kept in the pool of new connections",
+    )
+    pool_pre_ping = Bool(
+        False,
+        config=True,
+        help=(
+            "Test that the connection works before running a cell (and reconnect "
+            "if the database dropped it)"
+        ),
+    )
+    pool_recycle = Int(
+        None,
+        config=True,
+        allow_none=True,
+        help="Replace connections older than this number of seconds",
+    )
+    persist_batch_size = Int(
+        100_000,
+        config=True,
+        help="Number of rows to write at a time with --persist and --append",
+    )
     autopandas = Bool(
         False,
         config=True,
@@ -143,6 +247,30 @@ class SqlMagic(Magics, Configurable):
 
         # Add ourself to the list of module configurable via %config
         self.shell.configurables.append(self)
+        self._configure_result_cache()
+        self._store.materialize_snippets = self.materialize_snippets
+
+        if self.snippets_store is not None:
+            self._store.set_backend(self.snippets_store)
+
+    @observe(
+        "result_cache", "result_cache_size", "result_cache_ttl", "result_cache_dir"
+    )
+    def _configure_result_cache(self, change=None):
+        sql.cache.result_cache.configure(
+            enabled=self.result_cache,
+            max_bytes=self.result_cache_size * 1024**2,
+            ttl=self.result_cache_ttl,
+            directory=self.result_cache_dir,
+        )
+
+    @observe("materialize_snippets")
+    def _set_materialize_snippets(self, change):
+        self._store.materialize_snippets = change["new"]
+
+    @observe("snippets_store")
+    def _set_snippets_store(self, change):
+        self._store.set_backend(change["new"])
 
     @observe("autopandas", "autopolars")
     def _mutex_autopandas_autopolars(self, change):
@@ -199,7 +327,10 @@ class SqlMagic(Magics, Configurable):
         "-a",
         "--connection_arguments",
         type=str,
-        help="specify dictionary of connection arguments to pass to SQL driver",
+        help=(
+            "specify dictionary of connection arguments to pass to SQL driver "
+            "(pool_size, pool_pre_ping and pool_recycle configure the pool)"
+        ),
     )
     @argument("-f", "--file", type=str, help="Run SQL from file at this path")
     @argument("-S", "--save", type=str, help="Save this query for later use")
@@ -229,6 +360,42 @@ class SqlMagic(Magics, Configurable):
         action="append",
         help="Interactive mode",
     )
+    @argument(
+        "--stream",
+        action="store_true",
+        help="Use a server-side cursor to fetch rows only when needed",
+    )
+    @argument(
+        "--batch",
+        action="store_true",
+        help="Return the results and timing of each statement",
+    )
+    @argument(
+        "--register",
+        type=str,
+        help=(
+            "Comma-separated data frames/Arrow tables to query as views "
+            "(DuckDB only), views are removed after running the cell"
+        ),
+    )
+    @argument(
+        "--paginate",
+        type=int,
+        help="Display the results in pages of this size (fetched on demand)",
+    )
+    @argument(
+        "--paginate-key",
+        type=str,
+        help="Unique column to paginate by (used with --paginate)",
+    )
+    @argument(
+        "--export",
+        type=str,
+        help=(
+            "Stream the results to a file (.csv, .parquet or .arrow) "
+            "instead of loading them in memory"
+        ),
+    )
     def execute(self, line="", cell="", local_ns=None):
         """
         Runs SQL statement against a database, specified by
@@ -335,6 +502,16 @@ class SqlMagic(Magics, Configurable):
         if args.creator:
             args.creator = user_ns[args.creator]
 
+        pool_options = {
+            key: getattr(self, key)
+            for key in sql.connection.POOL_OPTIONS
+            if getattr(self, key) not in (None, False)
+        }
+
+        for key in sql.connection.POOL_OPTIONS:
+            if key in args.connection_arguments:
+                pool_options[key] = args.connection_arguments.pop(key)
+
         # this creates a new connection or use an existing one
         # depending on the connect_arg value
         conn = sql.connection.Connection.set(
@@ -343,8 +520,14 @@ class SqlMagic(Magics, Configurable):
             connect_args=args.connection_arguments,
             creator=args.creator,
             alias=args.alias,
+            pool_options=pool_options,
         )
+        conn._check_connection()
         payload["connection_info"] = conn._get_curr_sqlalchemy_connection_info()
+
+        if args.with_ and self.materialize_snippets:
+            command.render_with(conn)
+
         if args.persist:
             return self._persist_dataframe(
                 command.sql, conn, user_ns, append=False, index=not args.no_index
@@ -373,12 +556,44 @@ class SqlMagic(Magics, Configurable):
             print("Skipping execution...")
             return
 
+        views = (
+            sql.register.get_objects(
+                conn, sql.register.parse_names(args.register), user_ns
+            )
+            if args.register
+            else {}
+        )
+
+        # pages are fetched after the cell runs, so the paginator registers the
+        # views while fetching each one
+        registered = [] if args.paginate else sql.register.register(conn, views)
+
         try:
-            result = sql.run.run(conn, command.sql, self)
+            if args.paginate:
+                return sql.pagination.paginate(
+                    conn, command.sql, args.paginate, key=args.paginate_key, views=views
+                )
+
+            if args.export:
+                result = sql.run.run(
+                    conn, command.sql, self, to_data_frame=False, stream=True
+                )
+                return result.export(args.export)
+
+            if args.batch:
+                result = sql.run.run_batch(conn, command.sql, self)
+            else:
+                result = sql.run.run(
+                    conn, command.sql, self, stream=args.stream or None
+                )
+
+                if registered and isinstance(result, sql.run.ResultSet):
+                    # rows can't be fetched once the views are dropped
+                    result._fetch_all()
 
             if (
                 result is not None
-                and not isinstance(result, str)
+                and not isinstance(result, (str, sql.run.BatchResult))
                 and self.column_local_vars
             ):
                 # Instead of returning values, set variables directly in the
@@ -414,17 +629,14 @@ class SqlMagic(Magics, Configurable):
                 print(e)
             else:
                 raise
+        finally:
+            sql.register.unregister(conn, registered)
 
     legal_sql_identifier = re.compile(r"^[A-Za-z0-9#_$]+")
 
     @modify_exceptions
     def _persist_dataframe(self, raw, conn, user_ns, append=False, index=True):
         """Implements PERSIST, which writes a DataFrame to the RDBMS"""
-        if not DataFrame:
-            raise exceptions.MissingPackageError(
-                "You must install pandas to persist results: pip install pandas"
-            )
-
         frame_name = raw.strip(";")
 
         # invalid identifier
@@ -448,9 +660,17 @@ class SqlMagic(Magics, Configurable):
 
         frame = user_ns[frame_name]
 
-        if not isinstance(frame, DataFrame) and not isinstance(frame, Series):
+        if sql.persist.is_arrow(frame):
+            # polars data frames are written in Arrow format
+            check_installed(["pyarrow"], "--persist")
+        elif not DataFrame:
+            raise exceptions.MissingPackageError(
+                "You must install pandas to persist results: pip install pandas"
+            )
+        elif not isinstance(frame, DataFrame) and not isinstance(frame, Series):
             raise exceptions.TypeError(
-                f"{frame_name!r} is not a Pandas DataFrame or Series"
+                f"{frame_name!r} is not a Pandas DataFrame or Series, "
+                "a Polars DataFrame, or a PyArrow Table"
             )
 
         # Make a suitable name for the resulting database table
@@ -458,13 +678,27 @@ class SqlMagic(Magics, Configurable):
         table_name = self.legal_sql_identifier.search(table_name).group(0)
 
         if_exists = "append" if append else "fail"
+        batch_size = self.persist_batch_size
+        # Arrow readers don't know their length in advance
+        show_progress = self.feedback and (
+            not hasattr(frame, "__len__") or len(frame) > batch_size
+        )
 
         try:
-            frame.to_sql(
-                table_name, conn.session.engine, if_exists=if_exists, index=index
+            sql.persist.persist(
+                frame,
+                table_name,
+                conn,
+                if_exists=if_exists,
+                index=index,
+                batch_size=batch_size,
+                progress=sql.persist.print_progress if show_progress else None,
             )
         except ValueError as e:
             raise exceptions.ValueError(e) from e
+        finally:
+            if show_progress:
+                print()
 
         return "Persisted %s" % table_name
 
@@ -200,9 +200,17 @@ class SqlCmdMagic(Magics, Configurable):
                 "-o", "--output", type=str, help="Store report location", required=False
             )
 
+            parser.add_argument(
+                "--approx",
+                action="store_true",
+                help="Compute approximate unique counts and percentiles",
+            )
+
             args = parser.parse_args(others)
 
-            report = inspect.get_table_statistics(schema=args.schema, name=args.table)
+            report = inspect.get_table_statistics(
+                schema=args.schema, name=args.table, approx=args.approx
+            )
 
             if args.output:
                 with open(args.output, "w") as f:
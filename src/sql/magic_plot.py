@@ -43,6 +43,17 @@ class SqlPlotMagic(Magics, Configurable):
         default="v",
         help="Boxplot orientation (v/h)",
     )
+    @argument(
+        "--max-fliers",
+        type=int,
+        default=plot.MAX_FLIERS,
+        help="Maximum number of outliers to plot per column (boxplot)",
+    )
+    @argument(
+        "--approx",
+        action="store_true",
+        help="Compute approximate quartiles (boxplot)",
+    )
     @argument(
         "-w",
         "--with",
@@ -81,6 +92,8 @@ class SqlPlotMagic(Magics, Configurable):
                 with_=cmd.args.with_,
                 orient=cmd.args.orient,
                 conn=None,
+                max_fliers=cmd.args.max_fliers,
+                approx=cmd.args.approx,
             )
         elif cmd.args.line[0] in {"hist", "histogram"}:
             util.is_table_exists(table, with_=cmd.args.with_)
@@ -0,0 +1,186 @@
+"""
+Paginated results. Each page is fetched by running the query again with
+LIMIT/OFFSET (or filtering by a key column, which is faster for large offsets since
+the database doesn't have to skip the previous rows), so only one page of rows is
+kept in memory
+"""
+from ploomber_core.dependencies import requires
+from sqlglot import exp
+
+from sql import exceptions
+from sql import register
+from sql.parse import split_statements
+from sql.run import _html_table, unduplicate_field_names
+
+
+class Paginator:
+    """Fetch the results of a query one page at a time
+
+    Parameters
+    ----------
+    conn : sql.connection.Connection
+        Connection to use
+
+    query : str
+        SQL query (must be a SELECT)
+
+    page_size : int
+        Number of rows per page
+
+    key : str, default None
+        Column to paginate by (keyset pagination), its values must be unique. If
+        None, pages are fetched with LIMIT/OFFSET so the query should have an
+        ORDER BY clause to get consistent pages
+
+    views : dict, default None
+        Objects to register as DuckDB views while each page is fetched (see
+        ``sql.register.get_objects``)
+    """
+
+    def __init__(self, conn, query, page_size, key=None, views=None):
+        if page_size < 1:
+            raise exceptions.ValueError(
+                f"page_size must be a positive integer, got: {page_size}"
+            )
+
+        statements = split_statements(query)
+
+        if len(statements) != 1:
+            raise exceptions.ValueError(
+                "Paginating results requires a single query, "
+                f"got {len(statements)} statements"
+            )
+
+        self._conn = conn
+        self._query = statements[0].rstrip(";").strip()
+        self.page_size = page_size
+        self.key = key
+        self._views = views or {}
+        self.page = None
+        self.keys = []
+        self.rows = []
+        self.has_next = False
+        # value of the key column in the first row of each visited page (keyset
+        # pagination), the first page has no lower bound
+        self._page_starts = [None]
+
+    def _page_query(self, page):
+        subquery = f"SELECT * FROM ({self._query}) AS jupysql_page"
+        # fetch an extra row to know if there's a next page
+        limit = self.page_size + 1
+
+        if self.key is None:
+            return f"{subquery} LIMIT {limit} OFFSET {page * self.page_size}"
+
+        start = self._page_starts[page]
+
+        if start is None:
+            where = ""
+        else:
+            where = f" WHERE {self.key} >= {exp.convert(start).sql()}"
+
+        return f"{subquery}{where} ORDER BY {self.key} LIMIT {limit}"
+
+    def fetch(self, page):
+        """Fetch a page (0-based), the rows of the previous page are discarded"""
+        if page < 0:
+            raise exceptions.ValueError(f"page must be non-negative, got: {page}")
+
+        if self.key is not None and page >= len(self._page_starts):
+            raise exceptions.ValueError(
+                "When paginating by a key, you can only move to the next page "
+                f"(current page: {self.page}, requested: {page})"
+            )
+
+        registered = register.register(self._conn, self._views)
+
+        try:
+            result = self._conn.execute(self._page_query(page))
+
+            if hasattr(result, "keys"):
+                keys = list(result.keys())
+            else:
+                keys = [column[0] for column in result.description]
+
+            rows = result.fetchmany(self.page_size + 1)
+        finally:
+            register.unregister(self._conn, registered)
+
+        self.has_next = len(rows) > self.page_size
+
+        if (
+            self.key is not None
+            and self.has_next
+            and page + 1 == len(self._page_starts)
+        ):
+            if self.key not in keys:
+                raise exceptions.ValueError(
+                    f"Column {self.key!r} is not in the results, "
+                    f"available columns: {', '.join(keys)}"
+                )
+
+            self._page_starts.append(rows[self.page_size][keys.index(self.key)])
+
+        self.page = page
+        self.keys = keys
+        self.rows = rows[: self.page_size]
+        return self.rows
+
+    def next(self):
+        """Fetch the next page (or the first one if no page has been fetched)"""
+        return self.fetch(0 if self.page is None else self.page + 1)
+
+    def previous(self):
+        """Fetch the previous page"""
+        return self.fetch(max((self.page or 0) - 1, 0))
+
+    @property
+    def has_previous(self):
+        return bool(self.page)
+
+    def _repr_html_(self):
+        if self.page is None:
+            self.next()
+
+        table = _html_table(unduplicate_field_names(self.keys), self.rows)
+        return (
+            f'{table}\n<span style="font-style:italic;text-align:center;">'
+            f"Page {self.page + 1}</span>"
+        )
+
+
+@requires(["ipywidgets"], name="%sql --paginate")
+def paginate(conn, query, page_size, key=None, views=None):
+    """
+    Returns a widget that displays the results of a query one page at a time (with
+    buttons to move to the previous/next page)
+    """
+    import ipywidgets as widgets
+
+    paginator = Paginator(conn, query, page_size, key=key, views=views)
+    paginator.next()
+
+    table = widgets.HTML()
+    previous = widgets.Button(description="Previous", icon="arrow-left")
+    next_ = widgets.Button(description="Next", icon="arrow-right")
+
+    def update():
+        table.value = paginator._repr_html_()
+        previous.disabled = not paginator.has_previous
+        next_.disabled = not paginator.has_next
+
+    def on_previous(_):
+        paginator.previous()
+        update()
+
+    def on_next(_):
+        paginator.next()
+        update()
+
+    previous.on_click(on_previous)
+    next_.on_click(on_next)
+    update()
+
+    viewer = widgets.VBox([table, widgets.HBox([previous, next_])])
+    viewer.paginator = paginator
+    return viewer
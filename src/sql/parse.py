@@ -1,7 +1,10 @@
 import itertools
+import re
 import shlex
 from os.path import expandvars
 
+import sqlparse
+
 from six.moves import configparser as CP
 from sqlalchemy.engine.url import URL
 from IPython.core.magic_arguments import parse_argstring
@@ -95,3 +98,75 @@ def without_sql_comment(parser, line):
 def magic_args(magic_execute, line):
     line = without_sql_comment(parser=magic_execute.parser, line=line)
     return parse_argstring(magic_execute, line)
+
+
+def is_query(statement):
+    """Checks if the statement is a query (SELECT or WITH ... SELECT)"""
+    words = str(statement).split()
+    return bool(words) and words[0].lower() in {"select", "with"}
+
+
+# tokens that can contain a semicolon, comments and quotes follow sqlparse's rules
+_SPLIT_TOKENS = re.compile(
+    r"""
+    # skip characters that can't start a token (faster than trying each branch)
+    (?=[-/'"`$();\#\\\[´+@%^&|bdewz])
+    (?:(?P<comment>--.*?(?:\r\n|\r|\n|$)|/\*[\s\S]*?\*/)
+    |(?P<string>'(?:''|\\'|[^'])*'|"(?:""|\\"|[^"])*"|`(?:``|[^`])*`)
+    |(?P<dollar>(?<!\S)(?P<tag>\$(?:[_A-ZÀ-Ü]\w*)?\$)[\s\S]*?(?P=tag))
+    |(?P<open>\()
+    |(?P<close>\))
+    |(?P<semicolon>;)
+    # sqlparse splits these differently depending on the surrounding tokens (e.g.,
+    # procedural blocks, MySQL comments, operators followed by a comment)
+    |(?P<ambiguous>[#$\\\[´]|[+/@%^&|-](?=--|/\*)|\b(?:begin|declare|zone)\b
+    |\bwith'|(?:(?<=[.:?@])|(?<=%\())end\b|%\(\w+\)send\b)
+    # END closes CASE expressions (and IF/WHILE blocks), "end(" and "end." are names
+    |(?P<end>\bend\b(?:(?P<block>\s+(?:if|while|loop)\b)|(?!\s*\.|\())))
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# whitespace and single-line comments after a semicolon belong to the statement
+_TRAILING = re.compile(r"(?:[^\S\r\n]|--(?!\+).*?(?:\r\n|\r|\n|$))*")
+
+
+def split_statements(sql):
+    """Split SQL code into statements, returns the same as ``sqlparse.split``
+
+    This is a single pass over the code that only looks for the tokens that
+    determine where a statement ends (semicolons outside quotes, dollar-quoted
+    strings, comments, parentheses and the END of CASE expressions) so it's much
+    faster than sqlparse on large scripts. Code that sqlparse may split differently
+    (e.g., BEGIN ... END blocks) is split with sqlparse
+    """
+    statements = []
+    start = 0
+    level = 0
+
+    for match in _SPLIT_TOKENS.finditer(sql):
+        kind = match.lastgroup
+
+        if kind == "open":
+            level += 1
+        elif kind == "close":
+            level -= 1
+        elif kind == "end":
+            # same as sqlparse: END lowers the level (even without a matching CASE),
+            # so do END IF and END WHILE but only when separated by a single space
+            block = match.group("block")
+            level -= block is None or block.lower() in {" if", " while"}
+        elif kind == "semicolon" and level <= 0:
+            end = _TRAILING.match(sql, match.end()).end()
+            statements.append(sql[start:end].strip())
+            start = end
+            level = 0
+        elif kind == "ambiguous":
+            return sqlparse.split(sql)
+
+    last = sql[start:].strip()
+
+    if last:
+        statements.append(last)
+
+    return statements
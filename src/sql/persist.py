@@ -0,0 +1,686 @@
+"""
+Write data frames to database tables (``%sql --persist`` and ``%sql --append``).
+pandas' ``to_sql`` inserts the rows with ``INSERT`` statements, which is slow for
+large data frames, so loaders use the fastest bulk path each database supports
+(e.g., ``COPY`` in PostgreSQL). Polars data frames and Arrow tables are written
+without converting them to pandas. Loaders are registered by dialect name (or by
+DB-API module for custom connections, e.g., "adbc_driver_manager"); if there isn't
+one for the current connection, we use ``Loader``, which inserts the rows with
+SQLAlchemy (an ``executemany`` call per batch, in a single transaction).
+
+To add support for a new database::
+
+    from sql.persist import Loader, register_loader
+
+    @register_loader("mydialect")
+    class MyLoader(Loader):
+        def insert(self, table, conn, keys, rows):
+            ...
+"""
+import datetime
+import io
+import os
+import tempfile
+import uuid
+import warnings
+
+import sqlalchemy
+
+from sql import arrow
+
+_LOADERS = {}
+
+
+def register_loader(*names):
+    """Register a ``Loader`` subclass for the given dialect/DB-API module names"""
+
+    def decorator(cls):
+        loader = cls()
+
+        for name in names:
+            _LOADERS[name] = loader
+
+        return cls
+
+    return decorator
+
+
+def get_loader(dialect=None):
+    """Returns the loader for the given dialect/DB-API module name, falls back to
+    ``Loader``
+    """
+    return _LOADERS.get(dialect, _DEFAULT_LOADER)
+
+
+def persist(
+    frame,
+    table_name,
+    conn,
+    if_exists="fail",
+    index=True,
+    batch_size=None,
+    progress=None,
+):
+    """Write a data frame to a table, returns the number of rows written
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame, pandas.Series, polars.DataFrame, pyarrow.Table or
+            pyarrow.RecordBatchReader
+        Data to write
+
+    table_name : str
+        Name of the table
+
+    conn : sql.connection.Connection
+        Connection to the database
+
+    if_exists : str, default "fail"
+        What to do if the table exists: "fail", "replace", or "append"
+
+    index : bool, default True
+        Write the data frame's index as a column (only used with pandas objects)
+
+    batch_size : int, default None
+        Number of rows to write at a time, if None, all rows are written at once
+
+    progress : callable, default None
+        Called with the number of rows written so far and the total number of rows
+        (None for a ``RecordBatchReader``) after writing each batch
+    """
+    # discard cached results and materialized snippets
+    conn._data_changed()
+
+    session = conn.session
+
+    if isinstance(session.engine, sqlalchemy.engine.Engine):
+        loader = get_loader(session.engine.dialect.name)
+    else:
+        # custom connections hold a DB-API connection
+        loader = get_loader(type(session.engine).__module__.split(".")[0])
+
+    if is_arrow(frame):
+        return loader.load_arrow(
+            to_arrow(frame),
+            table_name,
+            session,
+            if_exists=if_exists,
+            batch_size=batch_size,
+            progress=progress,
+        )
+
+    return loader.load(
+        frame,
+        table_name,
+        session,
+        if_exists=if_exists,
+        index=index,
+        batch_size=batch_size,
+        progress=progress,
+    )
+
+
+def print_progress(written, total):
+    """Prints the number of rows written so far (overwriting the previous line)"""
+    total = "" if total is None else f"/{total:,}"
+    print(f"\rPersisted {written:,}{total} rows", end="")
+
+
+def is_arrow(data):
+    """
+    Returns True if ``data`` is a polars data frame/series or an Arrow
+    table/reader
+    """
+    if type(data).__module__.split(".")[0] == "polars":
+        return hasattr(data, "to_arrow")
+
+    return arrow.pa is not None and isinstance(
+        data, (arrow.pa.Table, arrow.pa.RecordBatch, arrow.pa.RecordBatchReader)
+    )
+
+
+def to_arrow(data):
+    """
+    Returns a ``pyarrow.Table`` or ``pyarrow.RecordBatchReader`` with the data of
+    a polars data frame/series or an Arrow object (without copying it)
+    """
+    if isinstance(data, (arrow.pa.Table, arrow.pa.RecordBatchReader)):
+        return data
+
+    if isinstance(data, arrow.pa.RecordBatch):
+        return arrow.pa.Table.from_batches([data])
+
+    # polars series, to_arrow() returns an array
+    if hasattr(data, "to_frame"):
+        data = data.to_frame()
+
+    return data.to_arrow()
+
+
+def _iter_batches(data, batch_size):
+    """Yields the record batches in a table or reader, up to batch_size rows each"""
+    if isinstance(data, arrow.pa.Table):
+        yield from data.to_batches(max_chunksize=batch_size)
+        return
+
+    for batch in data:
+        if batch_size is None:
+            yield batch
+        else:
+            for start in range(0, batch.num_rows, batch_size):
+                yield batch.slice(start, batch_size)
+
+
+class Loader:
+    """Default loader, uses pandas' ``to_sql`` (or SQLAlchemy, for Arrow data) to
+    create the table
+
+    Subclasses should override ``insert`` to write each batch of rows with the
+    driver's bulk API, or ``load`` and ``load_arrow`` if the database can read the
+    data directly
+    """
+
+    def load(
+        self,
+        frame,
+        table_name,
+        connection,
+        if_exists="fail",
+        index=True,
+        batch_size=None,
+        progress=None,
+    ):
+        """Write ``frame`` to ``table_name`` using a SQLAlchemy ``connection``,
+        returns the number of rows written
+        """
+        total = len(frame)
+        written = 0
+
+        if not isinstance(connection.engine, sqlalchemy.engine.Engine):
+            # custom connections (DB-API connections) use pandas' own insert
+            frame.to_sql(
+                table_name, connection.engine, if_exists=if_exists, index=index
+            )
+            return total
+
+        def insert(table, conn, keys, data_iter):
+            nonlocal written
+            rows = list(data_iter)
+            self.insert(table.table, conn, keys, rows)
+            written += len(rows)
+
+            if progress is not None:
+                progress(written, total)
+
+            return len(rows)
+
+        frame.to_sql(
+            table_name,
+            connection.engine,
+            if_exists=if_exists,
+            index=index,
+            chunksize=batch_size,
+            method=insert,
+        )
+
+        return written
+
+    def load_arrow(
+        self,
+        data,
+        table_name,
+        connection,
+        if_exists="fail",
+        batch_size=None,
+        progress=None,
+    ):
+        """Write ``data`` (a ``pyarrow.Table`` or ``pyarrow.RecordBatchReader``) to
+        ``table_name``, returns the number of rows written
+        """
+        if not isinstance(connection.engine, sqlalchemy.engine.Engine):
+            if isinstance(data, arrow.pa.RecordBatchReader):
+                data = data.read_all()
+
+            return self.load(
+                data.to_pandas(),
+                table_name,
+                connection,
+                if_exists=if_exists,
+                index=False,
+                batch_size=batch_size,
+                progress=progress,
+            )
+
+        keys = data.schema.names
+        table = sqlalchemy.Table(
+            table_name,
+            sqlalchemy.MetaData(),
+            *(
+                sqlalchemy.Column(field.name, _sqlalchemy_type(field.type))
+                for field in data.schema
+            ),
+        )
+        total = data.num_rows if isinstance(data, arrow.pa.Table) else None
+        written = 0
+
+        with connection.engine.begin() as conn:
+            if sqlalchemy.inspect(conn).has_table(table_name):
+                if if_exists == "fail":
+                    raise ValueError(f"Table '{table_name}' already exists.")
+
+                if if_exists == "replace":
+                    table.drop(conn)
+                    table.create(conn)
+            else:
+                table.create(conn)
+
+            for batch in _iter_batches(data, batch_size):
+                rows = list(zip(*(column.to_pylist() for column in batch.columns)))
+                self.insert(table, conn, keys, rows)
+                written += len(rows)
+
+                if progress is not None:
+                    progress(written, total)
+
+        return written
+
+    def insert(self, table, conn, keys, rows):
+        """
+        Insert a batch of rows (a list of tuples with the values for ``keys``) into
+        ``table`` (a ``sqlalchemy.Table``). ``conn`` is a SQLAlchemy connection in a
+        transaction
+        """
+        conn.execute(table.insert(), [dict(zip(keys, row)) for row in rows])
+
+
+_DEFAULT_LOADER = Loader()
+
+
+def _sqlalchemy_type(arrow_type):
+    """Returns the SQLAlchemy type for an Arrow type (the same ones pandas uses)"""
+    types = arrow.pa.types
+
+    if types.is_boolean(arrow_type):
+        return sqlalchemy.Boolean
+    elif types.is_int8(arrow_type) or types.is_int16(arrow_type):
+        return sqlalchemy.SmallInteger
+    elif types.is_integer(arrow_type) and arrow_type.bit_width <= 32:
+        return sqlalchemy.Integer
+    elif types.is_integer(arrow_type):
+        return sqlalchemy.BigInteger
+    elif types.is_floating(arrow_type):
+        return sqlalchemy.Float(precision=23 if arrow_type.bit_width <= 32 else 53)
+    elif types.is_decimal(arrow_type):
+        return sqlalchemy.Numeric(arrow_type.precision, arrow_type.scale)
+    elif types.is_timestamp(arrow_type):
+        return sqlalchemy.DateTime(timezone=arrow_type.tz is not None)
+    elif types.is_date(arrow_type):
+        return sqlalchemy.Date
+    elif types.is_time(arrow_type):
+        return sqlalchemy.Time
+    elif types.is_duration(arrow_type):
+        return sqlalchemy.Interval
+    elif types.is_binary(arrow_type) or types.is_large_binary(arrow_type):
+        return sqlalchemy.LargeBinary
+
+    return sqlalchemy.Text
+
+
+def _qualified_name(conn, table):
+    return conn.dialect.identifier_preparer.format_table(table)
+
+
+def _column_list(conn, keys):
+    quote = conn.dialect.identifier_preparer.quote
+    return ", ".join(quote(str(key)) for key in keys)
+
+
+# values that don't have a CSV representation the databases can parse (str()
+# returns Python reprs, e.g., b'...')
+_NOT_CSV_TYPES = (
+    bytes,
+    bytearray,
+    memoryview,
+    dict,
+    list,
+    tuple,
+    set,
+    datetime.timedelta,
+)
+
+
+def _can_write_csv(rows):
+    """Returns False if any of the values can't be written with ``_to_csv``"""
+    return not any(isinstance(value, _NOT_CSV_TYPES) for row in rows for value in row)
+
+
+def _to_csv(rows, null="", escape=None):
+    """
+    Format rows as CSV, strings are always quoted so empty strings and NULLs
+    (``null``, unquoted) can be told apart. If ``escape`` is None, quotes are
+    escaped by doubling them, otherwise, with ``escape``
+    """
+    escaped_quote = '""' if escape is None else escape + '"'
+    lines = []
+
+    for row in rows:
+        values = []
+
+        for value in row:
+            if value is None:
+                values.append(null)
+            elif isinstance(value, str):
+                if escape is not None:
+                    value = value.replace(escape, escape + escape)
+
+                values.append('"' + value.replace('"', escaped_quote) + '"')
+            elif isinstance(value, bool):
+                values.append(str(int(value)))
+            else:
+                values.append(str(value))
+
+        lines.append(",".join(values))
+
+    lines.append("")
+    return "\n".join(lines)
+
+
+@register_loader("sqlite")
+class SQLiteLoader(Loader):
+    """
+    Inserts each batch with the DB-API cursor's ``executemany``, values are only
+    converted by SQLAlchemy for the columns that need it (e.g., dates)
+    """
+
+    def insert(self, table, conn, keys, rows):
+        dialect = conn.dialect
+        processors = [
+            table.c[key].type.dialect_impl(dialect).bind_processor(dialect)
+            for key in keys
+        ]
+
+        if any(processors):
+            rows = [
+                tuple(
+                    value if process is None else process(value)
+                    for process, value in zip(processors, row)
+                )
+                for row in rows
+            ]
+
+        placeholders = ", ".join("?" for _ in keys)
+        cursor = conn.connection.cursor()
+
+        try:
+            cursor.executemany(
+                f"INSERT INTO {_qualified_name(conn, table)} "
+                f"({_column_list(conn, keys)}) VALUES ({placeholders})",
+                rows,
+            )
+        finally:
+            cursor.close()
+
+
+@register_loader("postgresql")
+class PostgreSQLLoader(Loader):
+    """Sends each batch with ``COPY ... FROM STDIN`` (psycopg2 and psycopg 3),
+    batches with binary or nested values are inserted with ``executemany``
+    """
+
+    def insert(self, table, conn, keys, rows):
+        if not _can_write_csv(rows):
+            return super().insert(table, conn, keys, rows)
+
+        cursor = conn.connection.cursor()
+        statement = (
+            f"COPY {_qualified_name(conn, table)} ({_column_list(conn, keys)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+
+        try:
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(statement, io.StringIO(_to_csv(rows)))
+            elif hasattr(cursor, "copy"):
+                with cursor.copy(statement) as copy:
+                    copy.write(_to_csv(rows))
+            else:
+                super().insert(table, conn, keys, rows)
+        finally:
+            cursor.close()
+
+
+@register_loader("mysql", "mariadb")
+class MySQLLoader(Loader):
+    """
+    Writes each batch to a temporary file and loads it with ``LOAD DATA LOCAL
+    INFILE``. Falls back to ``executemany`` if the server or the driver don't
+    allow it (``local_infile`` must be enabled in both) or the batch has binary or
+    nested values
+    """
+
+    def insert(self, table, conn, keys, rows):
+        if not _can_write_csv(rows):
+            return super().insert(table, conn, keys, rows)
+
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", encoding="utf-8", newline="", delete=False
+        ) as file:
+            file.write(_to_csv(rows, null="\\N", escape="\\"))
+
+        statement = (
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {_qualified_name(conn, table)} "
+            "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' ENCLOSED BY '\"' "
+            f"ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({_column_list(conn, keys)})"
+        )
+        cursor = conn.connection.cursor()
+
+        try:
+            cursor.execute(statement, (file.name,))
+        except conn.dialect.dbapi.Error as e:
+            warnings.warn(
+                f"Couldn't use LOAD DATA LOCAL INFILE ({e}), inserting rows with "
+                "INSERT instead. Enable local_infile in the server and pass "
+                "local_infile=True to the driver to speed up --persist"
+            )
+            super().insert(table, conn, keys, rows)
+        finally:
+            cursor.close()
+            os.remove(file.name)
+
+
+@register_loader("mssql")
+class MSSQLLoader(Loader):
+    """Uses pyodbc's ``fast_executemany`` (sends all the rows in a single call)"""
+
+    def insert(self, table, conn, keys, rows):
+        cursor = conn.connection.cursor()
+
+        try:
+            if not hasattr(cursor, "fast_executemany"):
+                return super().insert(table, conn, keys, rows)
+
+            placeholders = ", ".join("?" for _ in keys)
+            cursor.fast_executemany = True
+            cursor.executemany(
+                f"INSERT INTO {_qualified_name(conn, table)} "
+                f"({_column_list(conn, keys)}) VALUES ({placeholders})",
+                rows,
+            )
+        finally:
+            cursor.close()
+
+
+@register_loader("duckdb")
+class DuckDBLoader(Loader):
+    """
+    Registers the data in DuckDB (without copying it) and inserts it with
+    ``CREATE TABLE ... AS SELECT``/``INSERT INTO ... SELECT``. The statements run in
+    JupySQL's connection so in-memory databases see the new table
+    """
+
+    def load(
+        self,
+        frame,
+        table_name,
+        connection,
+        if_exists="fail",
+        index=True,
+        batch_size=None,
+        progress=None,
+    ):
+        if not hasattr(frame, "columns"):
+            frame = frame.to_frame()
+
+        if index:
+            frame = frame.reset_index()
+
+        frame = frame.set_axis([str(column) for column in frame.columns], axis=1)
+        total = len(frame)
+        batch_size = batch_size or max(total, 1)
+        # iterate at least once so empty data frames create the table
+        batches = (
+            (frame.iloc[start : start + batch_size], min(start + batch_size, total))
+            for start in range(0, max(total, 1), batch_size)
+        )
+
+        return self._write(
+            batches, frame.columns, table_name, connection, if_exists, total, progress
+        )
+
+    def load_arrow(
+        self,
+        data,
+        table_name,
+        connection,
+        if_exists="fail",
+        batch_size=None,
+        progress=None,
+    ):
+        if isinstance(data, arrow.pa.RecordBatchReader):
+            # readers can only be scanned once, so we write them in one go
+            batches, total = [(data, None)], None
+        else:
+            total = data.num_rows
+            batch_size = batch_size or max(total, 1)
+            batches = (
+                (data.slice(start, batch_size), min(start + batch_size, total))
+                for start in range(0, max(total, 1), batch_size)
+            )
+
+        return self._write(
+            batches,
+            data.schema.names,
+            table_name,
+            connection,
+            if_exists,
+            total,
+            progress,
+        )
+
+    def _write(
+        self, batches, columns, table_name, connection, if_exists, total, progress
+    ):
+        """
+        Write ``batches`` (tuples with an object that DuckDB can register and the
+        number of rows written after inserting it)
+        """
+        exists = sqlalchemy.inspect(connection).has_table(table_name)
+
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{table_name}' already exists.")
+
+        table = connection.dialect.identifier_preparer.quote(table_name)
+        columns = _column_list(connection, columns)
+
+        if exists and if_exists == "replace":
+            connection.exec_driver_sql(f"DROP TABLE {table}")
+            exists = False
+
+        driver_connection = connection.connection.driver_connection
+        view = f"__jupysql_persist_{uuid.uuid4().hex}"
+        written = 0
+
+        for batch, written in batches:
+            driver_connection.register(view, batch)
+
+            try:
+                if exists:
+                    result = connection.exec_driver_sql(
+                        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {view}"
+                    )
+                else:
+                    result = connection.exec_driver_sql(
+                        f"CREATE TABLE {table} AS SELECT {columns} FROM {view}"
+                    )
+                    exists = True
+
+                if written is None:
+                    # DuckDB returns the number of rows inserted
+                    written = result.fetchone()[0]
+            finally:
+                driver_connection.unregister(view)
+
+            if progress is not None:
+                progress(written, total)
+
+        if connection.in_transaction():
+            connection.commit()
+
+        return written
+
+
+@register_loader("adbc_driver_manager")
+class ADBCLoader(Loader):
+    """
+    Arrow Database Connectivity (ADBC) drivers ingest Arrow data natively
+    (``cursor.adbc_ingest``), pandas data frames are converted to Arrow first
+    """
+
+    def load(
+        self,
+        frame,
+        table_name,
+        connection,
+        if_exists="fail",
+        index=True,
+        batch_size=None,
+        progress=None,
+    ):
+        if not hasattr(frame, "columns"):
+            frame = frame.to_frame()
+
+        data = arrow.pa.Table.from_pandas(frame, preserve_index=index)
+        return self.load_arrow(
+            data,
+            table_name,
+            connection,
+            if_exists=if_exists,
+            batch_size=batch_size,
+            progress=progress,
+        )
+
+    def load_arrow(
+        self,
+        data,
+        table_name,
+        connection,
+        if_exists="fail",
+        batch_size=None,
+        progress=None,
+    ):
+        mode = {"fail": "create", "append": "append", "replace": "replace"}[if_exists]
+        # custom connections hold the DB-API connection in .engine
+        dbapi_connection = connection.engine
+        cursor = dbapi_connection.cursor()
+
+        try:
+            written = cursor.adbc_ingest(table_name, data, mode=mode)
+        finally:
+            cursor.close()
+
+        dbapi_connection.commit()
+
+        if progress is not None:
+            progress(written, written)
+
+        return written
@@ -5,7 +5,6 @@ from ploomber_core.dependencies import requires
 from ploomber_core.exceptions import modify_exceptions
 from jinja2 import Template
 
-from sql.util import flatten
 from sqlalchemy.exc import ProgrammingError
 from sql import exceptions
 
@@ -21,31 +20,110 @@ try:
 except ModuleNotFoundError:
     np = None
 
+import sql.approx
 import sql.connection
 from sql.telemetry import telemetry
 import warnings
 from sql import util
 
 
-def _summary_stats(conn, table, column, with_=None):
-    """Compute percentiles and mean for boxplot"""
+# maximum number of outliers per column retrieved by boxplot
+MAX_FLIERS = 1000
+
+# how each database computes a percentile (discrete, i.e., a value in the column)
+# as an aggregate, None if it doesn't support it. Databases that aren't listed
+# use the ordered-set aggregate from the SQL standard
+_PERCENTILE_DISC = {
+    # DuckDB, PostgreSQL, Snowflake, Oracle, ...
+    "default": 'percentile_disc({pct}) WITHIN GROUP (ORDER BY "{column}")',
+    "clickhouse": 'quantileExactLow({pct})("{column}")',
+    "mysql": None,
+    "sqlite": None,
+}
+
+
+def _percentile_disc(dialect, driver, column, pct):
+    """Returns the SQL expression to compute a percentile of a column"""
+    template = _PERCENTILE_DISC.get(dialect, _PERCENTILE_DISC["default"])
+
+    if template is None:
+        raise exceptions.RuntimeError(
+            f"\n{dialect} ({driver}) doesn't support percentile_disc, which is "
+            "required to compute the boxplot statistics."
+        )
 
+    return template.format(pct=float(pct), column=column)
+
+
+def _summary_stats_many(conn, table, columns, percentiles=(), with_=None, approx=False):
+    """
+    Compute quartiles, mean, count, minimum and maximum (plus any extra
+    ``percentiles``) of each column in a single query, returns a list of
+    dictionaries (one per column).
+
+    If ``approx=True``, it computes the percentiles with the database's
+    approximate functions or on a sample of the table if it doesn't have them
+    (the rest of the statistics are exact), and adds a description of their
+    error (``approx``) to each dictionary
+    """
     if not conn:
         conn = sql.connection.Connection.current
-    driver = conn._get_curr_sqlalchemy_connection_info()["driver"]
+    info = conn._get_curr_sqlalchemy_connection_info()
+    dialect, driver = info["dialect"], info["driver"]
+
+    use_functions = approx and sql.approx.quantile(dialect, "x", 0.5) is not None
+    # sampling a CTE isn't supported by all databases
+    sample = (
+        sql.approx.tablesample(dialect)
+        if approx and not use_functions and not with_
+        else None
+    )
+
+    def percentile(column, pct):
+        if use_functions:
+            return sql.approx.quantile(dialect, f'"{column}"', pct)
+
+        return _percentile_disc(dialect, driver, column, pct)
+
+    others, quantiles = [], []
+
+    for column in columns:
+        others.extend(
+            [
+                f'AVG("{column}")',
+                "COUNT(*)",
+                f'MIN("{column}")',
+                f'MAX("{column}")',
+            ]
+        )
+        quantiles.extend(
+            [percentile(column, pct) for pct in (0.25, 0.50, 0.75, *percentiles)]
+        )
 
     template = Template(
         """
+{% if sample %}
+SELECT * FROM (
     SELECT
-    percentile_disc([0.25, 0.50, 0.75]) WITHIN GROUP \
-    (ORDER BY "{{column}}") AS percentiles,
-    AVG("{{column}}") AS mean,
-    COUNT(*) AS N
+    {{others | join(",\n")}}
     FROM "{{table}}"
+) AS _full, (
+    SELECT
+    {{quantiles | join(",\n")}},
+    COUNT(*)
+    FROM "{{table}}" {{sample}}
+) AS _sample
+{% else %}
+SELECT
+{{(others + quantiles) | join(",\n")}}
+FROM "{{table}}"
+{% endif %}
 """
     )
 
-    query = template.render(table=table, column=column)
+    query = template.render(
+        table=table, others=others, quantiles=quantiles, sample=sample
+    )
 
     try:
         values = conn.execute(query, with_).fetchone()
@@ -57,87 +135,147 @@ def _summary_stats(conn, table, column, with_=None):
     except Exception as e:
         raise e
 
-    keys = ["q1", "med", "q3", "mean", "N"]
-    return {k: float(v) for k, v in zip(keys, flatten(values))}
+    if sample and not values[-1]:
+        # the sample is empty (a small table), compute the exact percentiles
+        stats = _summary_stats_many(conn, table, columns, percentiles, with_)
 
+        for column_stats in stats:
+            column_stats["approx"] = sql.approx.EXACT_SMALL
 
-def _whishi(conn, table, column, hival, with_=None):
-    if not conn:
-        conn = sql.connection.Connection.current
-    template = Template(
-        """
-SELECT COUNT(*), MAX("{{column}}")
-FROM (
-    SELECT "{{column}}"
-    FROM "{{table}}"
-    WHERE "{{column}}" <= {{hival}}
-) AS _whishi
-"""
-    )
+        return stats
 
-    query = template.render(table=table, column=column, hival=hival)
+    if use_functions:
+        note = sql.approx.QUANTILE_ERROR
+    elif sample:
+        note = sql.approx.describe_sample(int(values[-1]))
+    else:
+        note = sql.approx.EXACT
 
-    values = conn.execute(query, with_).fetchone()
-    keys = ["N", "wiskhi_max"]
-    return {k: float(v) for k, v in zip(keys, values)}
+    size = 3 + len(percentiles)
+    offset = len(others)
+    stats = []
 
+    for i in range(len(columns)):
+        mean, N, min_, max_ = [float(v) for v in values[i * 4 : (i + 1) * 4]]
+        q1, med, q3, *extra = [
+            float(v) for v in values[offset + i * size : offset + (i + 1) * size]
+        ]
+        column_stats = dict(q1=q1, med=med, q3=q3, mean=mean, N=N, min=min_, max=max_)
+        column_stats["percentiles"] = extra
 
-def _whislo(conn, table, column, loval, with_=None):
-    if not conn:
-        conn = sql.connection.Connection.current
-    template = Template(
-        """
-SELECT COUNT(*), MIN("{{column}}")
-FROM (
-    SELECT "{{column}}"
-    FROM "{{table}}"
-    WHERE "{{column}}" >= {{loval}}
-) AS _whislo
-"""
-    )
+        if approx:
+            column_stats["approx"] = note
 
-    query = template.render(table=table, column=column, loval=loval)
+        stats.append(column_stats)
 
-    values = conn.execute(query, with_).fetchone()
-    keys = ["N", "wisklo_min"]
-    return {k: float(v) for k, v in zip(keys, values)}
+    return stats
 
 
-def _percentile(conn, table, column, pct, with_=None):
-    if not conn:
-        conn = sql.connection.Connection.current.session
+def _summary_stats(conn, table, column, with_=None):
+    """Compute percentiles and mean for boxplot"""
+    stats = _summary_stats_many(conn, table, [column], with_=with_)[0]
+    return {key: stats[key] for key in ["q1", "med", "q3", "mean", "N"]}
+
+
+def _whiskers_and_fliers(conn, table, columns, bounds, max_fliers=None, with_=None):
+    """
+    Compute the lowest/highest values within ``bounds`` (one ``(low, high)``
+    tuple per column), the number of values outside them, and the values
+    outside them in a single query. Returns a list of ``(lowest, highest,
+    count)`` tuples and a list with the values outside the bounds of each
+    column.
+
+    If ``max_fliers`` is not None, it returns at most ``max_fliers`` values per
+    column: the most extreme half and an evenly spaced sample of the rest
+    (ranked by how far they are from the bounds), so the rows sent by the
+    database don't depend on the size of the table
+    """
     template = Template(
         """
-SELECT
-percentile_disc({{pct}}) WITHIN GROUP (ORDER BY "{{column}}") AS pct,
+{% for column, low, high in items %}
+{% if not loop.first %}UNION ALL{% endif %}
+SELECT {{loop.index0}} AS _column, 'whiskers' AS _kind,
+MIN(CASE WHEN "{{column}}" >= {{low}} THEN "{{column}}" END) AS _low,
+MAX(CASE WHEN "{{column}}" <= {{high}} THEN "{{column}}" END) AS _high,
+COUNT(CASE WHEN "{{column}}" < {{low}} OR "{{column}}" > {{high}} THEN 1 END) AS _count
+FROM "{{table}}"
+{% endfor %}
+{% for column, low, high in items if max_fliers != 0 %}
+UNION ALL
+{% if max_fliers is none %}
+SELECT {{loop.index0}}, 'flier', "{{column}}", NULL, NULL
 FROM "{{table}}"
+WHERE "{{column}}" < {{low}}
+OR "{{column}}" > {{high}}
+{% else %}
+SELECT {{loop.index0}}, 'flier', _value, NULL, NULL
+FROM (
+    SELECT "{{column}}" AS _value,
+    ROW_NUMBER() OVER (
+        ORDER BY CASE WHEN "{{column}}" > {{high}} THEN "{{column}}" - {{high}}
+        ELSE {{low}} - "{{column}}" END DESC
+    ) AS _rank,
+    COUNT(*) OVER () AS _count
+    FROM "{{table}}"
+    WHERE "{{column}}" < {{low}}
+    OR "{{column}}" > {{high}}
+) AS _fliers_{{loop.index0}}
+WHERE _rank <= {{extreme}}
+OR FLOOR((_rank - {{extreme}}) * 1.0 * {{sampled}} / NULLIF(_count - {{extreme}}, 0))
+> FLOOR((_rank - {{extreme}} - 1) * 1.0 * {{sampled}} / NULLIF(_count - {{extreme}}, 0))
+{% endif %}
+{% endfor %}
 """
     )
-    query = template.render(table=table, column=column, pct=pct)
 
-    values = conn.execute(query, with_).fetchone()[0]
-    return values
+    items = [
+        (column, float(low), float(high))
+        for column, (low, high) in zip(columns, bounds)
+    ]
 
+    # the most extreme values, the rest of the budget is a sample of the others
+    extreme = None if max_fliers is None else (max_fliers + 1) // 2
+    sampled = None if max_fliers is None else max_fliers - extreme
 
-def _between(conn, table, column, whislo, whishi, with_=None):
-    template = Template(
-        """
-SELECT "{{column}}"
-FROM "{{table}}"
-WHERE "{{column}}" < {{whislo}}
-OR  "{{column}}" > {{whishi}}
-"""
+    query = template.render(
+        table=table,
+        items=items,
+        max_fliers=max_fliers,
+        extreme=extreme,
+        sampled=sampled,
     )
-    query = template.render(table=table, column=column, whislo=whislo, whishi=whishi)
 
-    results = [float(n[0]) for n in conn.execute(query, with_).fetchall()]
-    return results
+    whiskers = [None] * len(columns)
+    fliers = [[] for _ in columns]
+
+    for i, kind, value, high, count in conn.execute(query, with_).fetchall():
+        if kind == "whiskers":
+            whiskers[i] = (value, high, int(count))
+        else:
+            fliers[i].append(float(value))
+
+    return whiskers, fliers
 
 
 # https://github.com/matplotlib/matplotlib/blob/b5ac96a8980fdb9e59c9fb649e0714d776e26701/lib/matplotlib/cbook/__init__.py
 @modify_exceptions
-def _boxplot_stats(conn, table, column, whis=1.5, autorange=False, with_=None):
-    """Compute statistics required to create a boxplot"""
+def _boxplot_stats_many(
+    conn,
+    table,
+    columns,
+    whis=1.5,
+    autorange=False,
+    with_=None,
+    max_fliers=None,
+    approx=False,
+):
+    """
+    Compute the statistics required to create a boxplot of each column (two
+    queries regardless of the number of columns). If ``max_fliers`` is not None,
+    it retrieves at most ``max_fliers`` outliers per column and adds their total
+    number (``nfliers``) to the statistics. If ``approx=True``, the quartiles
+    are approximate and the statistics describe their error (``approx``)
+    """
     if not conn:
         conn = sql.connection.Connection.current
 
@@ -150,67 +288,121 @@ def _boxplot_stats(conn, table, column, whis=1.5, autorange=False, with_=None):
 
         return notch_min, notch_max
 
-    stats = dict()
+    if np.iterable(whis) and not isinstance(whis, str):
+        # whis has percentiles (0-100)
+        percentiles = [whis[0] / 100, whis[1] / 100]
+    elif not isinstance(whis, str) and np.isreal(whis):
+        percentiles = []
+    else:
+        raise ValueError("whis must be a float or list of percentiles")
 
-    # arithmetic mean
-    s_stats = _summary_stats(conn, table, column, with_=with_)
+    summaries = _summary_stats_many(
+        conn, table, columns, percentiles=percentiles, with_=with_, approx=approx
+    )
 
-    stats["mean"] = s_stats["mean"]
-    q1, med, q3 = s_stats["q1"], s_stats["med"], s_stats["q3"]
-    N = s_stats["N"]
+    all_stats, bounds = [], []
 
-    # interquartile range
-    stats["iqr"] = q3 - q1
+    for s_stats in summaries:
+        stats = dict()
 
-    if stats["iqr"] == 0 and autorange:
-        whis = (0, 100)
+        # arithmetic mean
+        stats["mean"] = s_stats["mean"]
+        q1, med, q3 = s_stats["q1"], s_stats["med"], s_stats["q3"]
+        N = s_stats["N"]
 
-    # conf. interval around median
-    stats["cilo"], stats["cihi"] = _compute_conf_interval(N, med, stats["iqr"])
+        # interquartile range
+        stats["iqr"] = q3 - q1
 
-    # lowest/highest non-outliers
-    if np.iterable(whis) and not isinstance(whis, str):
-        loval, hival = _percentile(conn, table, column, whis, with_=with_)
+        # conf. interval around median
+        stats["cilo"], stats["cihi"] = _compute_conf_interval(N, med, stats["iqr"])
 
-    elif np.isreal(whis):
-        loval = q1 - whis * stats["iqr"]
-        hival = q3 + whis * stats["iqr"]
-    else:
-        raise ValueError("whis must be a float or list of percentiles")
+        # lowest/highest non-outliers
+        if stats["iqr"] == 0 and autorange:
+            loval, hival = s_stats["min"], s_stats["max"]
+        elif percentiles:
+            loval, hival = s_stats["percentiles"]
+        else:
+            loval = q1 - whis * stats["iqr"]
+            hival = q3 + whis * stats["iqr"]
 
-    # get high extreme
-    wiskhi_d = _whishi(conn, table, column, hival, with_=with_)
+        stats["q1"], stats["med"], stats["q3"] = q1, med, q3
 
-    if wiskhi_d["N"] == 0 or wiskhi_d["wiskhi_max"] < q3:
-        stats["whishi"] = q3
-    else:
-        stats["whishi"] = wiskhi_d["wiskhi_max"]
+        if approx:
+            stats["approx"] = s_stats["approx"]
 
-    # get low extreme
-    wisklo_d = _whislo(conn, table, column, loval, with_=with_)
+        all_stats.append(stats)
 
-    if wisklo_d["N"] == 0 or wisklo_d["wisklo_min"] > q1:
-        stats["whislo"] = q1
-    else:
-        stats["whislo"] = wisklo_d["wisklo_min"]
+        # the whiskers are clipped to the quartiles (q1 and q3 are values in the
+        # column, so the whiskers are beyond them unless loval > q1 or
+        # hival < q3), clipping the bounds gives the same whiskers and makes the
+        # values outside the bounds the outliers
+        bounds.append((min(loval, q1), max(hival, q3)))
 
-    # compute a single array of outliers
-    stats["fliers"] = np.array(
-        _between(conn, table, column, stats["whislo"], stats["whishi"], with_=with_)
+    whiskers, fliers = _whiskers_and_fliers(
+        conn, table, columns, bounds, max_fliers=max_fliers, with_=with_
     )
 
-    # add in the remaining stats
-    stats["q1"], stats["med"], stats["q3"] = q1, med, q3
+    for column, stats, (wisklo, wiskhi, count), values in zip(
+        columns, all_stats, whiskers, fliers
+    ):
+        # get high/low extremes (None if the column only has NULLs)
+        stats["whishi"] = stats["q3"] if wiskhi is None else float(wiskhi)
+        stats["whislo"] = stats["q1"] if wisklo is None else float(wisklo)
+
+        # compute a single array of outliers
+        stats["fliers"] = np.array(values)
+
+        if max_fliers is not None:
+            stats["nfliers"] = count
+
+            if count > len(values):
+                warnings.warn(
+                    f"{column!r} has {count:,} outliers, showing {len(values):,} "
+                    "(the most extreme ones and a sample of the rest). "
+                    "Increase max_fliers to show more"
+                )
+
+    return all_stats
 
-    bxpstats = {k: v for k, v in stats.items()}
 
-    return bxpstats
+def _boxplot_stats(
+    conn,
+    table,
+    column,
+    whis=1.5,
+    autorange=False,
+    with_=None,
+    max_fliers=None,
+    approx=False,
+):
+    """Compute statistics required to create a boxplot"""
+    return _boxplot_stats_many(
+        conn,
+        table,
+        [column],
+        whis=whis,
+        autorange=autorange,
+        with_=with_,
+        max_fliers=max_fliers,
+        approx=approx,
+    )[0]
 
 
 # https://github.com/matplotlib/matplotlib/blob/ddc260ce5a53958839c244c0ef0565160aeec174/lib/matplotlib/axes/_axes.py#L3915
 @requires(["matplotlib"])
 @telemetry.log_call("boxplot", payload=True)
-def boxplot(payload, table, column, *, orient="v", with_=None, conn=None, ax=None):
+def boxplot(
+    payload,
+    table,
+    column,
+    *,
+    orient="v",
+    with_=None,
+    conn=None,
+    ax=None,
+    max_fliers=MAX_FLIERS,
+    approx=False,
+):
     """Plot boxplot
 
     Parameters
@@ -227,8 +419,20 @@ def boxplot(payload, table, column, *, orient="v", with_=None, conn=None, ax=Non
     conn : connection, default=None
         Database connection. If None, it uses the current connection
 
+    max_fliers : int, default=1000
+        Maximum number of outliers to retrieve (and plot) per column: the most
+        extreme ones and a sample of the rest. If None, it retrieves all of them
+
+    approx : bool, default=False
+        Compute approximate quartiles (using the database's approximate
+        functions, or a sample of the table if it doesn't have them), the plot
+        title states their error
+
     Notes
     -----
+    .. versionchanged:: 0.7.5
+        Added ``max_fliers`` and ``approx`` arguments
+
     .. versionchanged:: 0.5.2
         Added ``with_``, and ``orient`` arguments. Added plot title and axis labels.
         Allowing to pass lists in ``column``. Function returns a ``matplotlib.Axes``
@@ -268,38 +472,47 @@ def boxplot(payload, table, column, *, orient="v", with_=None, conn=None, ax=Non
     set_ticklabels = ax.set_xticklabels if vert else ax.set_yticklabels
     set_label = ax.set_ylabel if vert else ax.set_xlabel
 
+    columns = [column] if isinstance(column, str) else column
+    stats = _boxplot_stats_many(
+        conn, table, columns, with_=with_, max_fliers=max_fliers, approx=approx
+    )
+    ax.bxp(stats, vert=vert)
+
     if isinstance(column, str):
-        stats = [_boxplot_stats(conn, table, column, with_=with_)]
-        ax.bxp(stats, vert=vert)
-        ax.set_title(f"{column!r} from {table!r}")
+        title = f"{column!r} from {table!r}"
         set_label(column)
-        set_ticklabels([column])
     else:
-        stats = [_boxplot_stats(conn, table, col, with_=with_) for col in column]
-        ax.bxp(stats, vert=vert)
-        ax.set_title(f"Boxplot from {table!r}")
-        set_ticklabels(column)
+        title = f"Boxplot from {table!r}"
+
+    if approx:
+        title += f"\n(approximate quartiles: {stats[0]['approx']})"
+
+    ax.set_title(title)
+    set_ticklabels(columns)
 
     return ax
 
 
-def _min_max(con, table, column, with_=None, use_backticks=False):
+def _min_max_many(con, table, columns, with_=None, use_backticks=False):
+    """Compute the minimum and maximum of each column in a single query"""
     if not con:
         con = sql.connection.Connection.current
     template_ = """
 SELECT
+{% for column in columns %}
     MIN("{{column}}"),
-    MAX("{{column}}")
+    MAX("{{column}}"){% if not loop.last %},{% endif %}
+{% endfor %}
 FROM "{{table}}"
 """
     if use_backticks:
         template_ = template_.replace('"', "`")
 
     template = Template(template_)
-    query = template.render(table=table, column=column)
+    query = template.render(table=table, columns=columns)
 
-    min_, max_ = con.execute(query, with_).fetchone()
-    return min_, max_
+    values = con.execute(query, with_).fetchone()
+    return [tuple(values[i : i + 2]) for i in range(0, len(values), 2)]
 
 
 def _are_numeric_values(*values):
@@ -397,15 +610,14 @@ def histogram(
 
         bin_, height, bin_size = _histogram(table, column, bins, with_=with_, conn=conn)
         width = _get_bar_width(ax, bin_)
-        data = _histogram_stacked(
+        categories, heights = _histogram_stacked(
             table, column, category, bin_, bin_size, with_=with_, conn=conn, facet=facet
         )
         cmap = plt.get_cmap(cmap or "viridis")
-        norm = Normalize(vmin=0, vmax=len(data))
+        norm = Normalize(vmin=0, vmax=len(categories))
 
         bottom = np.zeros(len(bin_))
-        for i, values in enumerate(data):
-            values_ = values[1:]
+        for i, (label, values_) in enumerate(zip(categories, heights)):
 
             if isinstance(color, list):
                 color_ = color[0]
@@ -428,7 +640,7 @@ def histogram(
                 bin_,
                 values_,
                 align="center",
-                label=values[0],
+                label=label,
                 width=width,
                 bottom=bottom,
                 edgecolor=edgecolor_,
@@ -457,10 +669,11 @@ def histogram(
         ax.set_xlabel(column)
 
     else:
-        for i, col in enumerate(column):
-            bin_, height, _ = _histogram(
-                table, col, bins, with_=with_, conn=conn, facet=facet
-            )
+        histograms = _histogram_many(
+            table, column, bins, with_=with_, conn=conn, facet=facet
+        )
+
+        for i, (col, (bin_, height, _)) in enumerate(zip(column, histograms)):
             width = _get_bar_width(ax, bin_)
 
             if isinstance(color, list):
@@ -494,34 +707,72 @@ def histogram(
 @modify_exceptions
 def _histogram(table, column, bins, with_=None, conn=None, facet=None):
     """Compute bins and heights"""
+    histograms = _histogram_many(
+        table, [column], bins, with_=with_, conn=conn, facet=facet
+    )
+    return histograms[0]
+
+
+@modify_exceptions
+def _histogram_many(table, columns, bins, with_=None, conn=None, facet=None):
+    """
+    Compute bins and heights of each column, returns a list of ``(bins,
+    heights, bin_size)`` tuples (one per column). The numeric columns are
+    binned in a single scan of the table, regardless of their number
+    """
     if not conn:
         conn = sql.connection.Connection.current
     use_backticks = conn.is_use_backtick_template()
 
-    # FIXME: we're computing all the with elements twice
-    min_, max_ = _min_max(conn, table, column, with_=with_, use_backticks=use_backticks)
+    # the minimum and maximum of all columns are computed in a single query
+    # since whether a column is numeric depends on its values (e.g., SQLite is
+    # dynamically typed). FIXME: we're computing all the with elements twice
+    # (unless SqlMagic.materialize_snippets is enabled)
+    bounds = _min_max_many(
+        conn, table, columns, with_=with_, use_backticks=use_backticks
+    )
 
     filter_query = f"WHERE {facet['key']} == '{facet['value']}'" if facet else ""
 
-    bin_size = None
+    # column index -> bin size
+    bin_sizes = {}
 
-    if _are_numeric_values(min_, max_):
-        if not isinstance(bins, int):
-            raise ValueError(
-                f"bins are '{bins}'. Please specify a valid number of bins."
-            )
+    for i, (min_, max_) in enumerate(bounds):
+        if _are_numeric_values(min_, max_):
+            if not isinstance(bins, int):
+                raise ValueError(
+                    f"bins are '{bins}'. Please specify a valid number of bins."
+                )
 
-        range_ = max_ - min_
-        bin_size = range_ / bins
+            range_ = max_ - min_
+            bin_sizes[i] = range_ / bins
 
+    data = [[] for _ in columns]
+
+    if bin_sizes:
+        # each row is repeated once per numeric column, so all of them are
+        # binned in the same scan
         template_ = """
-            select
-            floor("{{column}}"/{{bin_size}})*{{bin_size}} as bin,
-            count(*) as count
-            from "{{table}}"
-            {{filter_query}}
-            group by bin
-            order by bin;
+            select _column, _bin, count(*) as count
+            from (
+                select _columns._column,
+                case _columns._column
+                {% for i, bin_size in bin_sizes.items() %}
+                    when {{i}} then
+                    floor("{{columns[i]}}"/{{bin_size}})*{{bin_size}}
+                {% endfor %}
+                end as _bin
+                from "{{table}}"
+                cross join (
+                {% for i in bin_sizes %}
+                    {% if not loop.first %}union all{% endif %}
+                    select {{i}} as _column
+                {% endfor %}
+                ) as _columns
+                {{filter_query}}
+            ) as _bins
+            group by _column, _bin
+            order by _column, _bin;
             """
 
         if use_backticks:
@@ -530,9 +781,19 @@ def _histogram(table, column, bins, with_=None, conn=None, facet=None):
         template = Template(template_)
 
         query = template.render(
-            table=table, column=column, bin_size=bin_size, filter_query=filter_query
+            table=table,
+            columns=columns,
+            bin_sizes=bin_sizes,
+            filter_query=filter_query,
         )
-    else:
+
+        for i, bin_, count in conn.execute(query, with_).fetchall():
+            data[i].append((bin_, count))
+
+    for i, column in enumerate(columns):
+        if i in bin_sizes:
+            continue
+
         template_ = """
         select
             "{{column}}" as col, count ({{column}})
@@ -549,14 +810,19 @@ def _histogram(table, column, bins, with_=None, conn=None, facet=None):
 
         query = template.render(table=table, column=column, filter_query=filter_query)
 
-    data = conn.execute(query, with_).fetchall()
+        data[i] = conn.execute(query, with_).fetchall()
 
-    bin_, height = zip(*data)
+    histograms = []
 
-    if bin_[0] is None:
-        raise ValueError("Data contains NULLs")
+    for i, column_data in enumerate(data):
+        bin_, height = zip(*column_data)
 
-    return bin_, height, bin_size
+        if bin_[0] is None:
+            raise ValueError("Data contains NULLs")
+
+        histograms.append((bin_, height, bin_sizes.get(i)))
+
+    return histograms
 
 
 @modify_exceptions
@@ -570,27 +836,24 @@ def _histogram_stacked(
     conn=None,
     facet=None,
 ):
-    """Compute the corresponding heights of each bin based on the category"""
+    """
+    Compute the corresponding heights of each bin based on the category,
+    returns the categories and an array with the heights (one row per category
+    and one column per bin)
+    """
     if not conn:
         conn = sql.connection.Connection.current
 
-    cases = []
-    for bin in bins:
-        case = f'SUM(CASE WHEN FLOOR({column}/{bin_size})*{bin_size} = {bin} \
-                 THEN 1 ELSE 0 END) AS "{bin}",'
-        cases.append(case)
-
-    cases = " ".join(cases)
-
     filter_query = f"WHERE {facet['key']} == '{facet['value']}'" if facet else ""
 
     template = Template(
         """
         SELECT {{category}},
-        {{cases}}
+        FLOOR({{column}}/{{bin_size}})*{{bin_size}} AS _bin,
+        COUNT(*)
         FROM "{{table}}"
         {{filter_query}}
-        GROUP BY {{category}};
+        GROUP BY {{category}}, _bin;
         """
     )
     query = template.render(
@@ -599,9 +862,21 @@ def _histogram_stacked(
         bin_size=bin_size,
         category=category,
         filter_query=filter_query,
-        cases=cases,
     )
 
     data = conn.execute(query, with_).fetchall()
 
-    return data
+    # categories in the order they're returned, rows with NULLs in the column
+    # (not in any bin) are ignored
+    categories = list(dict.fromkeys(category for category, _, _ in data))
+    category_index = {category: i for i, category in enumerate(categories)}
+    bin_index = {bin_: i for i, bin_ in enumerate(bins)}
+    data = [row for row in data if row[1] in bin_index]
+
+    heights = np.zeros((len(categories), len(bins)), dtype=int)
+    heights[
+        [category_index[category] for category, _, _ in data],
+        [bin_index[bin_] for _, bin_, _ in data],
+    ] = [count for _, _, count in data]
+
+    return categories, heights
@@ -0,0 +1,108 @@
+"""
+Register data frames and Arrow tables from the user's namespace as DuckDB views
+(``%sql --register``) so queries read them directly instead of copying them to a
+table with ``--persist``. Views only exist while the cell runs (or while
+``--paginate`` fetches a page)
+"""
+import sqlalchemy
+
+from sql import exceptions
+from sql.persist import is_arrow, to_arrow
+
+try:
+    from pandas import DataFrame, Series
+except ModuleNotFoundError:
+    DataFrame = None
+    Series = None
+
+
+def parse_names(value):
+    """Parse the comma-separated variable names passed to --register"""
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _get_duckdb_connection(conn):
+    """Returns the DuckDB connection (DB-API) or None for other databases"""
+    session = conn.session
+
+    if isinstance(session.engine, sqlalchemy.engine.Engine):
+        if session.engine.dialect.name != "duckdb":
+            return None
+
+        return session.connection.driver_connection
+
+    # custom connections hold the DB-API connection
+    if type(session.engine).__module__.split(".")[0] == "duckdb":
+        return session.engine
+
+    return None
+
+
+def get_objects(conn, names, user_ns):
+    """
+    Returns the variables in ``user_ns`` to register (a dictionary with the
+    objects to pass to DuckDB)
+    """
+    if _get_duckdb_connection(conn) is None:
+        raise exceptions.UsageError(
+            "--register is only supported with DuckDB connections, "
+            "use --persist to create a table instead"
+        )
+
+    objects = {}
+
+    for name in names:
+        if not name.isidentifier():
+            raise exceptions.UsageError(
+                f"Expected {name!r} to be a data frame but it's not a valid identifier"
+            )
+
+        if name not in user_ns:
+            raise exceptions.UsageError(
+                f"Expected {name!r} to be a data frame but it's undefined"
+            )
+
+        obj = user_ns[name]
+
+        if is_arrow(obj):
+            obj = to_arrow(obj)
+        elif Series is not None and isinstance(obj, Series):
+            obj = obj.to_frame()
+        elif DataFrame is None or not isinstance(obj, DataFrame):
+            raise exceptions.TypeError(
+                f"{name!r} is not a Pandas DataFrame or Series, "
+                "a Polars DataFrame, or a PyArrow Table"
+            )
+
+        objects[name] = obj
+
+    return objects
+
+
+def register(conn, objects):
+    """Register the objects returned by ``get_objects`` as DuckDB views, returns
+    their names
+    """
+    if not objects:
+        return []
+
+    duckdb_connection = _get_duckdb_connection(conn)
+    registered = []
+
+    try:
+        for name, obj in objects.items():
+            duckdb_connection.register(name, obj)
+            registered.append(name)
+    except Exception:
+        unregister(conn, registered)
+        raise
+
+    return registered
+
+
+def unregister(conn, names):
+    """Remove the views created by ``register``"""
+    duckdb_connection = _get_duckdb_connection(conn)
+
+    for name in names:
+        duckdb_connection.unregister(name)
@@ -1,17 +1,16 @@
-import codecs
-import csv
 import operator
 import os.path
-import re
+import time
 from functools import reduce
 from io import StringIO
-import html
 
 import prettytable
 import sqlalchemy
-import sqlparse
+from sql.parse import is_query, split_statements
 from sql.connection import Connection
+from sql.cache import result_cache
 from sql import exceptions
+from sql import adapters, arrow, columnar, export
 from .column_guesser import ColumnGuesserMixin
 
 try:
@@ -39,35 +38,6 @@ def unduplicate_field_names(field_names):
     return res
 
 
-class UnicodeWriter(object):
-    """
-    A CSV writer which will write rows to CSV file "f",
-    which is encoded in the given encoding.
-    """
-
-    def __init__(self, f, dialect=csv.excel, encoding="utf-8", **kwds):
-        # Redirect output to a queue
-        self.queue = StringIO()
-        self.writer = csv.writer(self.queue, dialect=dialect, **kwds)
-        self.stream = f
-        self.encoder = codecs.getincrementalencoder(encoding)()
-
-    def writerow(self, row):
-        _row = row
-        self.writer.writerow(_row)
-        # Fetch UTF-8 output from the queue ...
-        data = self.queue.getvalue()
-        # write to the target stream
-        self.stream.write(data)
-        # empty queue
-        self.queue.truncate(0)
-        self.queue.seek(0)
-
-    def writerows(self, rows):
-        for row in rows:
-            self.writerow(row)
-
-
 class CsvResultDescriptor(object):
     """
     Provides IPython Notebook-friendly output for the
@@ -86,18 +56,51 @@ class CsvResultDescriptor(object):
         )
 
 
-def _nonbreaking_spaces(match_obj):
+# values of these types are rendered with str() (no escaping, links or spaces)
+_HTML_PLAIN_TYPES = frozenset({int, float, bool, type(None)})
+
+
+def _html_cell(value):
     """
-    Make spaces visible in HTML by replacing all `` `` with ``&nbsp;``
+    Render a value as the content of a <td> tag: links (strings starting with
+    "http") are clickable, line breaks are converted to <br> and leading spaces
+    to &nbsp; (so they're visible)
+    """
+    if type(value) in _HTML_PLAIN_TYPES:
+        return str(value)
+
+    if isinstance(value, str) and value.startswith("http"):
+        text = "<a href={}>{}</a>".format(value, value)
+    else:
+        text = str(value)
+
+    text = text.replace("\n", "<br>")
+
+    if text.startswith("  "):
+        stripped = text.lstrip(" ")
+        text = "&nbsp;" * (len(text) - len(stripped)) + stripped
+
+    return text
+
 
-    Call with a ``re`` match object.  Retain group 1, replace group 2
-    with nonbreaking speaces.
+def _html_table(field_names, rows):
     """
-    spaces = "&nbsp;" * len(match_obj.group(2))
-    return "%s%s" % (match_obj.group(1), spaces)
+    Render the rows as an HTML table (same output as PrettyTable.get_html_string),
+    the cost is linear in the number of cells
+    """
+    lines = ["<table>", "    <thead>", "        <tr>"]
+    lines.extend(
+        "            <th>%s</th>" % field.replace("\n", "<br>") for field in field_names
+    )
+    lines.extend(["        </tr>", "    </thead>", "    <tbody>"])
 
+    for row in rows:
+        lines.append("        <tr>")
+        lines.extend("            <td>%s</td>" % _html_cell(value) for value in row)
+        lines.append("        </tr>")
 
-_cell_with_spaces_pattern = re.compile(r"(<td>)( {2,})")
+    lines.extend(["    </tbody>", "</table>"])
+    return "\n".join(lines)
 
 
 class ResultSet(ColumnGuesserMixin):
@@ -105,12 +108,35 @@ class ResultSet(ColumnGuesserMixin):
     Results of a SQL query.
 
     Can access rows listwise, or by string value of leftmost column.
+
+    By default, all rows (up to ``autolimit``) are fetched when the object is
+    created. If ``config.lazy_fetch`` is enabled, the cursor is kept open and rows
+    are fetched in batches of ``config.fetch_batch_size`` only when they're needed
+    (e.g., displaying the first ``displaylimit`` rows only fetches those rows).
+    Pass ``to_data_frame=True`` if the results are converted to a data frame right
+    away, so the conversion fetches them (``lazy=False`` always fetches them)
     """
 
-    def __init__(self, sqlaproxy, config):
+    def __init__(
+        self, sqlaproxy, config, adapter=None, lazy=None, to_data_frame=False
+    ):
         self.config = config
         self.keys = {}
-        self._results = []
+        self._rows = []
+        # rows fetched with the adapter's native methods (e.g., a pyarrow.Table)
+        self._native = None
+        self._sqlaproxy = sqlaproxy
+        self._adapter = adapter or adapters.get_adapter(results=sqlaproxy)
+        self._done_fetching = True
+        # rendered HTML tables, keyed by (displaylimit, style)
+        self._html_cache = {}
+        # hash indexes (see index_by), keyed by column position
+        self._indexes = {}
+        # True if the rows that hadn't been fetched were discarded (see _detach)
+        self.truncated = False
+        self._warned_truncated = False
+        # True if the rows were streamed to a file without storing them (see export)
+        self._consumed = False
 
         # https://peps.python.org/pep-0249/#description
         is_dbapi_results = hasattr(sqlaproxy, "description")
@@ -132,10 +158,16 @@ class ResultSet(ColumnGuesserMixin):
                 self.keys = []
 
             if len(self.keys) > 0:
-                if isinstance(config.autolimit, int) and config.autolimit > 0:
-                    self._results = sqlaproxy.fetchmany(size=config.autolimit)
-                else:
-                    self._results = sqlaproxy.fetchall()
+                self._done_fetching = False
+                self._rows = self._new_rows()
+
+                # if the results are converted to a data frame right away
+                # (to_data_frame=True), let DataFrame()/PolarsDataFrame() fetch them
+                # (in Arrow format if the driver supports it)
+                lazy = config.lazy_fetch if lazy is None else lazy
+
+                if not (lazy or to_data_frame):
+                    self._fetch_all()
 
                 self.field_names = unduplicate_field_names(self.keys)
 
@@ -146,30 +178,288 @@ class ResultSet(ColumnGuesserMixin):
 
                 self.pretty = PrettyTable(self.field_names, style=_style)
 
+    def _new_rows(self):
+        """Returns an empty container for the rows (a list, or a ColumnarRows
+        object if columnar_storage is enabled)
+        """
+        if self.config.columnar_storage:
+            return columnar.ColumnarRows(len(self.keys))
+
+        return []
+
+    @property
+    def _is_columnar(self):
+        return isinstance(self._results, columnar.ColumnarRows)
+
+    @property
+    def _results(self):
+        if self._consumed:
+            raise exceptions.RuntimeError(
+                "The results were streamed to a file with .export() and are no "
+                "longer available, run the query again to access them"
+            )
+
+        if self.truncated and not self._warned_truncated:
+            self._warned_truncated = True
+            warnings.warn(
+                f"The results only contain the {self.rows_fetched} rows fetched "
+                "before running another query in the same connection, run the "
+                "query again to access all of them"
+            )
+
+        if self._rows is None:
+            # rows were fetched with a native method, convert them to tuples
+            rows = _to_rows(self._native)
+
+            if self.config.columnar_storage:
+                self._rows = self._new_rows()
+                self._rows.extend(rows)
+            else:
+                self._rows = rows
+
+        return self._rows
+
+    @property
+    def _limit(self):
+        """Maximum number of rows to fetch (``None`` means no limit)"""
+        autolimit = self.config.autolimit
+        return autolimit if isinstance(autolimit, int) and autolimit > 0 else None
+
+    @property
+    def _batch_size(self):
+        batch_size = self.config.fetch_batch_size
+        return batch_size if isinstance(batch_size, int) and batch_size > 0 else 1000
+
+    @property
+    def rows_fetched(self):
+        """Number of rows fetched from the database so far"""
+        if self._rows is None:
+            return len(self._native)
+
+        return len(self._rows)
+
+    @property
+    def done_fetching(self):
+        """True if all the rows have been fetched from the database"""
+        return self._done_fetching
+
+    def _mark_fetching_as_done(self):
+        self._done_fetching = True
+
+    def _close(self):
+        """
+        Close the cursor once autolimit is reached so the database can discard the
+        remaining rows (e.g., when using server-side cursors)
+        """
+        if isinstance(self._sqlaproxy, sqlalchemy.engine.CursorResult):
+            self._sqlaproxy.close()
+
+    def _detach(self):
+        """
+        Stop fetching rows, the rows fetched so far are kept. Called before running
+        another query in the same connection
+        """
+        if self._done_fetching:
+            return
+
+        self._close()
+        self._mark_fetching_as_done()
+        self.truncated = True
+
+    def _fetch_many(self, size):
+        """Fetch up to ``size`` more rows from the cursor (respecting autolimit)"""
+        if self._done_fetching:
+            return
+
+        if self._limit is not None:
+            size = min(size, self._limit - len(self._results))
+
+        rows = self._adapter.fetchmany(self._sqlaproxy, size) if size > 0 else []
+        self._results.extend(rows)
+
+        if self._limit is not None and len(self._results) >= self._limit:
+            self._mark_fetching_as_done()
+            self._close()
+        elif len(rows) < size or size <= 0:
+            self._mark_fetching_as_done()
+
+    def _fetch_until(self, n):
+        """Fetch rows until there are at least ``n`` (or the cursor is exhausted)"""
+        missing = n - len(self._results)
+
+        if missing > 0:
+            self._fetch_many(missing)
+
+    def _fetch_all(self):
+        """Fetch all the remaining rows (respecting autolimit)"""
+        if self._done_fetching:
+            return
+
+        if self._limit is not None:
+            self._fetch_many(self._limit - len(self._results))
+        else:
+            self._results.extend(self._adapter.fetchall(self._sqlaproxy))
+
+        self._mark_fetching_as_done()
+
+    def _fetch_native(self, method, **kwargs):
+        """
+        Fetch all the remaining rows with one of the adapter's methods (e.g.,
+        method="to_pandas"). Returns None if the driver doesn't support it or if some
+        rows have already been fetched as tuples
+        """
+        if self._done_fetching or self._rows:
+            return None
+
+        data = getattr(self._adapter, method)(
+            self._sqlaproxy, limit=self._limit, **kwargs
+        )
+
+        if data is not None:
+            self._native = data
+            self._rows = None
+            self._mark_fetching_as_done()
+
+            if self._limit is not None:
+                self._close()
+
+        return data
+
+    def _fetch_arrow(self):
+        """Fetch all the remaining rows as a pyarrow.Table (see _fetch_native)"""
+        if _is_arrow_table(self._native):
+            return self._native
+
+        return self._fetch_native("to_arrow")
+
+    def _iter_batches(self, size):
+        """
+        Yield the rows in batches of up to ``size`` rows (respecting autolimit). Rows
+        that haven't been fetched yet are streamed from the cursor and are not stored
+        """
+        rows = self._results
+        n_rows = len(rows)
+
+        for start in range(0, n_rows, size):
+            yield rows[start : start + size]
+
+        while not self._done_fetching:
+            if self._limit is not None:
+                size = min(size, self._limit - n_rows)
+
+            batch = self._adapter.fetchmany(self._sqlaproxy, size) if size > 0 else []
+            n_rows += len(batch)
+
+            if self._limit is not None and n_rows >= self._limit:
+                self._mark_fetching_as_done()
+                self._close()
+            elif len(batch) < size or size <= 0:
+                self._mark_fetching_as_done()
+
+            if batch:
+                # these rows are not stored, so the results are no longer complete
+                self._consumed = True
+                yield batch
+
+    def _iter_arrow_batches(self, size=None):
+        """
+        Like ``_iter_batches`` but yields ``pyarrow.RecordBatch``/``pyarrow.Table``
+        objects. Returns None if the driver doesn't support Arrow or if some rows
+        have already been fetched as tuples
+        """
+        if _is_arrow_table(self._native):
+            return self._native.to_batches(max_chunksize=size)
+
+        if self._done_fetching or self._rows:
+            return None
+
+        batches = self._adapter.to_arrow_batches(self._sqlaproxy, batch_size=size)
+
+        if batches is None:
+            return None
+
+        self._mark_fetching_as_done()
+        self._consumed = True
+        return arrow.iter_batches(batches, limit=self._limit)
+
+    def _fetch_for_key(self, key):
+        """Fetch the rows needed to access ``self._results[key]``"""
+        if isinstance(key, int):
+            if key < 0:
+                self._fetch_all()
+            else:
+                self._fetch_until(key + 1)
+        elif isinstance(key, slice):
+            start, stop = key.start or 0, key.stop
+
+            if stop is None or stop < 0 or start < 0:
+                self._fetch_all()
+            else:
+                self._fetch_until(stop)
+
+    def _has_more_rows_than(self, n):
+        self._fetch_until(n + 1)
+        return len(self._results) > n
+
     def _repr_html_(self):
-        _cell_with_spaces_pattern = re.compile(r"(<td>)( {2,})")
         if self.pretty:
-            self.pretty.add_rows(self)
-            result = self.pretty.get_html_string()
-            # to create clickable links
-            result = html.unescape(result)
-            result = _cell_with_spaces_pattern.sub(_nonbreaking_spaces, result)
-            if self.config.displaylimit and len(self) > self.config.displaylimit:
+            # 0 means no limit (see PrettyTable.add_rows)
+            displaylimit = self.config.displaylimit or None
+            key = (displaylimit, self.config.style)
+
+            # the displayed rows don't change once fetched, so we render them once
+            if key not in self._html_cache:
+                self._html_cache[key] = _html_table(
+                    self.field_names, self[:displaylimit]
+                )
+
+            result = self._html_cache[key]
+
+            if displaylimit and self._has_more_rows_than(displaylimit):
+                if self._done_fetching:
+                    HTML = (
+                        '%s\n<span style="font-style:italic;text-align:center;">'
+                        "%d rows, truncated to displaylimit of %d</span>"
+                    )
+                    result = HTML % (result, len(self), displaylimit)
+                else:
+                    HTML = (
+                        '%s\n<span style="font-style:italic;text-align:center;">'
+                        "Truncated to displaylimit of %d</span>"
+                    )
+                    result = HTML % (result, displaylimit)
+
+            if self.truncated:
                 HTML = (
                     '%s\n<span style="font-style:italic;text-align:center;">'
-                    "%d rows, truncated to displaylimit of %d</span>"
+                    "Results truncated to the %d rows fetched before running "
+                    "another query</span>"
                 )
-                result = HTML % (result, len(self), self.config.displaylimit)
+                result = HTML % (result, len(self._results))
+
             return result
         else:
             return None
 
     def __len__(self):
+        self._fetch_all()
         return len(self._results)
 
     def __iter__(self):
-        for result in self._results:
-            yield result
+        if self._done_fetching:
+            yield from self._results
+            return
+
+        idx = 0
+
+        while True:
+            if idx < len(self._results):
+                yield self._results[idx]
+                idx += 1
+            elif self._done_fetching:
+                return
+            else:
+                self._fetch_many(self._batch_size)
 
     def __str__(self, *arg, **kwarg):
         self.pretty.add_rows(self)
@@ -179,6 +469,7 @@ class ResultSet(ColumnGuesserMixin):
         return str(self)
 
     def __eq__(self, another: object) -> bool:
+        self._fetch_all()
         return self._results == another
 
     def __getitem__(self, key):
@@ -187,21 +478,74 @@ class ResultSet(ColumnGuesserMixin):
         or by string (value of leftmost column)
         """
         try:
+            self._fetch_for_key(key)
             return self._results[key]
         except TypeError:
-            result = [row for row in self if row[0] == key]
+            try:
+                result = self._get_index(0).get(key, [])
+            except TypeError:
+                # unhashable values, compare with each row
+                result = [row for row in self if row[0] == key]
             if not result:
                 raise KeyError(key)
             if len(result) > 1:
                 raise KeyError('%d results for "%s"' % (len(result), key))
             return result[0]
 
+    def index_by(self, column):
+        """
+        Returns a dict mapping each value in ``column`` to a list with the rows that
+        have such value. The index is built once and reused until the results
+        change
+        """
+        keys = list(self.keys)
+
+        if column not in keys:
+            raise exceptions.ValueError(
+                f"Column {column!r} is not in the results, "
+                f"available columns: {', '.join(map(str, keys))}"
+            )
+
+        return self._get_index(keys.index(column))
+
+    def _get_index(self, position):
+        """Returns the hash index for the column at ``position``"""
+        self._fetch_all()
+        # the index is rebuilt if the rows are replaced or more rows are added
+        version = (id(self._results), len(self._results))
+        cached = self._indexes.get(position)
+
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        index = {}
+
+        for row in self._results:
+            index.setdefault(row[position], []).append(row)
+
+        self._indexes[position] = (version, index)
+        return index
+
     def dict(self):
         """Returns a single dict built from the result set
 
         Keys are column names; values are a tuple"""
+        if self._is_columnar:
+            self._fetch_all()
+            return {
+                key: tuple(self._results.column_values(idx))
+                for idx, key in enumerate(self.keys)
+            }
+
         return dict(zip(self.keys, zip(*self)))
 
+    def _get_column_values(self):
+        if self._is_columnar:
+            self._fetch_all()
+            return [self._results.column(idx) for idx in range(len(self.keys))]
+
+        return super()._get_column_values()
+
     def dicts(self):
         "Iterator yielding a dict for each row"
         for row in self:
@@ -212,7 +556,18 @@ class ResultSet(ColumnGuesserMixin):
         "Returns a Pandas DataFrame instance built from the result set."
         import pandas as pd
 
-        frame = pd.DataFrame(self, columns=(self and self.keys) or [])
+        if _is_arrow_table(self._native):
+            frame = self._native.to_pandas()
+        else:
+            frame = self._fetch_native("to_pandas")
+
+        if frame is None and self._is_columnar and len(self):
+            frame = pd.DataFrame(
+                {idx: self._results.column(idx) for idx in range(len(self.keys))}
+            )
+            frame.columns = self.keys
+        elif frame is None:
+            frame = pd.DataFrame(self, columns=(self and self.keys) or [])
         payload[
             "connection_info"
         ] = Connection.current._get_curr_sqlalchemy_connection_info()
@@ -223,6 +578,14 @@ class ResultSet(ColumnGuesserMixin):
         "Returns a Polars DataFrame instance built from the result set."
         import polars as pl
 
+        if _is_arrow_table(self._native):
+            return pl.DataFrame(self._native, **polars_dataframe_kwargs)
+
+        frame = self._fetch_native("to_polars", **polars_dataframe_kwargs)
+
+        if frame is not None:
+            return frame
+
         frame = pl.DataFrame(
             (tuple(row) for row in self), schema=self.keys, **polars_dataframe_kwargs
         )
@@ -339,23 +702,46 @@ class ResultSet(ColumnGuesserMixin):
         Any other parameters will be passed on to csv.writer."""
         if not self.pretty:
             return None  # no results
-        self.pretty.add_rows(self)
-        if filename:
-            encoding = format_params.get("encoding", "utf-8")
-            outfile = open(filename, "w", newline="", encoding=encoding)
-        else:
-            outfile = StringIO()
 
-        writer = UnicodeWriter(outfile, **format_params)
-        writer.writerow(self.field_names)
-        for row in self:
-            writer.writerow(row)
+        # unlike export(), keep the rows in the result set
+        self._fetch_all()
+
         if filename:
-            outfile.close()
+            export.export(self, filename, format="csv", **format_params)
             return CsvResultDescriptor(filename)
         else:
+            format_params.pop("encoding", None)
+            outfile = StringIO()
+            export.write_csv(self, outfile, **format_params)
             return outfile.getvalue()
 
+    def export(self, path, format=None, batch_size=None, **format_params):
+        """
+        Write the results to a CSV, Parquet or Arrow IPC file (the format is
+        inferred from the extension). Rows that haven't been fetched yet are
+        streamed from the database in batches and aren't stored in the result set,
+        use it with ``lazy_fetch`` (or ``%sql --export``) to export results that
+        don't fit in memory. If any rows are streamed, the result set can no longer
+        be used (run the query again to access the results)
+        """
+        return export.export(
+            self, path, format=format, batch_size=batch_size, **format_params
+        )
+
+
+def _is_arrow_table(data):
+    return arrow.pa is not None and isinstance(data, arrow.pa.Table)
+
+
+def _to_rows(data):
+    """Convert a pyarrow.Table, pandas.DataFrame or polars.DataFrame to tuples"""
+    if _is_arrow_table(data):
+        return list(zip(*(column.to_pylist() for column in data.columns)))
+    elif hasattr(data, "itertuples"):
+        return list(data.itertuples(index=False, name=None))
+    else:
+        return list(data.iter_rows())
+
 
 def interpret_rowcount(rowcount):
     if rowcount < 0:
@@ -386,15 +772,20 @@ class FakeResultProxy(object):
     def from_list(self, source_list):
         "Simulates SQLA ResultProxy from a list."
 
-        self.fetchall = lambda: source_list
         self.rowcount = len(source_list)
+        self._pos = 0
+
+        def fetchall():
+            rows = source_list[self._pos :]
+            self._pos = len(source_list)
+            return rows
 
         def fetchmany(size):
-            pos = 0
-            while pos < len(source_list):
-                yield source_list[pos : pos + size]
-                pos += size
+            rows = source_list[self._pos : self._pos + size]
+            self._pos += len(rows)
+            return rows
 
+        self.fetchall = fetchall
         self.fetchmany = fetchmany
 
 
@@ -489,7 +880,7 @@ def select_df_type(resultset, config):
     # returning only last result, intentionally
 
 
-def run(conn, sql, config):
+def run(conn, sql, config, lazy=None, to_data_frame=True, stream=None):
     """Run a SQL query with the given connection
 
     Parameters
@@ -502,61 +893,347 @@ def run(conn, sql, config):
 
     config
         Configuration object
+
+    lazy : bool, default None
+        Fetch rows only when needed, if None, uses ``config.lazy_fetch``
+
+    to_data_frame : bool, default True
+        If False, returns a ``ResultSet`` even if ``autopandas`` or ``autopolars``
+        are enabled
+
+    stream : bool, default None
+        Use a server-side cursor (if the driver supports it) for the last
+        statement so rows are transferred from the database as they're fetched,
+        implies ``lazy=True``. If None, uses ``config.stream_results``
     """
+    stream = config.stream_results if stream is None else stream
+
+    if stream:
+        lazy = True
+
     info = conn._get_curr_sqlalchemy_connection_info()
 
-    duckdb_autopandas = info and info.get("dialect") == "duckdb" and config.autopandas
+    adapter = (
+        adapters.get_adapter(dialect=info.get("dialect"), driver=info.get("driver"))
+        if info
+        else None
+    )
 
     if not sql.strip():
         # returning only when sql is empty string
         return "Connected: %s" % conn.name
 
-    for statement in sqlparse.split(sql):
-        first_word = sql.strip().split()[0].lower()
-        manual_commit = False
+    conn._detach_pending_result_set()
 
-        # attempting to run a transaction
-        if first_word == "begin":
-            raise exceptions.RuntimeError("JupySQL does not support transactions")
+    statements = split_statements(sql)
+    # the autocommit setting applies to the connection, so we set it once
+    manual_commit = None
+
+    for idx, statement in enumerate(statements):
+        is_last = idx == len(statements) - 1
+        _check_statement(statement)
+
+        # only the results of the last statement are kept, so it's the only one
+        # whose results are cached
+        cache_result = (
+            result_cache.enabled and is_last and not stream and is_query(statement)
+        )
+        cached = (
+            result_cache.get(conn, statement, config.autolimit)
+            if cache_result
+            else None
+        )
+
+        if cached is not None:
+            result = cached
+            adapter = None
 
         # postgres metacommand
-        if first_word.startswith("\\") and is_postgres_or_redshift(conn.dialect):
+        elif _is_postgres_special(conn, statement):
             result = handle_postgres_special(conn, statement)
 
         # regular query
         else:
-            manual_commit = set_autocommit(conn, config)
             is_custom_connection = Connection.is_custom_connection(conn)
 
+            streaming = stream and is_last and is_query(statement)
+
+            if not is_query(statement):
+                conn._data_changed()
+
+            # some drivers (e.g., psycopg2) only support server-side cursors inside
+            # a transaction, and streamed queries are not committed anyway
+            if manual_commit is None and not streaming:
+                manual_commit = set_autocommit(conn, config)
+
             # if regular sqlalchemy, pass a text object
             if not is_custom_connection:
                 statement = sqlalchemy.sql.text(statement)
 
-            if duckdb_autopandas:
-                conn = conn.engine.raw_connection()
-                cursor = conn.cursor()
-                cursor.execute(str(statement))
-
+                # ignored by SQLAlchemy if the driver doesn't support server-side
+                # cursors
+                if streaming:
+                    statement = statement.execution_options(
+                        stream_results=True, max_row_buffer=config.fetch_batch_size
+                    )
+
+            # some drivers have a faster API to return data frames
+            if (
+                is_last
+                and to_data_frame
+                and not streaming
+                and not cache_result
+                and (config.autopandas or config.autopolars)
+                and adapter
+            ):
+                result = adapter.execute(conn, statement)
             else:
-                result = conn.session.execute(statement)
-                _commit(conn=conn, config=config, manual_commit=manual_commit)
+                result = None
+
+            if result is None and streaming and not is_custom_connection:
+                result = _execute_streaming(conn, statement)
+                _check_data_changed(conn, statement, result)
+            elif result is None:
+                result = conn._execute(statement)
+                _check_data_changed(conn, statement, result)
+
+                # committing closes the server-side cursor (and queries don't need
+                # it anyway)
+                if not streaming:
+                    _commit(conn=conn, config=config, manual_commit=manual_commit)
 
                 if result and config.feedback:
                     if hasattr(result, "rowcount"):
                         print(interpret_rowcount(result.rowcount))
 
-    # bypass ResultSet and use duckdb's native method to return a pandas data frame
-    if duckdb_autopandas:
-        df = cursor.df()
-        conn.close()
-        return df
+    # cached results must be fetched so we can store them
+    resultset = ResultSet(
+        result,
+        config,
+        adapter=adapter,
+        lazy=False if cache_result else lazy,
+        to_data_frame=not cache_result
+        and to_data_frame
+        and (config.autopandas or config.autopolars),
+    )
+
+    if cache_result and cached is None and resultset.keys:
+        result_cache.put(
+            conn, statements[-1], resultset.keys, resultset._results, config.autolimit
+        )
+
+    if not resultset.done_fetching:
+        conn._set_pending_result_set(resultset)
+
+    return select_df_type(resultset, config) if to_data_frame else resultset
+
+
+class StatementResult:
+    """The result of a statement executed with ``run_batch``
+
+    Attributes
+    ----------
+    statement : str
+        The statement
+
+    result : ResultSet
+        The rows returned by the statement (None if it didn't return rows)
+
+    rowcount : int
+        Number of rows affected (-1 if the driver doesn't report it)
+
+    elapsed : float
+        Time (in seconds) to execute the statement and fetch its rows
+    """
+
+    def __init__(self, statement, result, rowcount, elapsed):
+        self.statement = statement
+        self.result = result
+        self.rowcount = rowcount
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(statement={self.statement!r}, "
+            f"rowcount={self.rowcount}, elapsed={self.elapsed:.4f})"
+        )
+
+
+class BatchResult(list):
+    """A list with the ``StatementResult`` of each statement in a batch"""
+
+    @property
+    def elapsed(self):
+        """Total time (in seconds)"""
+        return sum(result.elapsed for result in self)
+
+    def __str__(self):
+        table = prettytable.PrettyTable(["statement", "rows", "elapsed (s)"])
+        table.align["statement"] = "l"
+
+        for result in self:
+            statement = " ".join(result.statement.split())
+
+            if len(statement) > 60:
+                statement = statement[:57] + "..."
+
+            rows = len(result.result) if result.result is not None else result.rowcount
+            table.add_row([statement, rows, f"{result.elapsed:.4f}"])
+
+        return str(table)
+
+    __repr__ = __str__
+
+
+def run_batch(conn, sql, config):
+    """Run all the statements in ``sql`` and return the result of each one
+
+    Unlike ``run`` (which only keeps the results of the last statement), the rows
+    returned by every statement are fetched and the autocommit setting and the
+    commit are issued once for the whole batch
+
+    Parameters
+    ----------
+    conn : sql.connection.Connection
+        The connection to use
+
+    sql : str
+        SQL statements
+
+    config
+        Configuration object
+
+    Returns
+    -------
+    BatchResult
+        A list with a ``StatementResult`` per statement
+    """
+    results = BatchResult()
+
+    if not sql.strip():
+        return results
+
+    info = conn._get_curr_sqlalchemy_connection_info()
+    adapter = (
+        adapters.get_adapter(dialect=info.get("dialect"), driver=info.get("driver"))
+        if info
+        else None
+    )
+
+    conn._detach_pending_result_set()
+
+    statements = split_statements(sql)
+
+    # check all statements before running any of them
+    for statement in statements:
+        _check_statement(statement)
+
+    manual_commit = set_autocommit(conn, config)
+    is_custom_connection = Connection.is_custom_connection(conn)
+
+    for statement in statements:
+        start = time.perf_counter()
+
+        if not is_query(statement):
+            conn._data_changed()
+
+        if _is_postgres_special(conn, statement):
+            result = handle_postgres_special(conn, statement)
+        elif is_custom_connection:
+            result = conn._execute(statement)
+        else:
+            result = conn._execute(sqlalchemy.sql.text(statement))
+
+        _check_data_changed(conn, statement, result)
+
+        # fetch all rows since running the next statement may discard them
+        resultset = ResultSet(result, config, adapter=adapter, lazy=False)
+
+        results.append(
+            StatementResult(
+                statement,
+                result=resultset if resultset.keys else None,
+                rowcount=getattr(result, "rowcount", -1),
+                elapsed=time.perf_counter() - start,
+            )
+        )
+
+    _commit(conn=conn, config=config, manual_commit=manual_commit)
+
+    if config.feedback:
+        print(
+            f"Executed {len(results)} statement(s) in {results.elapsed:.4f} seconds"
+        )
+
+    return results
+
+
+def _first_word(statement):
+    words = statement.split()
+    return words[0].rstrip(";").lower() if words else ""
+
+
+def _check_statement(statement):
+    # attempting to run a transaction
+    if _first_word(statement) == "begin":
+        raise exceptions.RuntimeError("JupySQL does not support transactions")
+
+
+def _is_postgres_special(conn, statement):
+    """Checks if the statement is a PostgreSQL metacommand (e.g., \\d)"""
+    return _first_word(statement).startswith("\\") and is_postgres_or_redshift(
+        conn.dialect
+    )
+
+
+def _check_data_changed(conn, statement, result):
+    """
+    Discard the cached results if a statement that looks like a query didn't
+    return rows (e.g., WITH ... INSERT in PostgreSQL), statements that aren't
+    queries discard them before running
+    """
+    if hasattr(result, "returns_rows"):
+        returns_rows = result.returns_rows
     else:
-        resultset = ResultSet(result, config)
-        return select_df_type(resultset, config)
+        returns_rows = getattr(result, "description", None) is not None
+
+    if is_query(str(statement)) and not returns_rows:
+        conn._data_changed()
+
+
+def _execute_streaming(conn, statement):
+    """
+    Execute a statement with a server-side cursor. If the connection is in
+    autocommit mode, some drivers reject server-side cursors (e.g., psycopg2 only
+    allows them inside a transaction), in such case, we run the statement again
+    with a regular cursor (there is no transaction to roll back)
+    """
+    options = conn.session.get_execution_options()
+
+    if options.get("isolation_level") != "AUTOCOMMIT":
+        return conn.session.execute(statement)
+
+    try:
+        return conn.session.execute(statement)
+    except sqlalchemy.exc.DBAPIError as e:
+        warnings.warn(
+            "Couldn't use a server-side cursor since the connection is in "
+            "autocommit mode, fetching the results with a regular cursor "
+            "(set SqlMagic.autocommit = False to use server-side cursors). "
+            f"Error: {e.orig}"
+        )
+        return conn.session.execute(
+            statement.execution_options(stream_results=False)
+        )
 
 
 def raw_run(conn, sql):
-    return conn.session.execute(sqlalchemy.sql.text(sql))
+    if not is_query(sql):
+        conn._data_changed()
+
+    return result_cache.execute(
+        conn, sql, lambda: conn._execute(sqlalchemy.sql.text(sql))
+    )
 
 
 class PrettyTable(prettytable.PrettyTable):
@@ -572,11 +1249,10 @@ class PrettyTable(prettytable.PrettyTable):
         self.displaylimit = data.config.displaylimit
         if self.displaylimit == 0:
             self.displaylimit = None  # TODO: remove this to make 0 really 0
-        if self.displaylimit in (None, 0):
-            self.row_count = len(data)
-        else:
-            self.row_count = min(len(data), self.displaylimit)
-        for row in data[: self.displaylimit]:
+        # slicing only fetches the rows that will be displayed
+        rows = data[: self.displaylimit]
+        self.row_count = len(rows)
+        for row in rows:
             formatted_row = []
             for cell in row:
                 if isinstance(cell, str) and cell.startswith("http"):
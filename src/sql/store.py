@@ -2,11 +2,29 @@ from typing import Iterator, Iterable
 from collections.abc import MutableMapping
 from jinja2 import Template
 from ploomber_core.exceptions import modify_exceptions
+import sqlalchemy
 import sql.connection
 import warnings
 import difflib
+import os
+import hashlib
+import re
+from itertools import chain
 
 from sql import exceptions
+from sql.store_backends import get_backend
+
+# placeholder for snippets stored in a backend whose query hasn't been loaded
+_NOT_LOADED = object()
+
+_WITH_TEMPLATE = Template(
+    """WITH{% for name in with_ %} {{name}} AS ({{saved[name]}})\
+{{ "," if not loop.last }}{% endfor %}{{query}}"""
+)
+_WITH_TEMPLATE_BACKTICK = Template(
+    """WITH{% for name in with_ %} `{{name}}` AS ({{saved[name]}})\
+{{ "," if not loop.last }}{% endfor %}{{query}}"""
+)
 
 
 class SQLStore(MutableMapping):
@@ -36,13 +54,74 @@ class SQLStore(MutableMapping):
     SELECT * FROM writers_fav_modern LIMIT 10
     """
 
-    def __init__(self):
+    def __init__(self, backend=None):
         self._data = dict()
+        self._backend = None
+        # {key: version} of the snippets in the backend
+        self._versions = dict()
+        # store the results of the snippets in temporary tables (see materialize)
+        self.materialize_snippets = False
+        # caches, cleared when a snippet is added, modified or deleted:
+        # {key: ordered dependencies}
+        self._dependencies = dict()
+        # {(with_, backtick): rendered WITH clause}
+        self._rendered = dict()
+        # {key: temporary table}
+        self._tables = dict()
 
-    def __setitem__(self, key: str, value: str) -> None:
-        self._data[key] = value
+        if backend is not None:
+            self.set_backend(backend)
 
-    def __getitem__(self, key) -> str:
+    @property
+    def backend(self):
+        """The backend that stores the snippets on disk (None if only in memory)"""
+        return self._backend
+
+    def set_backend(self, backend):
+        """
+        Store the snippets in ``backend`` (a ``DirectoryBackend``, a
+        ``SQLiteBackend``, or a path to pass to ``get_backend``) so they're
+        available in other sessions, or only keep them in memory (``None``).
+        Snippets saved so far are kept, unless the backend has one with the same
+        name
+        """
+        if isinstance(backend, (str, os.PathLike)):
+            backend = get_backend(backend)
+
+        snippets = {key: self._get(key) for key in self._data}
+        self._backend = backend
+        self._versions = dict()
+        self._clear_cache()
+
+        if backend is None:
+            self._data = snippets
+            return
+
+        self._data = dict()
+        self._refresh(force=True)
+
+        for key, snippet in snippets.items():
+            if key not in self._data:
+                self._set(key, snippet)
+
+    def _refresh(self, force=False):
+        """Load the list of snippets again if another session modified them"""
+        if self._backend is None or not (force or self._backend.changed()):
+            return
+
+        versions = self._backend.index()
+        # keep the loaded snippets that haven't changed
+        self._data = {
+            key: self._data[key]
+            if key in self._data and self._versions.get(key) == version
+            else _NOT_LOADED
+            for key, version in versions.items()
+        }
+        self._versions = versions
+        self._clear_cache()
+
+    def _get(self, key):
+        """Get a snippet (loading it from the backend if needed)"""
         if not self._data:
             raise exceptions.UsageError("No saved SQL")
         if key not in self._data:
@@ -53,22 +132,195 @@ class SQLStore(MutableMapping):
             else:
                 valid = ", ".join(f'"{key}"' for key in self._data.keys())
                 raise exceptions.UsageError(error + f" Valid identifiers are {valid}.")
-        return self._data[key]
+
+        snippet = self._data[key]
+
+        if snippet is _NOT_LOADED:
+            query, with_ = self._backend.load(key)
+            snippet = self._data[key] = SQLQuery(self, query, with_)
+
+        return snippet
+
+    def _clear_cache(self):
+        self._dependencies.clear()
+        self._rendered.clear()
+        self._tables.clear()
+
+    def _set(self, key, value):
+        # adding a snippet doesn't change the cached results (snippets that use it
+        # couldn't be rendered before), so we only clear them when replacing one
+        if key in self._data:
+            self._clear_cache()
+
+        if self._backend is not None:
+            query, with_ = (
+                (value._query, value._with_)
+                if isinstance(value, SQLQuery)
+                else (str(value), [])
+            )
+            self._versions[key] = self._backend.save(key, query, with_)
+
+        self._data[key] = value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self._refresh()
+        self._set(key, value)
+
+    def __getitem__(self, key) -> str:
+        self._refresh()
+        return self._get(key)
 
     def __iter__(self) -> Iterator[str]:
-        for key in self._data:
+        self._refresh()
+
+        for key in list(self._data):
             yield key
 
     def __len__(self) -> int:
+        self._refresh()
         return len(self._data)
 
     def __delitem__(self, key: str) -> None:
+        self._refresh()
         del self._data[key]
+        self._versions.pop(key, None)
+        self._clear_cache()
+
+        if self._backend is not None:
+            self._backend.delete(key)
+
+    def get_dependencies(self, key):
+        """
+        Returns the snippets that ``key`` depends on (directly or indirectly) in
+        the order their CTEs must appear
+        """
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        # depth-first search without recursion (long chains of snippets would
+        # exceed the recursion limit)
+        stack = [(key, iter(_get_with(self._get(key))))]
+        # the snippets in the current path (a dict to check membership quickly)
+        visiting = {key: None}
+
+        while stack:
+            current, deps = stack[-1]
+
+            for dep in deps:
+                if dep in visiting:
+                    path = list(visiting)
+                    cycle = " -> ".join(path[path.index(dep) :] + [dep])
+                    raise exceptions.UsageError(
+                        f"Found a cycle in the saved snippets: {cycle}"
+                    )
+
+                if dep not in self._dependencies:
+                    stack.append((dep, iter(_get_with(self._get(dep)))))
+                    visiting[dep] = None
+                    break
+            else:
+                stack.pop()
+                visiting.pop(current)
+                with_ = _get_with(self._get(current))
+                self._dependencies[current] = tuple(
+                    dict.fromkeys(
+                        chain(
+                            chain.from_iterable(
+                                self._dependencies[dep] for dep in with_
+                            ),
+                            with_,
+                        )
+                    )
+                )
+
+        return self._dependencies[key]
+
+    def _render_with(self, with_, is_use_backtick, tables=None):
+        """
+        Renders the WITH clause with the snippets in ``with_`` (and their
+        dependencies), ``tables`` maps snippets to the temporary tables that store
+        their results (if materialized)
+        """
+        key = (tuple(with_), is_use_backtick)
+
+        if not tables and key in self._rendered:
+            return self._rendered[key]
+
+        with_all = _get_dependencies(self, with_)
+        saved = {
+            name: f"SELECT * FROM {tables[name]}"
+            if tables and name in tables
+            else self._get(name)._query
+            for name in with_all
+        }
+        template = _WITH_TEMPLATE_BACKTICK if is_use_backtick else _WITH_TEMPLATE
+        rendered = template.render(query="", saved=saved, with_=with_all)
+
+        if not tables:
+            self._rendered[key] = rendered
+
+        return rendered
+
+    def render(self, query, with_=None, conn=None):
+        """
+        Render ``query`` with the snippets in ``with_`` as CTEs. If
+        ``materialize_snippets`` is enabled and a connection is passed, the CTEs
+        read the snippets from temporary tables (see ``materialize``)
+        """
+        self._refresh()
+
+        if with_ and conn is not None and self.materialize_snippets:
+            try:
+                tables = self.materialize(with_, conn)
+            except Exception as e:
+                _rollback(conn)
+                warnings.warn(
+                    "Couldn't store the snippets in temporary tables, "
+                    f"using CTEs instead. Error: {e}"
+                )
+            else:
+                return SQLQuery(self, query, with_, tables=tables)
 
-    def render(self, query, with_=None):
-        # TODO: if with is false, WITH should not appear
         return SQLQuery(self, query, with_)
 
+    def materialize(self, keys, conn):
+        """
+        Store the results of the snippets in ``keys`` (and their dependencies) in
+        temporary tables, returns a dictionary with the table of each snippet.
+        Tables are named after a hash of the snippet and its dependencies, so
+        they're rebuilt when any of them changes, or when a statement modified
+        the data since they were created
+        """
+        tables = {}
+
+        for key in _get_dependencies(self, keys):
+            snippet = self._get(key)
+
+            if key not in self._tables:
+                digest = _hash(
+                    snippet._query, *(tables[dep] for dep in snippet._with_)
+                )
+                name = re.sub(r"[^A-Za-z0-9_]", "_", key)
+                self._tables[key] = f"jupysql_{name}_{digest}"
+
+            tables[key] = self._tables[key]
+
+            materialized = conn._materialized.get(key)
+
+            if materialized == (tables[key], conn._data_version):
+                continue
+
+            if materialized is not None:
+                _execute(conn, f"DROP TABLE IF EXISTS {materialized[0]}")
+                del conn._materialized[key]
+
+            body = SQLQuery(self, snippet._query, snippet._with_, tables=tables)
+            _execute(conn, f"CREATE TEMPORARY TABLE {tables[key]} AS {body}")
+            conn._materialized[key] = (tables[key], conn._data_version)
+
+        _commit(conn)
+        return tables
+
     @modify_exceptions
     def store(self, key, query, with_=None):
         if "-" in key:
@@ -81,16 +333,31 @@ class SQLStore(MutableMapping):
                 f"Script name ({key!r}) cannot appear in with_ argument"
             )
 
-        self._data[key] = SQLQuery(self, query, with_)
+        self._refresh()
+
+        # only a snippet that's already saved can be part of a cycle
+        if key in self._data:
+            for dep in with_ or []:
+                if dep in self._data and key in self.get_dependencies(dep):
+                    raise exceptions.UsageError(
+                        f"Cannot save {key!r} since it would create a cycle "
+                        f"({dep!r} depends on {key!r})"
+                    )
+
+        self._set(key, SQLQuery(self, query, with_))
 
 
 class SQLQuery:
     """Holds queries and renders them"""
 
-    def __init__(self, store: SQLStore, query: str, with_: Iterable = None):
+    def __init__(
+        self, store: SQLStore, query: str, with_: Iterable = None, tables=None
+    ):
         self._store = store
         self._query = query
         self._with_ = with_ or []
+        # temporary tables that store the results of the snippets (if materialized)
+        self._tables = tables or {}
 
         if any("-" in x for x in self._with_):
             warnings.warn(
@@ -106,42 +373,54 @@ class SQLQuery:
         We use the ' (backtick symbol) to wrap the CTE alias if the dialect supports
         ` (backtick)
         """
-        with_clause_template = Template(
-            """WITH{% for name in with_ %} {{name}} AS ({{saved[name]._query}})\
-{{ "," if not loop.last }}{% endfor %}{{query}}"""
-        )
-        with_clause_template_backtick = Template(
-            """WITH{% for name in with_ %} `{{name}}` AS ({{saved[name]._query}})\
-{{ "," if not loop.last }}{% endfor %}{{query}}"""
-        )
+        if not self._with_:
+            return self._query
+
         is_use_backtick = sql.connection.Connection.current.is_use_backtick_template()
-        with_all = _get_dependencies(self._store, self._with_)
-        template = (
-            with_clause_template_backtick if is_use_backtick else with_clause_template
-        )
-        return template.render(
-            query=self._query, saved=self._store._data, with_=with_all
+        with_clause = self._store._render_with(
+            self._with_, is_use_backtick, tables=self._tables
         )
+        return with_clause + self._query
+
+
+def _get_with(snippet):
+    return getattr(snippet, "_with_", [])
 
 
 def _get_dependencies(store, keys):
     """Get a list of all dependencies to reconstruct the CTEs in keys"""
-    # get the dependencies for each key
-    deps = _flatten([_get_dependencies_for_key(store, key) for key in keys])
+    deps = chain.from_iterable(store.get_dependencies(key) for key in keys)
     # remove duplicates but preserve order
-    return list(dict.fromkeys(deps + keys))
+    return list(dict.fromkeys(chain(deps, keys)))
+
+
+def _hash(*values):
+    return hashlib.sha256("\0".join(values).encode("utf-8")).hexdigest()[:12]
+
+
+def _execute(conn, statement):
+    if conn.is_custom_connection():
+        conn.session.execute(statement)
+    else:
+        conn.session.execute(sqlalchemy.text(statement))
 
 
-def _get_dependencies_for_key(store, key):
-    """Retrieve dependencies for a single key"""
-    deps = store[key]._with_
-    deps_of_deps = _flatten([_get_dependencies_for_key(store, dep) for dep in deps])
-    return deps_of_deps + deps
+def _commit(conn):
+    # temporary tables must outlive the current transaction
+    if conn.is_custom_connection():
+        conn.session.engine.commit()
+    else:
+        conn.session.commit()
 
 
-def _flatten(elements):
-    """Flatten a list of lists"""
-    return [element for sub in elements for element in sub]
+def _rollback(conn):
+    try:
+        if conn.is_custom_connection():
+            conn.session.engine.rollback()
+        else:
+            conn.session.rollback()
+    except Exception:
+        pass
 
 
 # session-wide store
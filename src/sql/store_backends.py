@@ -0,0 +1,169 @@
+"""
+Backends to keep the snippets saved with ``--save`` on disk so they're available in
+other sessions (and shared by kernels running at the same time). The store only
+loads the list of snippets when it's created, their queries are loaded when
+they're used, and the backend reports when another session modified them
+"""
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from sql import exceptions
+
+
+def get_backend(path):
+    """
+    Returns a ``SQLiteBackend`` if ``path`` has a .db, .sqlite or .sqlite3
+    extension, otherwise a ``DirectoryBackend``
+    """
+    if Path(path).suffix in {".db", ".sqlite", ".sqlite3"}:
+        return SQLiteBackend(path)
+
+    return DirectoryBackend(path)
+
+
+class DirectoryBackend:
+    """Stores each snippet in a ``{key}.sql`` file, dependencies are stored in the
+    first line (``-- with: first, second``)
+    """
+
+    _HEADER = "-- with:"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._mtime = None
+        # version of the files that have been loaded
+        self._loaded = {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.path)!r})"
+
+    def _path_to(self, key):
+        if not key or os.sep in key or (os.altsep and os.altsep in key):
+            raise exceptions.UsageError(
+                f"Cannot store {key!r} in {self.path}, it's not a valid file name"
+            )
+
+        return self.path / f"{key}.sql"
+
+    @staticmethod
+    def _version(stat):
+        # saving replaces the file, so the inode changes even if the modification
+        # time doesn't (it has a coarse resolution on some file systems)
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def index(self):
+        """Returns a dictionary with the version (inode and modification time) of
+        each snippet"""
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+        with os.scandir(self.path) as entries:
+            return {
+                entry.name[:-4]: self._version(entry.stat())
+                for entry in entries
+                if entry.name.endswith(".sql") and entry.is_file()
+            }
+
+    def changed(self):
+        """
+        Checks if snippets were added or removed (the directory's modification
+        time changes), or if any loaded snippet was modified
+        """
+        if os.stat(self.path).st_mtime_ns != self._mtime:
+            return True
+
+        for key, version in self._loaded.items():
+            try:
+                if self._version(os.stat(self._path_to(key))) != version:
+                    return True
+            except FileNotFoundError:
+                return True
+
+        return False
+
+    def load(self, key):
+        """Returns the query and the dependencies of a snippet"""
+        path = self._path_to(key)
+        self._loaded[key] = self._version(os.stat(path))
+        text = path.read_text()
+        first, _, rest = text.partition("\n")
+
+        if first.startswith(self._HEADER):
+            with_ = [name.strip() for name in first[len(self._HEADER) :].split(",")]
+            return rest, [name for name in with_ if name]
+
+        return text, []
+
+    def save(self, key, query, with_):
+        """Saves a snippet, returns its version"""
+        path = self._path_to(key)
+        header = f"{self._HEADER} {', '.join(with_)}\n" if with_ else ""
+        # write to a temporary file and replace the snippet so other sessions never
+        # read a partially written file
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(header + query)
+        os.replace(tmp, path)
+
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self._loaded[key] = version = self._version(os.stat(path))
+        return version
+
+    def delete(self, key):
+        self._path_to(key).unlink(missing_ok=True)
+        self._loaded.pop(key, None)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+class SQLiteBackend:
+    """Stores the snippets in a SQLite database (a table indexed by name)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snippets (key TEXT PRIMARY KEY, "
+            "query TEXT NOT NULL, with_ TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+        self._data_version = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.path)!r})"
+
+    def _get_data_version(self):
+        # changes when another connection modifies the database
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def index(self):
+        """Returns a dictionary with the version of each snippet"""
+        self._data_version = self._get_data_version()
+        return dict(self._conn.execute("SELECT key, version FROM snippets"))
+
+    def changed(self):
+        """Checks if another session modified the snippets"""
+        return self._get_data_version() != self._data_version
+
+    def load(self, key):
+        """Returns the query and the dependencies of a snippet"""
+        query, with_ = self._conn.execute(
+            "SELECT query, with_ FROM snippets WHERE key = ?", (key,)
+        ).fetchone()
+        return query, json.loads(with_)
+
+    def save(self, key, query, with_):
+        """Saves a snippet, returns its version"""
+        # a timestamp, so a snippet that's deleted and saved again gets a new one
+        version = time.time_ns()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO snippets VALUES (?, ?, ?, ?)",
+            (key, query, json.dumps(list(with_)), version),
+        )
+        return version
+
+    def delete(self, key):
+        self._conn.execute("DELETE FROM snippets WHERE key = ?", (key,))
+
+    def close(self):
+        self._conn.close()
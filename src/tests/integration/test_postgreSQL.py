@@ -1,3 +1,9 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+
 def test_meta_cmd_display(ip_with_postgreSQL, test_table_name_dict):
     out = ip_with_postgreSQL.run_cell("%sql \d")  # noqa: W605
     assert len(out.result) > 0
@@ -17,3 +23,35 @@ def test_auto_commit_mode_on(ip_with_postgreSQL, capsys):
     assert out_after_creating.error_in_exec is None
     assert any(row[0] == "new_db" for row in out_all_dbs)
     assert "CREATE DATABASE cannot run inside a transaction block" not in out
+
+
+@pytest.mark.parametrize("autocommit", [True, False])
+def test_stream(ip_with_postgreSQL, test_table_name_dict, autocommit):
+    ip_with_postgreSQL.run_cell(f"%config SqlMagic.autocommit={autocommit}")
+    table = test_table_name_dict["numbers"]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        out = ip_with_postgreSQL.run_cell(f"%sql --stream SELECT * FROM {table}")
+
+    assert out.error_in_exec is None
+    assert len(out.result) == 60
+
+    ip_with_postgreSQL.run_cell("%config SqlMagic.autocommit=True")
+
+
+@pytest.mark.parametrize("autocommit", [True, False])
+def test_export(ip_with_postgreSQL, test_table_name_dict, tmp_empty, autocommit):
+    ip_with_postgreSQL.run_cell(f"%config SqlMagic.autocommit={autocommit}")
+    table = test_table_name_dict["numbers"]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        out = ip_with_postgreSQL.run_cell(
+            f"%sql --export numbers.csv SELECT * FROM {table}"
+        )
+
+    assert out.error_in_exec is None
+    assert pd.read_csv("numbers.csv").shape[0] == 60
+
+    ip_with_postgreSQL.run_cell("%config SqlMagic.autocommit=True")
@@ -0,0 +1,158 @@
+from unittest.mock import Mock
+
+import pytest
+import pyarrow as pa
+import polars as pl
+import pandas as pd
+import sqlalchemy
+import duckdb
+
+from sql import adapters
+from sql.arrow import ArrowResult
+from sql.run import ResultSet
+from sql import run as run_module
+
+
+@pytest.fixture
+def config():
+    config = Mock()
+    config.displaylimit = 5
+    config.autolimit = None
+    config.lazy_fetch = False
+    config.fetch_batch_size = 1000
+    config.autopandas = False
+    config.autopolars = False
+    config.columnar_storage = False
+    return config
+
+
+@pytest.fixture
+def current_connection(monkeypatch):
+    monkeypatch.setattr(run_module.Connection, "current", Mock())
+
+
+@pytest.fixture
+def duckdb_result():
+    # use the DB-API connection directly, creating a duckdb:// engine here breaks
+    # test_connection.py::test_missing_duckdb_dependencies
+    conn = duckdb.connect()
+    yield conn.execute("select * from range(5) t(x)")
+    conn.close()
+
+
+@pytest.fixture
+def sqlite_result():
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    yield conn.execute(sqlalchemy.text("select 1 as x union all select 2"))
+    conn.close()
+
+
+@pytest.fixture
+def custom_adapter():
+    @adapters.register_adapter("some-dialect")
+    class CustomAdapter(adapters.ResultAdapter):
+        pass
+
+    yield CustomAdapter
+    adapters._ADAPTERS.pop("some-dialect")
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        [dict(dialect="duckdb"), adapters.DuckDBAdapter],
+        [dict(driver="duckdb_engine"), adapters.DuckDBAdapter],
+        [dict(dialect="snowflake"), adapters.SnowflakeAdapter],
+        [dict(dialect="clickhousedb"), adapters.ClickHouseAdapter],
+        [dict(driver="adbc_driver_manager"), adapters.ADBCAdapter],
+        [dict(dialect="postgresql", driver="psycopg2"), adapters.ResultAdapter],
+        [dict(), adapters.ResultAdapter],
+    ],
+)
+def test_get_adapter(kwargs, expected):
+    assert type(adapters.get_adapter(**kwargs)) is expected
+
+
+def test_get_adapter_from_results(duckdb_result, sqlite_result):
+    assert isinstance(
+        adapters.get_adapter(results=duckdb_result), adapters.DuckDBAdapter
+    )
+    assert type(adapters.get_adapter(results=sqlite_result)) is adapters.ResultAdapter
+
+
+def test_register_adapter(custom_adapter):
+    assert isinstance(adapters.get_adapter(dialect="some-dialect"), custom_adapter)
+
+
+def test_default_adapter_does_not_fetch_natively(
+    sqlite_result, config, current_connection
+):
+    rs = ResultSet(sqlite_result, config)
+
+    assert adapters.ResultAdapter().to_arrow(sqlite_result) is None
+    assert rs.DataFrame().equals(pd.DataFrame({"x": [1, 2]}))
+
+
+def test_duckdb_adapter_polars_dataframe(duckdb_result, config):
+    config.lazy_fetch = True
+    rs = ResultSet(duckdb_result, config)
+
+    df = rs.PolarsDataFrame()
+
+    assert isinstance(rs._native, pl.DataFrame)
+    assert df.frame_equal(pl.DataFrame({"x": range(5)}))
+    assert list(rs) == [(0,), (1,), (2,), (3,), (4,)]
+
+
+def test_duckdb_adapter_dataframe_with_limit(duckdb_result, config, current_connection):
+    config.lazy_fetch = True
+    config.autolimit = 2
+    rs = ResultSet(duckdb_result, config)
+
+    df = rs.DataFrame()
+
+    assert isinstance(rs._native, pd.DataFrame)
+    assert df.to_dict(orient="list") == {"x": [0, 1]}
+    assert len(rs) == 2
+
+
+def test_arrow_result(config):
+    results = ArrowResult(pa.table({"x": [1, 2, 3], "y": ["a", "b", "c"]}))
+
+    assert results.fetchmany(1) == [(1, "a")]
+    assert [b.to_pydict() for b in results.fetch_arrow_batches(batch_size=1)] == [
+        {"x": [2], "y": ["b"]},
+        {"x": [3], "y": ["c"]},
+    ]
+    assert results.fetchall() == []
+
+
+def test_resultset_from_arrow_result(config):
+    results = ArrowResult(pa.table({"x": [1, 2, 3]}))
+    rs = ResultSet(results, config)
+
+    assert rs.keys == ["x"]
+    assert list(rs) == [(1,), (2,), (3,)]
+
+
+def test_resultset_from_arrow_result_dataframe(config, current_connection):
+    config.lazy_fetch = True
+    results = ArrowResult(pa.table({"x": [1, 2, 3]}))
+    rs = ResultSet(results, config)
+
+    assert rs.DataFrame().to_dict(orient="list") == {"x": [1, 2, 3]}
+    assert rs.rows_fetched == 3
+
+
+def test_clickhouse_adapter_executes_queries_natively():
+    conn = Mock()
+    client = conn.session.connection.dbapi_connection.client
+    client.query_arrow.return_value = pa.table({"x": [1]})
+    adapter = adapters.ClickHouseAdapter()
+
+    assert adapter.execute(conn, "INSERT INTO t VALUES (1)") is None
+    result = adapter.execute(conn, " WITH a AS (SELECT 1) SELECT * FROM a")
+
+    assert result.fetchall() == [(1,)]
+    client.query_arrow.assert_called_once()
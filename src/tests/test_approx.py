@@ -0,0 +1,49 @@
+import pytest
+
+from sql import approx
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        ["duckdb", "approx_quantile(x, 0.25)"],
+        ["bigquery", "APPROX_QUANTILES(x, 1000)[OFFSET(250)]"],
+        ["clickhouse", "quantile(0.25)(x)"],
+        ["postgresql", None],
+        ["sqlite", None],
+    ],
+)
+def test_quantile(dialect, expected):
+    assert approx.quantile(dialect, "x", 0.25) == expected
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        ["duckdb", "approx_count_distinct(x)"],
+        ["trino", "approx_distinct(x)"],
+        ["redshift", "APPROXIMATE COUNT(DISTINCT x)"],
+        ["postgresql", None],
+    ],
+)
+def test_count_distinct(dialect, expected):
+    assert approx.count_distinct(dialect, "x") == expected
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        ["postgresql", "TABLESAMPLE BERNOULLI (1)"],
+        ["sqlite", None],
+        ["mysql", None],
+    ],
+)
+def test_tablesample(dialect, expected):
+    assert approx.tablesample(dialect) == expected
+
+
+def test_describe_sample():
+    assert approx.describe_sample(10_000) == (
+        "computed on a 1% sample (10,000 rows), within 1.4% of the rank with "
+        "95% confidence"
+    )
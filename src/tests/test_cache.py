@@ -0,0 +1,223 @@
+from unittest.mock import Mock
+
+import pytest
+import sqlalchemy
+
+from sql import cache
+from sql.cache import ResultCache
+from sql.connection import Connection
+
+
+@pytest.fixture
+def sqlite_file_conn(clean_conns, tmp_path):
+    conn = Connection(sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'my.db'}"))
+    conn.session.execute(sqlalchemy.text("CREATE TABLE numbers (x INT)"))
+    conn.session.execute(sqlalchemy.text("INSERT INTO numbers VALUES (1), (2)"))
+    conn.session.commit()
+    yield conn
+    Connection.close(conn)
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    result_cache = ResultCache(enabled=True)
+    monkeypatch.setattr(cache, "result_cache", result_cache)
+    monkeypatch.setattr("sql.connection.result_cache", result_cache)
+    return result_cache
+
+
+def _conn(url):
+    conn = Mock()
+    conn.url = sqlalchemy.engine.make_url(url)
+    return conn
+
+
+def test_cached_result():
+    result = cache.CachedResult(["x"], [(1,), (2,), (3,)])
+
+    assert result.keys() == ["x"]
+    assert result.description[0][0] == "x"
+    assert result.fetchone() == (1,)
+    assert result.fetchmany(1) == [(2,)]
+    assert result.fetchall() == [(3,)]
+    assert result.fetchone() is None
+
+
+def test_normalizes_query():
+    result_cache = ResultCache(enabled=True)
+    conn = _conn("sqlite:///my.db")
+
+    result_cache.put(conn, "SELECT 1;\n", ["1"], [(1,)])
+
+    assert result_cache.get(conn, "  SELECT 1").fetchall() == [(1,)]
+    assert result_cache.get(conn, "SELECT 1", autolimit=10) is None
+
+
+def test_does_not_cache_if_disabled():
+    result_cache = ResultCache()
+    conn = _conn("sqlite:///my.db")
+
+    assert result_cache.put(conn, "SELECT 1", ["1"], [(1,)]).fetchall() == [(1,)]
+    assert result_cache.get(conn, "SELECT 1") is None
+    assert len(result_cache) == 0
+
+
+def test_evicts_least_recently_used():
+    rows = [(i, "some text") for i in range(100)]
+    size = cache._estimate_size(rows)
+    result_cache = ResultCache(enabled=True, max_bytes=int(size * 2.5))
+    conn = _conn("sqlite:///my.db")
+
+    result_cache.put(conn, "SELECT 1", ["x", "y"], rows)
+    result_cache.put(conn, "SELECT 2", ["x", "y"], rows)
+    result_cache.get(conn, "SELECT 1")
+    result_cache.put(conn, "SELECT 3", ["x", "y"], rows)
+
+    assert result_cache.get(conn, "SELECT 1") is not None
+    assert result_cache.get(conn, "SELECT 2") is None
+    assert result_cache.get(conn, "SELECT 3") is not None
+    assert result_cache.size <= result_cache.max_bytes
+
+
+def test_ttl(monkeypatch):
+    now = 1000
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    result_cache = ResultCache(enabled=True, ttl=60)
+    conn = _conn("sqlite:///my.db")
+
+    result_cache.put(conn, "SELECT 1", ["1"], [(1,)])
+    now = 1059
+    assert result_cache.get(conn, "SELECT 1") is not None
+
+    now = 1061
+    assert result_cache.get(conn, "SELECT 1") is None
+    assert len(result_cache) == 0
+
+
+def test_invalidate_only_affects_the_same_database():
+    result_cache = ResultCache(enabled=True)
+    one, same_url, another = (
+        _conn("sqlite:///one.db"),
+        _conn("sqlite:///one.db"),
+        _conn("sqlite:///another.db"),
+    )
+    result_cache.put(one, "SELECT 1", ["1"], [(1,)])
+    result_cache.put(another, "SELECT 1", ["1"], [(1,)])
+
+    result_cache.invalidate(same_url)
+
+    assert result_cache.get(one, "SELECT 1") is None
+    assert result_cache.get(another, "SELECT 1") is not None
+
+
+def test_in_memory_databases_are_not_shared():
+    result_cache = ResultCache(enabled=True)
+    one, another = _conn("duckdb://"), _conn("duckdb://")
+
+    result_cache.put(one, "SELECT 1", ["1"], [(1,)])
+
+    assert result_cache.get(another, "SELECT 1") is None
+
+
+def test_connection_execute(sqlite_file_conn, enabled_cache):
+    def select():
+        return sqlite_file_conn.execute("SELECT * FROM numbers ORDER BY x").fetchall()
+
+    assert select() == [(1,), (2,)]
+
+    # bypass the cache to check that the results come from it
+    sqlite_file_conn.session.execute(sqlalchemy.text("INSERT INTO numbers VALUES (3)"))
+    assert select() == [(1,), (2,)]
+
+    sqlite_file_conn.execute("DELETE FROM numbers WHERE x = 1")
+    assert select() == [(2,), (3,)]
+
+
+def test_spills_to_disk(sqlite_file_conn, tmp_path):
+    directory = tmp_path / "cache"
+    first = ResultCache(enabled=True, directory=directory)
+    first.put(sqlite_file_conn, "SELECT * FROM numbers", ["x", "y"], [(1, "a")])
+
+    # e.g., after restarting the kernel
+    second = ResultCache(enabled=True, directory=directory)
+    result = second.get(sqlite_file_conn, "SELECT * FROM numbers")
+
+    assert result.keys() == ["x", "y"]
+    assert result.fetchall() == [(1, "a")]
+
+    second.invalidate(sqlite_file_conn)
+
+    assert not list(directory.iterdir())
+    assert (
+        ResultCache(enabled=True, directory=directory).get(
+            sqlite_file_conn, "SELECT * FROM numbers"
+        )
+        is None
+    )
+
+
+def test_values_that_arrow_cant_store_are_only_cached_in_memory(
+    sqlite_file_conn, tmp_path
+):
+    result_cache = ResultCache(enabled=True, directory=tmp_path)
+
+    result_cache.put(sqlite_file_conn, "SELECT 1", ["x"], [(1,), ("a",)])
+
+    assert result_cache.get(sqlite_file_conn, "SELECT 1").fetchall() == [(1,), ("a",)]
+    assert not list(tmp_path.glob("*.parquet"))
+
+
+def test_magic(ip, tmp_path):
+    ip.run_line_magic("config", "SqlMagic.result_cache = True")
+
+    try:
+        ip.run_cell(f"%sql sqlite:///{tmp_path / 'cache.db'} --alias cached")
+        ip.run_cell("%sql CREATE TABLE numbers (x INT); INSERT INTO numbers VALUES (1)")
+
+        first = ip.run_line_magic("sql", "SELECT * FROM numbers")
+
+        # bypass the cache to check that the results come from it
+        Connection.current.session.execute(
+            sqlalchemy.text("INSERT INTO numbers VALUES (2)")
+        )
+        Connection.current.session.commit()
+        second = ip.run_line_magic("sql", "SELECT * FROM numbers")
+
+        ip.run_line_magic("sql", "INSERT INTO numbers VALUES (3)")
+        third = ip.run_line_magic("sql", "SELECT * FROM numbers")
+    finally:
+        ip.run_line_magic("config", "SqlMagic.result_cache = False")
+        ip.run_cell("%sql --close cached")
+
+    assert list(first) == list(second) == [(1,)]
+    assert list(third) == [(1,), (2,), (3,)]
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        "%sql --append numbers --no-index",
+        "%sql WITH v AS (SELECT 3 AS x UNION ALL SELECT 4) INSERT INTO numbers "
+        "SELECT x FROM v",
+    ],
+    ids=["append", "with-insert"],
+)
+def test_magic_writes_discard_cached_results(ip, tmp_path, write):
+    ip.run_line_magic("config", "SqlMagic.result_cache = True")
+    ip.run_cell("import pandas as pd")
+    ip.run_cell("numbers = pd.DataFrame({'x': [3, 4]})")
+
+    try:
+        ip.run_cell(f"%sql sqlite:///{tmp_path / 'cache.db'} --alias cached")
+        ip.run_cell("%sql CREATE TABLE numbers (x INT); INSERT INTO numbers VALUES (1)")
+        ip.run_line_magic("sql", "INSERT INTO numbers VALUES (2)")
+
+        before = ip.run_line_magic("sql", "SELECT COUNT(*) FROM numbers")
+        ip.run_line_magic("sql", write.removeprefix("%sql "))
+        after = ip.run_line_magic("sql", "SELECT COUNT(*) FROM numbers")
+    finally:
+        ip.run_line_magic("config", "SqlMagic.result_cache = False")
+        ip.run_cell("%sql --close cached")
+
+    assert list(before) == [(2,)]
+    assert list(after) == [(4,)]
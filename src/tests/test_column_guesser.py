@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 
 from sql.magic import SqlMagic
+from sql.column_guesser import Column, is_quantity_column
 from IPython.core.interactiveshell import InteractiveShell
 
 ip = InteractiveShell()
@@ -121,3 +123,36 @@ class TestTwoStrThreeNum(Harness):
         results.guess_plot_columns()
         assert results.ys == [[1.02, 2.02, 3.02], [1.04, 2.04, 3.04]]
         assert results.x == [1.01, 2.01, 3.01]
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        [(1, None, 2.5), True],
+        [(None, None), True],
+        [(1, "a"), False],
+        [("a", None), False],
+    ],
+)
+def test_is_quantity_column(values, expected):
+    assert is_quantity_column(values) is expected
+
+
+def test_column_list_interface():
+    values = np.array([3, 1, 2])
+    column = Column(values, name="x")
+
+    assert column[1:] == [1, 2]
+    assert column + [4] == [3, 1, 2, 4]
+    assert [0] + column == [0, 3, 1, 2]
+    assert column.index(2) == 2
+    assert column.count(1) == 1
+
+    column.append(4)
+    column.sort()
+    column[0] = 0
+
+    assert column == [0, 2, 3, 4]
+    assert column.copy() == [0, 2, 3, 4]
+    # the original values aren't modified
+    assert values.tolist() == [3, 1, 2]
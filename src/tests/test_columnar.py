@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from sql.columnar import ColumnarRows
+
+
+@pytest.fixture
+def rows():
+    rows = ColumnarRows(3)
+    rows.extend([(1, 1.5, "a"), (2, None, "b")])
+    rows.extend([(None, 3.5, None), (4, 4.5, "d")])
+    return rows
+
+
+def test_columnar_rows_getitem(rows):
+    assert len(rows) == 4
+    assert rows[0] == (1, 1.5, "a")
+    assert rows[-1] == (4, 4.5, "d")
+    assert rows[1:3] == [(2, None, "b"), (None, 3.5, None)]
+    assert list(rows) == [
+        (1, 1.5, "a"),
+        (2, None, "b"),
+        (None, 3.5, None),
+        (4, 4.5, "d"),
+    ]
+
+
+def test_columnar_rows_index_error(rows):
+    with pytest.raises(IndexError):
+        rows[4]
+
+
+def test_columnar_rows_returns_python_objects(rows):
+    assert [type(value) for value in rows[0]] == [int, float, str]
+
+
+def test_columnar_rows_uses_typed_arrays(rows):
+    ints, floats, strings = (rows.column(idx) for idx in range(3))
+
+    assert ints.dtype == np.int64
+    assert ints.mask.tolist() == [False, False, True, False]
+    assert floats.dtype == np.float64
+    assert strings.dtype == object
+    assert rows.column_values(0) == [1, 2, None, 4]
+
+
+def test_columnar_rows_mixed_types():
+    rows = ColumnarRows(1)
+    rows.extend([(1,), (2,)])
+    rows.extend([("three",)])
+
+    assert rows.column(0).dtype == object
+    assert rows.column_values(0) == [1, 2, "three"]
+    assert list(rows) == [(1,), (2,), ("three",)]
+
+
+def test_columnar_rows_large_ints():
+    rows = ColumnarRows(1)
+    rows.extend([(2**70,), (None,)])
+
+    assert list(rows) == [(2**70,), (None,)]
+
+
+def test_columnar_rows_eq(rows):
+    assert rows == list(rows)
+    assert [(1, 1.5, "a")] != rows
+    assert ColumnarRows(2) == []
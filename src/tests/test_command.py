@@ -137,6 +137,12 @@ def test_args(ip, sql_magic):
         "connection_arguments": None,
         "file": None,
         "interact": None,
+        "export": None,
+        "stream": False,
+        "batch": False,
+        "register": None,
+        "paginate": None,
+        "paginate_key": None,
         "save": None,
         "with_": ["author_one"],
         "no_execute": False,
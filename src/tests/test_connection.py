@@ -266,3 +266,145 @@ def test_no_current_connection_and_get_info(monkeypatch, mock_database):
 
     monkeypatch.setattr(conn, "session", None)
     assert conn._get_curr_sqlalchemy_connection_info() is None
+
+
+def test_aliases_to_the_same_database_share_the_engine(cleanup, tmp_path):
+    url = f"sqlite:///{tmp_path / 'my.db'}"
+
+    first = Connection.from_connect_str(url, alias="first")
+    second = Connection.from_connect_str(url, alias="second")
+    other_options = Connection.from_connect_str(
+        url, alias="third", pool_options={"pool_recycle": 10}
+    )
+
+    assert first.engine is second.engine
+    assert first.session is not second.session
+    assert other_options.engine is not first.engine
+
+
+def test_in_memory_databases_dont_share_the_engine(cleanup):
+    first = Connection.from_connect_str("sqlite://", alias="first")
+    second = Connection.from_connect_str("sqlite://", alias="second")
+
+    assert first.engine is not second.engine
+
+
+def test_pool_options(cleanup, tmp_path):
+    conn = Connection.from_connect_str(
+        f"sqlite:///{tmp_path / 'my.db'}",
+        pool_options={"pool_size": 2, "pool_pre_ping": True, "pool_recycle": 10},
+    )
+
+    assert conn.engine.pool.size() == 2
+    assert conn.engine.pool._pre_ping
+    assert conn.engine.pool._recycle == 10
+
+
+def _temp_tables(conn):
+    return conn.session.execute(
+        sqlalchemy.text("SELECT name FROM sqlite_temp_master")
+    ).fetchall()
+
+
+@pytest.mark.parametrize(
+    "pool_options, stale",
+    [
+        [{}, False],
+        [{"pool_recycle": 3600}, False],
+        [{"pool_recycle": 0}, True],
+        [{"pool_pre_ping": True}, False],
+    ],
+)
+def test_check_connection(cleanup, tmp_path, pool_options, stale):
+    conn = Connection.from_connect_str(
+        f"sqlite:///{tmp_path / 'my.db'}", pool_options=pool_options
+    )
+    conn.session.execute(sqlalchemy.text("CREATE TEMP TABLE numbers (x INT)"))
+    conn.session.commit()
+    conn._materialized["snippet"] = ("numbers", 0)
+
+    conn._check_connection()
+
+    # temporary tables are lost when reconnecting
+    assert bool(_temp_tables(conn)) is not stale
+    assert bool(conn._materialized) is not stale
+
+
+def test_check_connection_reconnects_if_ping_fails(cleanup, tmp_path, monkeypatch):
+    conn = Connection.from_connect_str(
+        f"sqlite:///{tmp_path / 'my.db'}", pool_options={"pool_pre_ping": True}
+    )
+    session = conn.session
+    monkeypatch.setattr(
+        conn.engine.dialect, "do_ping", Mock(side_effect=Exception("gone"))
+    )
+
+    conn._check_connection()
+
+    assert conn.session is not session
+    assert conn.session.execute(sqlalchemy.text("SELECT 1")).fetchall() == [(1,)]
+
+
+def test_check_connection_keeps_transactions(cleanup, tmp_path):
+    conn = Connection.from_connect_str(
+        f"sqlite:///{tmp_path / 'my.db'}", pool_options={"pool_recycle": 0}
+    )
+    conn.session.execute(sqlalchemy.text("CREATE TEMP TABLE numbers (x INT)"))
+
+    conn._check_connection()
+
+    assert _temp_tables(conn) == [("numbers",)]
+
+
+def _disconnected_session(conn, isolation_level=None, in_transaction=False):
+    error = sqlalchemy.exc.DBAPIError(
+        "SELECT 1", {}, Exception("server closed the connection")
+    )
+    error.connection_invalidated = True
+    session = Mock()
+    session.execute.side_effect = error
+    session.get_execution_options.return_value = {"isolation_level": isolation_level}
+    session.in_transaction.return_value = in_transaction
+    conn.session = session
+    return session
+
+
+@pytest.mark.parametrize(
+    "statement, isolation_level",
+    [
+        ["SELECT 1", "AUTOCOMMIT"],
+        ["CREATE TABLE numbers (x INT)", None],
+    ],
+)
+def test_execute_reconnects(cleanup, tmp_path, statement, isolation_level):
+    conn = Connection.from_connect_str(f"sqlite:///{tmp_path / 'my.db'}")
+    session = _disconnected_session(conn, isolation_level)
+
+    with pytest.warns(UserWarning, match="connection to the database was lost"):
+        conn._execute(sqlalchemy.text(statement))
+
+    session.invalidate.assert_called_once_with()
+    assert conn.session is not session
+
+
+def test_execute_doesnt_run_statements_twice_in_autocommit_mode(cleanup, tmp_path):
+    conn = Connection.from_connect_str(f"sqlite:///{tmp_path / 'my.db'}")
+    session = _disconnected_session(conn, "AUTOCOMMIT")
+
+    with pytest.raises(sqlalchemy.exc.DBAPIError):
+        conn._execute(sqlalchemy.text("INSERT INTO numbers VALUES (1)"))
+
+    assert conn.session is session
+
+
+def test_execute_doesnt_retry_statements_in_a_transaction(cleanup, tmp_path):
+    conn = Connection.from_connect_str(f"sqlite:///{tmp_path / 'my.db'}")
+    session = _disconnected_session(conn, in_transaction=True)
+
+    with pytest.warns(UserWarning, match="transaction in progress was rolled back"):
+        with pytest.raises(sqlalchemy.exc.DBAPIError):
+            conn._execute(sqlalchemy.text("INSERT INTO numbers VALUES (1)"))
+
+    session.execute.assert_called_once()
+    session.invalidate.assert_called_once_with()
+    assert conn.session is not session
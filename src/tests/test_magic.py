@@ -8,6 +8,7 @@ import tempfile
 from textwrap import dedent
 from unittest.mock import patch
 
+import pandas as pd
 import polars as pl
 import pytest
 from sqlalchemy import create_engine
@@ -191,6 +192,125 @@ def test_persist_non_frame_raises(ip):
     )
 
 
+def test_persist_polars(ip):
+    ip.run_cell("import polars as pl")
+    ip.run_cell("polars_frame = pl.DataFrame({'x': [1, 2], 'y': ['a', 'b']})")
+    ip.run_cell("%sql --persist sqlite:// polars_frame")
+    persisted = runsql(ip, "SELECT * FROM polars_frame")
+    assert persisted == [(1, "a"), (2, "b")]
+
+
+def test_persist_duckdb(ip_empty, capsys, tmp_path):
+    ip_empty.run_line_magic("config", "SqlMagic.persist_batch_size = 2")
+    ip_empty.run_cell("import pandas as pd")
+    ip_empty.run_cell("numbers = pd.DataFrame({'x': range(5)})")
+    ip_empty.run_line_magic(
+        "sql", f"duckdb:///{tmp_path / 'persist.db'} --alias persist-duckdb"
+    )
+
+    ip_empty.run_cell("%sql --persist numbers --no-index")
+    ip_empty.run_cell("%sql --append numbers --no-index")
+    persisted = ip_empty.run_cell("%sql SELECT SUM(x) FROM numbers").result
+
+    ip_empty.run_line_magic("sql", "--close persist-duckdb")
+    ip_empty.run_line_magic("config", "SqlMagic.persist_batch_size = 100_000")
+
+    assert persisted == [(20,)]
+    assert "Persisted 5/5 rows" in capsys.readouterr().out
+
+
+@pytest.fixture
+def ip_duckdb(ip_empty, tmp_path):
+    ip_empty.run_line_magic(
+        "sql", f"duckdb:///{tmp_path / 'register.db'} --alias register-duckdb"
+    )
+    yield ip_empty
+    ip_empty.run_line_magic("sql", "--close register-duckdb")
+
+
+def test_register(ip_duckdb):
+    ip_duckdb.run_cell("import pandas as pd, polars as pl, pyarrow as pa")
+    ip_duckdb.run_cell("df = pd.DataFrame({'x': [1, 2, 3]})")
+    ip_duckdb.run_cell("pl_df = pl.DataFrame({'x': [2, 3], 'y': ['b', 'c']})")
+    ip_duckdb.run_cell("table = pa.table({'x': [3], 'z': [True]})")
+
+    result = ip_duckdb.run_cell(
+        """%%sql --register df,pl_df,table
+SELECT df.x, y, z FROM df
+JOIN pl_df ON df.x = pl_df.x
+JOIN "table" ON df.x = "table".x
+"""
+    ).result
+
+    assert list(result) == [(3, "c", True)]
+
+    # the views only exist while the cell runs
+    views = ip_duckdb.run_cell(
+        "%sql SELECT view_name FROM duckdb_views() "
+        "WHERE view_name IN ('df', 'pl_df', 'table')"
+    ).result
+    assert list(views) == []
+
+
+@pytest.mark.parametrize(
+    "config",
+    ["SqlMagic.lazy_fetch = True", "SqlMagic.stream_results = True"],
+)
+def test_register_fetches_rows_before_dropping_views(ip_duckdb, config):
+    ip_duckdb.run_cell("import pandas as pd")
+    ip_duckdb.run_cell("df = pd.DataFrame({'x': range(5000)})")
+    ip_duckdb.run_line_magic("config", config)
+
+    try:
+        result = ip_duckdb.run_cell("%sql --register df SELECT * FROM df").result
+    finally:
+        ip_duckdb.run_line_magic("config", config.replace("True", "False"))
+
+    assert len(result) == 5000
+
+
+def test_register_paginate(ip_duckdb):
+    ip_duckdb.run_cell("import pandas as pd")
+    ip_duckdb.run_cell("df = pd.DataFrame({'x': range(10)})")
+
+    viewer = ip_duckdb.run_line_magic(
+        "sql", "--register df --paginate 3 SELECT * FROM df ORDER BY x"
+    )
+    viewer.paginator.next()
+
+    assert viewer.paginator.rows == [(3,), (4,), (5,)]
+
+    # the views are only registered while fetching a page
+    views = ip_duckdb.run_cell(
+        "%sql SELECT view_name FROM duckdb_views() WHERE view_name = 'df'"
+    ).result
+    assert list(views) == []
+
+
+@pytest.mark.parametrize(
+    "cell, error_message",
+    [
+        ["%sql --register missing SELECT 1", "it's undefined"],
+        ["%sql --register number SELECT 1", "is not a Pandas DataFrame"],
+    ],
+)
+def test_register_errors(ip_duckdb, cell, error_message):
+    ip_duckdb.run_cell("number = 1")
+
+    result = ip_duckdb.run_cell(cell)
+
+    assert error_message in str(result.error_in_exec)
+
+
+def test_register_requires_duckdb(ip):
+    ip.run_cell("import pandas as pd")
+    ip.run_cell("df = pd.DataFrame({'x': [1]})")
+
+    result = ip.run_cell("%sql --register df SELECT * FROM df")
+
+    assert "only supported with DuckDB" in str(result.error_in_exec)
+
+
 def test_persist_bare(ip):
     result = ip.run_cell("%sql --persist sqlite://")
     assert result.error_in_exec
@@ -623,6 +743,97 @@ def test_autolimit(ip):
     assert len(result) == 1
 
 
+def test_lazy_fetch(ip):
+    ip.run_line_magic("config", "SqlMagic.autolimit = None")
+    ip.run_line_magic("config", "SqlMagic.displaylimit = 1")
+    ip.run_line_magic("config", "SqlMagic.lazy_fetch = True")
+
+    result = runsql(ip, "SELECT * FROM number_table;")
+    html = result._repr_html_()
+
+    # only the displayed rows (plus one to know if the output is truncated)
+    assert result.rows_fetched == 2
+    assert "Truncated to displaylimit of 1" in html
+
+    # running a new query discards the remaining rows instead of fetching them
+    runsql(ip, "SELECT * FROM test;")
+    assert result.done_fetching
+    assert result.truncated
+
+    with pytest.warns(UserWarning, match="only contain the 2 rows fetched"):
+        assert len(result) == 2
+    assert "Results truncated to the 2 rows fetched" in result._repr_html_()
+
+    ip.run_line_magic("config", "SqlMagic.lazy_fetch = False")
+    ip.run_line_magic("config", "SqlMagic.displaylimit = None")
+
+
+def test_stream(ip):
+    ip.run_line_magic("config", "SqlMagic.autolimit = None")
+
+    result = ip.run_line_magic("sql", "--stream SELECT * FROM number_table")
+
+    # --stream implies lazy fetching
+    assert result.rows_fetched == 0
+    assert result[0] == (4, -2)
+    assert len(result) == 10
+
+
+def test_batch(ip):
+    result = ip.run_cell(
+        """%%sql --batch
+CREATE TABLE batch_numbers (x INT);
+INSERT INTO batch_numbers VALUES (1), (2);
+SELECT * FROM batch_numbers;
+DROP TABLE batch_numbers;
+"""
+    ).result
+
+    assert len(result) == 4
+    assert result[1].rowcount == 2
+    assert result[2].result == [(1,), (2,)]
+    assert result[3].result is None
+    assert "INSERT INTO batch_numbers VALUES (1), (2);" in str(result)
+
+
+@pytest.mark.parametrize("setting", ["autopandas", "autopolars"])
+def test_batch_fetches_every_result_with_data_frame_output(ip_empty, setting):
+    ip_empty.run_line_magic("config", f"SqlMagic.{setting} = True")
+    ip_empty.run_line_magic("sql", "duckdb:// --alias batch-duckdb")
+
+    result = ip_empty.run_cell(
+        """%%sql --batch
+CREATE TABLE t AS SELECT * FROM range(3) AS r(x);
+SELECT * FROM t;
+SELECT 42 AS y;
+"""
+    ).result
+
+    ip_empty.run_line_magic("sql", "--close batch-duckdb")
+    ip_empty.run_line_magic("config", f"SqlMagic.{setting} = False")
+
+    assert result[1].result == [(0,), (1,), (2,)]
+    assert result[2].result == [(42,)]
+    assert result[0].result is None or (42,) not in list(result[0].result)
+
+
+@pytest.mark.parametrize("filename", ["numbers.csv", "numbers.parquet"])
+def test_export(ip, tmp_empty, filename):
+    ip.run_line_magic("config", "SqlMagic.autopandas = True")
+
+    result = ip.run_line_magic("sql", f"--export {filename} SELECT * FROM number_table")
+
+    ip.run_line_magic("config", "SqlMagic.autopandas = False")
+
+    df = (
+        pd.read_csv(filename)
+        if filename.endswith(".csv")
+        else pd.read_parquet(filename)
+    )
+    assert "Exported results" in repr(result)
+    assert df.shape == (10, 2)
+
+
 invalid_connection_string = """
 No active connection.
 
@@ -752,6 +963,69 @@ def test_save_with(ip):
     assert third_out.result == [("William", "Shakespeare", 1616)]
 
 
+def test_save_with_materialized_snippets(ip):
+    ip.run_line_magic("config", "SqlMagic.materialize_snippets = True")
+
+    try:
+        ip.run_cell("%sql --save everything SELECT * FROM number_table")
+        ip.run_cell(
+            "%sql --with everything --save positive_x "
+            "SELECT * FROM everything WHERE x > 0"
+        )
+        first = ip.run_cell("%sql --with positive_x SELECT * FROM positive_x").result
+        tables = ip.run_cell(
+            "%sql SELECT name FROM sqlite_temp_master ORDER BY name"
+        ).result
+
+        ip.run_cell("%sql INSERT INTO number_table VALUES (10, 10)")
+        second = ip.run_cell("%sql --with positive_x SELECT * FROM positive_x").result
+    finally:
+        ip.run_line_magic("config", "SqlMagic.materialize_snippets = False")
+
+    assert first == [(4, -2), (2, 4), (2, -5), (4, 3)]
+    assert second == [(4, -2), (2, 4), (2, -5), (4, 3), (10, 10)]
+    assert [name.rsplit("_", 1)[0] for (name,) in tables] == [
+        "jupysql_everything",
+        "jupysql_positive_x",
+    ]
+
+
+def test_pool_options(ip, tmp_path):
+    ip.run_line_magic("config", "SqlMagic.pool_pre_ping = True")
+
+    try:
+        ip.run_cell(
+            f"%sql sqlite:///{tmp_path / 'pool.db'} --alias pooled "
+            """-a '{"pool_recycle": 3600, "timeout": 10}'"""
+        )
+        conn = Connection.connections["pooled"]
+    finally:
+        ip.run_line_magic("config", "SqlMagic.pool_pre_ping = False")
+        ip.run_cell("%sql --close pooled")
+
+    assert conn.engine.pool._pre_ping
+    assert conn.engine.pool._recycle == 3600
+    assert conn.connect_args == {"timeout": 10}
+
+
+def test_save_to_snippets_store(ip, tmp_path):
+    ip.run_line_magic("config", f"SqlMagic.snippets_store = '{tmp_path}'")
+
+    try:
+        ip.run_cell(
+            "%sql --save stored_positive SELECT * FROM number_table WHERE x > 0"
+        )
+        stored = (tmp_path / "stored_positive.sql").read_text()
+    finally:
+        ip.run_line_magic("config", "SqlMagic.snippets_store = None")
+
+    result = ip.run_cell("%sql --with stored_positive SELECT * FROM stored_positive")
+    result = result.result
+
+    assert stored == "SELECT * FROM number_table WHERE x > 0"
+    assert result == [(4, -2), (2, 4), (2, -5), (4, 3)]
+
+
 @pytest.mark.parametrize(
     "prep_cell_1, prep_cell_2, prep_cell_3, with_cell_1,"
     " with_cell_2, with_cell_1_excepted, with_cell_2_excepted",
@@ -213,6 +213,29 @@ def test_table_schema_profile(ip, tmp_empty):
             assert cell == str(expected[criteria][0])
 
 
+def test_table_profile_approx(ip, tmp_empty):
+    ip.run_cell("%sql duckdb://")
+    ip.run_cell(
+        "%sql CREATE TABLE numbers AS SELECT range AS x, range % 7 AS y "
+        "FROM range(10000)"
+    )
+
+    out = ip.run_cell("%sqlcmd profile -t numbers --approx").result
+    stats = {row[0]: row[1:] for row in out._table.rows}
+
+    # top, count, min, max and mean are exact
+    assert stats["count"] == [10000, 10000]
+    assert stats["max"] == [9999, 6]
+    assert stats["unique"][0] == pytest.approx(10000, rel=0.02)
+    assert stats["unique"][1] == 7
+    assert float(stats["50%"][0]) == pytest.approx(5000, rel=0.01)
+    assert "unique: computed with HyperLogLog, typically within 2%" in out._table_txt
+    assert (
+        "25%, 50%, 75%: computed with a sketch, typically within 1% of the rank"
+        in out._table_html
+    )
+
+
 def test_table_profile_store(ip, tmp_empty):
     ip.run_cell(
         """
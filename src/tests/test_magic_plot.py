@@ -66,6 +66,7 @@ def test_validate_arguments(tmp_empty, ip, cell, error_type, error_message):
         "%sqlplot boxplot --table subset --column x --with subset",
         "%sqlplot boxplot -t subset -c x -w subset -o h",
         "%sqlplot boxplot --table nas.csv --column x",
+        "%sqlplot boxplot --table data.csv --column x --max-fliers 10",
         pytest.param(
             "%sqlplot boxplot --table spaces.csv --column 'some column'",
             marks=pytest.mark.xfail(
@@ -106,6 +107,7 @@ def test_validate_arguments(tmp_empty, ip, cell, error_type, error_message):
         "boxplot-with",
         "boxplot-shortcuts",
         "boxplot-nas",
+        "boxplot-max-fliers",
         "boxplot-column-name-with-spaces",
         "histogram-column-name-with-spaces",
         "boxplot-table-name-with-spaces",
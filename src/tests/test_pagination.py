@@ -0,0 +1,96 @@
+import pytest
+from IPython.core.error import UsageError
+
+from sql.connection import Connection
+from sql.pagination import Paginator
+
+
+@pytest.fixture
+def conn(ip):
+    return Connection.current
+
+
+def test_paginator_limit_offset(conn):
+    paginator = Paginator(conn, "SELECT x FROM number_table ORDER BY rowid;", 4)
+
+    assert paginator.next() == [(4,), (-5,), (2,), (0,)]
+    assert paginator.has_next
+    assert not paginator.has_previous
+
+    assert paginator.next() == [(-5,), (-2,), (-2,), (-4,)]
+    assert paginator.next() == [(2,), (4,)]
+    assert not paginator.has_next
+
+    assert paginator.previous() == [(-5,), (-2,), (-2,), (-4,)]
+    assert paginator.page == 1
+    assert paginator.keys == ["x"]
+
+
+def test_paginator_keyset(conn):
+    paginator = Paginator(conn, "SELECT rowid AS id, x FROM number_table", 3, key="id")
+
+    assert paginator.next() == [(1, 4), (2, -5), (3, 2)]
+    assert paginator.next() == [(4, 0), (5, -5), (6, -2)]
+    assert paginator.next() == [(7, -2), (8, -4), (9, 2)]
+    assert paginator.next() == [(10, 4)]
+    assert not paginator.has_next
+    assert paginator.fetch(1) == [(4, 0), (5, -5), (6, -2)]
+    assert paginator._page_query(1) == (
+        "SELECT * FROM (SELECT rowid AS id, x FROM number_table) AS jupysql_page "
+        "WHERE id >= 4 ORDER BY id LIMIT 4"
+    )
+
+
+def test_paginator_keyset_cannot_skip_pages(conn):
+    paginator = Paginator(conn, "SELECT rowid AS id FROM number_table", 3, key="id")
+
+    with pytest.raises(UsageError) as excinfo:
+        paginator.fetch(2)
+
+    assert "you can only move to the next page" in str(excinfo.value)
+
+
+def test_paginator_repr_html(conn):
+    paginator = Paginator(conn, "SELECT x FROM number_table ORDER BY rowid", 2)
+
+    html = paginator._repr_html_()
+
+    assert "<td>4</td>" in html
+    assert "<td>2</td>" not in html
+    assert "Page 1" in html
+
+
+@pytest.mark.parametrize("page_size", [0, -1])
+def test_paginator_invalid_page_size(conn, page_size):
+    with pytest.raises(UsageError):
+        Paginator(conn, "SELECT * FROM number_table", page_size)
+
+
+@pytest.mark.parametrize(
+    "query, n",
+    [
+        ["CREATE TABLE t (x INT); SELECT * FROM t", 2],
+        ["  ", 0],
+    ],
+)
+def test_paginator_requires_a_single_query(conn, query, n):
+    with pytest.raises(UsageError) as excinfo:
+        Paginator(conn, query, 2)
+
+    assert f"requires a single query, got {n} statements" in str(excinfo.value)
+
+
+def test_paginate_magic(ip):
+    viewer = ip.run_line_magic(
+        "sql", "--paginate 3 SELECT x FROM number_table ORDER BY rowid"
+    )
+    previous, next_ = viewer.children[1].children
+
+    assert viewer.paginator.rows == [(4,), (-5,), (2,)]
+    assert previous.disabled
+
+    next_.click()
+
+    assert viewer.paginator.rows == [(0,), (-5,), (-2,)]
+    assert "<td>0</td>" in viewer.children[0].value
+    assert not previous.disabled
@@ -3,12 +3,15 @@ from pathlib import Path
 
 
 import pytest
+import sqlparse
 
 from sql.parse import (
     connection_from_dsn_section,
     parse,
     without_sql_comment,
     magic_args,
+    split_statements,
+    is_query,
 )
 
 try:
@@ -190,6 +193,12 @@ def complete_with_defaults(mapping):
         "connection_arguments": None,
         "file": None,
         "interact": None,
+        "export": None,
+        "stream": False,
+        "batch": False,
+        "register": None,
+        "paginate": None,
+        "paginate_key": None,
         "save": None,
         "with_": None,
         "no_execute": False,
@@ -221,3 +230,72 @@ def test_magic_args(ip, line, expected):
     args = magic_args(sql_line, line)
 
     assert args.__dict__ == complete_with_defaults(expected)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "",
+        "  \n ",
+        "SELECT 1",
+        "SELECT 1;\nSELECT 2;",
+        "SELECT 1; SELECT 2",
+        "SELECT 1;;SELECT 2",
+        "  SELECT 1  ;  SELECT 2  ",
+        "SELECT 1; -- comment\nSELECT 2",
+        "SELECT 1;-- one\n-- two\nSELECT 2",
+        "SELECT 1;\n-- comment\nSELECT 2",
+        "SELECT 1; --+ hint\nSELECT 2",
+        "SELECT 1; /* comment */ SELECT 2",
+        "SELECT 1 /* ; */ ; SELECT 2",
+        "SELECT 1 -- ;\n; SELECT 2",
+        "-- only a comment",
+        "SELECT 'a;b'; SELECT 'it''s;'; SELECT 'it\\'s;'",
+        'SELECT "a;b"; SELECT `a;b`',
+        "SELECT $$a;b$$; SELECT $tag$ ; $tag$; SELECT 2",
+        "SELECT (1;2); SELECT 3",
+        "SELECT 'unterminated; SELECT 2",
+        "CREATE FUNCTION f() RETURNS INT AS BEGIN RETURN 1; END; SELECT f()",
+        "SELECT CASE WHEN x THEN 1 END FROM t; SELECT 2",
+        "SELECT (CASE WHEN x THEN 1 END; SELECT 2",
+        "SELECT (t.end; SELECT 2",
+        "SELECT (end(1); SELECT 2",
+        "SELECT (x END IF; SELECT 2",
+        "SELECT (x END  IF; SELECT 2",
+        "SELECT (x END LOOP; SELECT 2",
+        "SELECT (%(end)s; SELECT 2",
+        "SELECT 1;# comment\nSELECT 2",
+        "SELECT [a;b] FROM t; SELECT 2",
+        "SELECT 1 +-- comment; SELECT 2\n; SELECT 3",
+    ],
+)
+def test_split_statements(sql):
+    assert split_statements(sql) == sqlparse.split(sql)
+
+
+def test_split_statements_only_uses_sqlparse_for_ambiguous_input(monkeypatch):
+    monkeypatch.setattr(sqlparse, "split", None)
+
+    assert split_statements("INSERT INTO t VALUES (1, 'a;b');\nSELECT 1;") == [
+        "INSERT INTO t VALUES (1, 'a;b');",
+        "SELECT 1;",
+    ]
+    assert split_statements(
+        "SELECT CASE WHEN x > 0 THEN 'a;b' ELSE 'c' END AS y FROM t; SELECT 2"
+    ) == [
+        "SELECT CASE WHEN x > 0 THEN 'a;b' ELSE 'c' END AS y FROM t;",
+        "SELECT 2",
+    ]
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ["SELECT 1", True],
+        ["  with a as (select 1) select * from a", True],
+        ["INSERT INTO t VALUES (1)", False],
+        ["", False],
+    ],
+)
+def test_is_query(statement, expected):
+    assert is_query(statement) is expected
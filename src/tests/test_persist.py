@@ -0,0 +1,264 @@
+import datetime
+from unittest.mock import Mock
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pytest
+import sqlalchemy
+
+from sql import persist
+from sql.connection import Connection
+
+
+@pytest.fixture
+def duckdb_conn(clean_conns):
+    conn = Connection(sqlalchemy.create_engine("duckdb://"))
+    yield conn
+    Connection.close(conn)
+
+
+@pytest.fixture
+def sqlite_conn(clean_conns):
+    conn = Connection(sqlalchemy.create_engine("sqlite://"))
+    yield conn
+    Connection.close(conn)
+
+
+def test_get_loader():
+    assert isinstance(persist.get_loader("postgresql"), persist.PostgreSQLLoader)
+    assert isinstance(persist.get_loader("duckdb"), persist.DuckDBLoader)
+    assert isinstance(persist.get_loader("sqlite"), persist.SQLiteLoader)
+    assert type(persist.get_loader("oracle")) is persist.Loader
+
+
+@pytest.mark.parametrize("conn_fixture", ["sqlite_conn", "duckdb_conn"])
+def test_persist_in_batches(request, conn_fixture):
+    conn = request.getfixturevalue(conn_fixture)
+    frame = pd.DataFrame({"x": range(5), "label": ["a", "", None, "d'", 'e"']})
+    progress = Mock()
+
+    written = persist.persist(
+        frame, "numbers", conn, index=False, batch_size=2, progress=progress
+    )
+
+    rows = conn.session.execute(
+        sqlalchemy.text("SELECT * FROM numbers ORDER BY x")
+    ).fetchall()
+    assert written == 5
+    assert rows == [(0, "a"), (1, ""), (2, None), (3, "d'"), (4, 'e"')]
+    assert [call.args for call in progress.call_args_list] == [(2, 5), (4, 5), (5, 5)]
+
+
+@pytest.mark.parametrize("conn_fixture", ["sqlite_conn", "duckdb_conn"])
+def test_persist_if_exists(request, conn_fixture):
+    conn = request.getfixturevalue(conn_fixture)
+    frame = pd.DataFrame({"x": [1, 2]})
+
+    persist.persist(frame, "numbers", conn)
+    persist.persist(frame, "numbers", conn, if_exists="append")
+
+    with pytest.raises(ValueError, match="already exists"):
+        persist.persist(frame, "numbers", conn)
+
+    rows = conn.session.execute(
+        sqlalchemy.text("SELECT * FROM numbers ORDER BY x")
+    ).fetchall()
+    assert rows == [(0, 1), (0, 1), (1, 2), (1, 2)]
+
+
+def _reader(table):
+    return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+
+
+@pytest.mark.parametrize("conn_fixture", ["sqlite_conn", "duckdb_conn"])
+@pytest.mark.parametrize(
+    "make_data, expected_progress",
+    [
+        [lambda table: table, [(2, 3), (3, 3)]],
+        [lambda table: pl.from_arrow(table), [(2, 3), (3, 3)]],
+        [lambda table: table.to_batches()[0], [(2, 3), (3, 3)]],
+        [_reader, None],
+    ],
+    ids=["table", "polars", "record-batch", "reader"],
+)
+def test_persist_arrow(request, conn_fixture, make_data, expected_progress):
+    conn = request.getfixturevalue(conn_fixture)
+    table = pa.table({"x": [1, 2, 3], "label": ["a", None, "c"]})
+    progress = Mock()
+
+    written = persist.persist(
+        make_data(table), "numbers", conn, batch_size=2, progress=progress
+    )
+    persist.persist(_reader(table), "numbers", conn, if_exists="append")
+
+    rows = conn.session.execute(
+        sqlalchemy.text("SELECT * FROM numbers ORDER BY x")
+    ).fetchall()
+    assert written == 3
+    assert rows == [(1, "a"), (1, "a"), (2, None), (2, None), (3, "c"), (3, "c")]
+
+    if expected_progress:
+        assert [call.args for call in progress.call_args_list] == expected_progress
+    else:
+        assert progress.call_args_list[-1].args[1] is None
+
+    with pytest.raises(ValueError, match="already exists"):
+        persist.persist(table, "numbers", conn)
+
+
+@pytest.mark.parametrize("conn_fixture", ["sqlite_conn", "duckdb_conn"])
+def test_persist_polars_series(request, conn_fixture):
+    conn = request.getfixturevalue(conn_fixture)
+
+    written = persist.persist(pl.Series("x", [1, 2, 3]), "numbers", conn)
+
+    rows = conn.session.execute(
+        sqlalchemy.text("SELECT * FROM numbers ORDER BY x")
+    ).fetchall()
+    assert written == 3
+    assert rows == [(1,), (2,), (3,)]
+
+
+def test_persist_arrow_types(sqlite_conn):
+    table = pa.table(
+        {
+            "when": [datetime.datetime(2020, 1, 1, 10)],
+            "day": [datetime.date(2020, 1, 1)],
+            "flag": [True],
+            "ratio": [0.5],
+        }
+    )
+
+    persist.persist(table, "persisted", sqlite_conn)
+    table.to_pandas().to_sql("expected", sqlite_conn.session.engine, index=False)
+
+    def select(table):
+        return sqlite_conn.session.execute(
+            sqlalchemy.text(f"SELECT * FROM {table}")
+        ).fetchall()
+
+    assert select("persisted") == select("expected")
+
+
+def test_is_arrow():
+    table = pa.table({"x": [1]})
+
+    assert persist.is_arrow(table)
+    assert persist.is_arrow(pl.DataFrame({"x": [1]}))
+    assert persist.is_arrow(pl.Series("x", [1]))
+    assert persist.is_arrow(_reader(table))
+    assert not persist.is_arrow(pd.DataFrame({"x": [1]}))
+    assert not persist.is_arrow([1])
+
+
+def test_adbc_loader_ingests_arrow():
+    connection = Mock()
+    cursor = connection.engine.cursor.return_value
+    cursor.adbc_ingest.return_value = 3
+    table = pa.table({"x": [1, 2, 3]})
+
+    written = persist.ADBCLoader().load_arrow(
+        table, "numbers", connection, if_exists="append"
+    )
+
+    assert written == 3
+    cursor.adbc_ingest.assert_called_once_with("numbers", table, mode="append")
+    connection.engine.commit.assert_called_once_with()
+
+
+def test_duckdb_persist_series_and_empty_frame(duckdb_conn):
+    persist.persist(pd.Series([1.5, 2.5], name="y"), "series", duckdb_conn)
+    persist.persist(
+        pd.DataFrame({"z": pd.Series([], dtype="int64")}), "empty", duckdb_conn
+    )
+
+    assert duckdb_conn.session.execute(
+        sqlalchemy.text("SELECT * FROM series")
+    ).fetchall() == [(0, 1.5), (1, 2.5)]
+    assert duckdb_conn.session.execute(
+        sqlalchemy.text("SELECT COUNT(*) FROM empty")
+    ).fetchall() == [(0,)]
+
+
+def test_sqlite_loader_stores_values_like_to_sql(sqlite_conn):
+    frame = pd.DataFrame(
+        {
+            "when": [datetime.datetime(2020, 1, 1, 10), None],
+            "day": [datetime.date(2020, 1, 1), None],
+            "flag": [True, False],
+        }
+    )
+
+    persist.persist(frame, "persisted", sqlite_conn)
+    frame.to_sql("expected", sqlite_conn.session.engine)
+
+    def select(table):
+        return sqlite_conn.session.execute(
+            sqlalchemy.text(f"SELECT * FROM {table}")
+        ).fetchall()
+
+    assert select("persisted") == select("expected")
+
+
+def test_to_csv():
+    rows = [(1, "a", None, True), (2, "", 1.5, False), (3, 'say "hi"\\', None, None)]
+
+    assert persist._to_csv(rows) == '1,"a",,1\n2,"",1.5,0\n3,"say ""hi""\\",,\n'
+    assert persist._to_csv(rows, null="\\N", escape="\\") == (
+        '1,"a",\\N,1\n2,"",1.5,0\n3,"say \\"hi\\"\\\\",\\N,\\N\n'
+    )
+
+
+def test_postgresql_loader_uses_copy():
+    cursor = Mock(spec=["copy_expert", "close"])
+    conn = Mock()
+    conn.connection.cursor.return_value = cursor
+    conn.dialect = sqlalchemy.dialects.postgresql.dialect()
+    table = sqlalchemy.Table("my table", sqlalchemy.MetaData(), schema="s")
+
+    persist.PostgreSQLLoader().insert(table, conn, ["x", "y"], [(1, "a"), (2, None)])
+
+    statement, buffer = cursor.copy_expert.call_args.args
+    assert statement == 'COPY s."my table" (x, y) FROM STDIN WITH (FORMAT csv)'
+    assert buffer.getvalue() == '1,"a"\n2,\n'
+    cursor.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "loader",
+    [persist.PostgreSQLLoader(), persist.MySQLLoader()],
+    ids=["postgresql", "mysql"],
+)
+@pytest.mark.parametrize(
+    "value",
+    [b"\x00\xff", {"a": 1}, [1, 2], datetime.timedelta(days=1)],
+    ids=["bytes", "dict", "list", "timedelta"],
+)
+def test_loaders_insert_values_without_csv_representation(loader, value):
+    cursor = Mock()
+    conn = Mock()
+    conn.connection.cursor.return_value = cursor
+    table = sqlalchemy.Table(
+        "t",
+        sqlalchemy.MetaData(),
+        sqlalchemy.Column("x", sqlalchemy.Integer),
+        sqlalchemy.Column("y", sqlalchemy.LargeBinary),
+    )
+
+    loader.insert(table, conn, ["x", "y"], [(1, value), (2, None)])
+
+    cursor.copy_expert.assert_not_called()
+    cursor.execute.assert_not_called()
+    conn.execute.assert_called_once()
+    assert conn.execute.call_args.args[1] == [{"x": 1, "y": value}, {"x": 2, "y": None}]
+
+
+def test_persist_bytes_column(sqlite_conn):
+    df = pd.DataFrame({"x": [1, 2], "y": [b"\x00\xff", None]})
+
+    persist.persist(df, "blobs", sqlite_conn, index=False)
+
+    assert sqlite_conn.session.execute(
+        sqlalchemy.text("SELECT * FROM blobs")
+    ).fetchall() == [(1, b"\x00\xff"), (2, None)]
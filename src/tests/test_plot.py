@@ -1,13 +1,17 @@
 from typing import Iterator
 from collections.abc import Mapping
+from unittest.mock import Mock
 
 import numpy as np
 from matplotlib import cbook
+import matplotlib.pyplot as plt
 from sql import plot
+import sql.approx
 from sql.connection import Connection
 from pathlib import Path
 import pytest
 from sqlalchemy.exc import OperationalError
+from IPython.core.error import UsageError
 
 
 class DictOfFloats(Mapping):
@@ -135,3 +139,253 @@ FROM data.csv
     out = ip.run_cell(cell)
     assert isinstance(out.error_in_exec, error_type)
     assert str(error_message).lower() in str(out.error_in_exec).lower()
+
+
+@pytest.fixture
+def numbers(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    # 401 values so the percentiles computed by numpy (interpolating) and
+    # percentile_disc are the same
+    ip_empty.run_cell(
+        """%%sql
+CREATE TABLE numbers AS
+SELECT (range * 7919 % 1000) / 10 AS x,
+range % 13 AS y,
+CASE WHEN range < 390 THEN 1 ELSE range END AS constant
+FROM range(398)
+UNION ALL SELECT 500, 1, 1
+UNION ALL SELECT -300, 40, 1
+UNION ALL SELECT -301, -40, 1
+"""
+    )
+    yield ip_empty.run_cell("%sql SELECT * FROM numbers").result.DataFrame()
+
+
+def _sort_fliers(stats):
+    return {**stats, "fliers": np.sort(stats["fliers"])}
+
+
+@pytest.mark.parametrize(
+    "whis, autorange",
+    [
+        [1.5, False],
+        [0.5, False],
+        [(5, 95), False],
+        [1.5, True],
+    ],
+)
+def test_boxplot_stats_many(numbers, monkeypatch, whis, autorange):
+    conn = Connection.current
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+    columns = ["x", "y", "constant"]
+
+    result = plot._boxplot_stats_many(
+        conn, "numbers", columns, whis=whis, autorange=autorange
+    )
+
+    expected = cbook.boxplot_stats(
+        numbers[columns].to_numpy(dtype=float), whis=whis, autorange=autorange
+    )
+    assert execute.call_count == 2
+    assert [DictOfFloats(_sort_fliers(stats)) for stats in result] == [
+        DictOfFloats(_sort_fliers(stats)) for stats in expected
+    ]
+
+
+def test_boxplot_stats_single_column(numbers):
+    result = plot._boxplot_stats(Connection.current, "numbers", "x")
+    expected = cbook.boxplot_stats(numbers.x.to_numpy(dtype=float))[0]
+
+    assert DictOfFloats(_sort_fliers(result)) == DictOfFloats(_sort_fliers(expected))
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        ["duckdb", 'percentile_disc(0.25) WITHIN GROUP (ORDER BY "x")'],
+        ["postgresql", 'percentile_disc(0.25) WITHIN GROUP (ORDER BY "x")'],
+        ["clickhouse", 'quantileExactLow(0.25)("x")'],
+    ],
+)
+def test_percentile_disc(dialect, expected):
+    assert plot._percentile_disc(dialect, "driver", "x", 0.25) == expected
+
+
+def test_percentile_disc_unsupported():
+    with pytest.raises(UsageError, match="sqlite .pysqlite. doesn't support"):
+        plot._percentile_disc("sqlite", "pysqlite", "x", 0.25)
+
+
+def _exact_stats(numbers, column):
+    stats = cbook.boxplot_stats(numbers[column].to_numpy(dtype=float))[0]
+    return {key: stats[key] for key in ["q1", "med", "q3", "mean"]}
+
+
+def test_summary_stats_approx(numbers):
+    (result,) = plot._summary_stats_many(
+        Connection.current, "numbers", ["x"], approx=True
+    )
+    expected = _exact_stats(numbers, "x")
+
+    assert result["approx"] == sql.approx.QUANTILE_ERROR
+    assert result["mean"] == pytest.approx(expected["mean"])
+    assert result["N"] == 401
+    # the sketch is within 1% of the rank
+    for key in ["q1", "med", "q3"]:
+        rank = (numbers.x <= result[key]).mean()
+        assert rank == pytest.approx(
+            {"q1": 0.25, "med": 0.5, "q3": 0.75}[key], abs=0.01
+        )
+
+
+@pytest.mark.parametrize(
+    "percent, approx",
+    [
+        [100, "computed on a 100% sample (401 rows), within 6.8% of the rank"],
+        [0, "computed exactly, the sample is empty (the table is small)"],
+    ],
+)
+def test_summary_stats_approx_sample(numbers, monkeypatch, percent, approx):
+    monkeypatch.setitem(sql.approx._FUNCTIONS, "duckdb", {})
+    monkeypatch.setattr(sql.approx, "SAMPLE_PERCENT", percent)
+    monkeypatch.setattr(
+        sql.approx, "tablesample", lambda dialect: f"TABLESAMPLE {percent}%"
+    )
+
+    (result,) = plot._summary_stats_many(
+        Connection.current, "numbers", ["x"], approx=True
+    )
+
+    assert result["approx"].startswith(approx)
+    assert DictOfFloats(
+        {key: result[key] for key in ["q1", "med", "q3", "mean"]}
+    ) == DictOfFloats(_exact_stats(numbers, "x"))
+
+
+def test_boxplot_approx(numbers):
+    ax = plot.boxplot("numbers", ["x", "y"], approx=True)
+
+    assert ax.get_title() == (
+        "Boxplot from 'numbers'\n"
+        f"(approximate quartiles: {sql.approx.QUANTILE_ERROR})"
+    )
+
+
+def test_boxplot_approx_uses_duckdb_functions(ip_empty, numbers, monkeypatch):
+    conn = Connection.current
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+    # draw on a new figure
+    plt.close("all")
+
+    out = ip_empty.run_cell("%sqlplot boxplot --table numbers --column x --approx")
+
+    queries = [str(call.args[0]) for call in execute.call_args_list]
+    assert out.error_in_exec is None
+    assert any("approx_quantile" in query for query in queries)
+    assert not any("TABLESAMPLE" in query for query in queries)
+    assert out.result.get_title().endswith(f"quartiles: {sql.approx.QUANTILE_ERROR})")
+
+
+def test_histogram_many(numbers, monkeypatch):
+    conn = Connection.current
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+    columns = ["x", "y", "constant"]
+
+    result = plot._histogram_many("numbers", columns, bins=10, conn=conn)
+
+    assert execute.call_count == 2
+
+    for column, (bin_, height, bin_size) in zip(columns, result):
+        values = numbers[column].astype(float)
+        expected = (np.floor(values / bin_size) * bin_size).value_counts().sort_index()
+
+        assert bin_size == (values.max() - values.min()) / 10
+        assert np.allclose([float(b) for b in bin_], expected.index)
+        assert list(height) == expected.tolist()
+
+
+def test_histogram_many_categorical(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE t AS SELECT range AS x, "
+        "CASE WHEN range < 3 THEN 'a' ELSE 'b' END AS label FROM range(10)"
+    )
+
+    (bin_x, height_x, size_x), (bin_label, height_label, size_label) = (
+        plot._histogram_many("t", ["x", "label"], bins=3)
+    )
+
+    assert [float(b) for b in bin_x] == [0, 3, 6, 9]
+    assert list(height_x) == [3, 3, 3, 1]
+    assert size_x == 3
+    assert bin_label == ("a", "b")
+    assert height_label == (3, 7)
+    assert size_label is None
+
+
+@pytest.mark.parametrize("bins", [10, 37, 500])
+def test_histogram_stacked(numbers, bins):
+    bin_, height, bin_size = plot._histogram("numbers", "x", bins)
+
+    categories, heights = plot._histogram_stacked(
+        "numbers", "x", "constant", bin_, bin_size
+    )
+
+    # categories in the order they're returned by the database
+    assert sorted(categories) == sorted(numbers.constant.unique())
+    assert heights.shape == (len(categories), len(bin_))
+    # every row is counted in its bin
+    assert heights.sum(axis=0).tolist() == list(height)
+    assert heights.sum(axis=1).tolist() == [
+        (numbers.constant == category).sum() for category in categories
+    ]
+
+
+@pytest.fixture
+def skewed(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        """%%sql
+CREATE TABLE skewed AS
+SELECT CASE WHEN range % 10 = 0 THEN range * 100 ELSE range % 50 END AS x
+FROM range(10001)
+"""
+    )
+    values = ip_empty.run_cell("%sql SELECT * FROM skewed").result.DataFrame().x
+    yield cbook.boxplot_stats(values.to_numpy(dtype=float))[0]
+
+
+def _without(stats, *keys):
+    return {key: value for key, value in stats.items() if key not in keys}
+
+
+@pytest.mark.parametrize("max_fliers", [0, 1, 10, 11])
+def test_boxplot_stats_max_fliers(skewed, max_fliers):
+    expected_fliers = np.sort(skewed["fliers"])
+
+    with pytest.warns(UserWarning, match=f"'x' has {len(expected_fliers):,}"):
+        result = plot._boxplot_stats(
+            Connection.current, "skewed", "x", max_fliers=max_fliers
+        )
+
+    fliers = np.sort(result["fliers"])
+    extreme = (max_fliers + 1) // 2
+
+    assert result["nfliers"] == len(expected_fliers)
+    assert len(fliers) == max_fliers
+    assert set(fliers) <= set(expected_fliers)
+    # the most extreme ones are always included
+    assert set(expected_fliers[len(expected_fliers) - extreme :]) <= set(fliers)
+    assert DictOfFloats(_without(result, "fliers", "nfliers")) == DictOfFloats(
+        _without(skewed, "fliers")
+    )
+
+
+def test_boxplot_stats_max_fliers_larger_than_number_of_fliers(skewed):
+    result = plot._boxplot_stats(Connection.current, "skewed", "x", max_fliers=5000)
+
+    assert result["nfliers"] == len(skewed["fliers"])
+    assert np.array_equal(np.sort(result["fliers"]), np.sort(skewed["fliers"]))
@@ -2,6 +2,8 @@ from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
+from IPython.core.error import UsageError
+import numpy as np
 import pandas as pd
 import polars as pl
 import sqlalchemy
@@ -16,6 +18,11 @@ def config():
     config = Mock()
     config.displaylimit = 5
     config.autolimit = 100
+    config.lazy_fetch = False
+    config.fetch_batch_size = 1000
+    config.autopandas = False
+    config.autopolars = False
+    config.columnar_storage = False
     return config
 
 
@@ -40,6 +47,61 @@ def test_resultset_getitem(result_set):
     assert result_set[0:2] == [(0,), (1,)]
 
 
+@pytest.fixture
+def result_with_keys(config):
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    result = conn.execute(
+        sqlalchemy.text(
+            "select 'a' as key, 1 as x union all select 'b', 2 union all "
+            "select 'b', 3"
+        )
+    )
+    yield ResultSet(result, config)
+    conn.close()
+
+
+def test_resultset_getitem_by_key(result_with_keys):
+    assert result_with_keys["a"] == ("a", 1)
+
+    with pytest.raises(KeyError, match='2 results for "b"'):
+        result_with_keys["b"]
+
+    with pytest.raises(KeyError):
+        result_with_keys["c"]
+
+
+def test_resultset_getitem_by_key_reuses_index(result_with_keys):
+    result_with_keys["a"]
+    index = result_with_keys._get_index(0)
+
+    assert result_with_keys._get_index(0) is index
+
+
+def test_resultset_index_by(result_with_keys):
+    assert result_with_keys.index_by("x") == {
+        1: [("a", 1)],
+        2: [("b", 2)],
+        3: [("b", 3)],
+    }
+    assert result_with_keys.index_by("key")["b"] == [("b", 2), ("b", 3)]
+
+
+def test_resultset_index_by_unknown_column(result_with_keys):
+    with pytest.raises(UsageError) as excinfo:
+        result_with_keys.index_by("y")
+
+    assert "Column 'y' is not in the results" in str(excinfo.value)
+
+
+def test_resultset_index_is_rebuilt_if_results_change(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+    # index built when only two rows were fetched
+    rs._indexes[0] = ((id(rs._results), 2), {0: [(0,)], 1: [(1,)]})
+
+    assert rs.index_by("range")[9] == [(9,)]
+
+
 def test_resultset_dict(result_set):
     assert result_set.dict() == {"x": (0, 1, 2)}
 
@@ -78,6 +140,35 @@ def test_resultset_repr_html(result_set):
     )
 
 
+def test_resultset_repr_html_is_cached(result_set, monkeypatch):
+    html = result_set._repr_html_()
+    html_table = Mock()
+    monkeypatch.setattr(run_module, "_html_table", html_table)
+
+    assert result_set._repr_html_() == html
+    html_table.assert_not_called()
+
+    result_set.config.displaylimit = 2
+    result_set._repr_html_()
+    html_table.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        [1, "1"],
+        [None, "None"],
+        ["a\nb", "a<br>b"],
+        ["  x", "&nbsp;&nbsp;x"],
+        [" x", " x"],
+        ["<b>", "<b>"],
+        ["https://jupysql.ploomber.io", "<a href={0}>{0}</a>"],
+    ],
+)
+def test_html_cell(value, expected):
+    assert run_module._html_cell(value) == expected.format(value)
+
+
 def test_resultset_config_autolimit_dict(result, config):
     config.autolimit = 1
 
@@ -89,3 +180,342 @@ def test_resultset_with_non_sqlalchemy_results(config):
     conn = duckdb.connect()
     result = conn.execute("SELECT * FROM df")
     assert ResultSet(result, config) == [(0,), (1,), (2,)]
+
+
+@pytest.fixture
+def lazy_config(config):
+    config.autolimit = None
+    config.lazy_fetch = True
+    config.fetch_batch_size = 2
+    return config
+
+
+@pytest.fixture
+def large_result():
+    engine = sqlalchemy.create_engine("duckdb://")
+
+    conn = engine.connect()
+    result = conn.execute(sqlalchemy.text("select * from range(10)"))
+    yield result
+    conn.close()
+
+
+def test_lazy_resultset_does_not_fetch_on_init(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+
+    assert rs.rows_fetched == 0
+    assert not rs.done_fetching
+
+
+def test_lazy_resultset_repr_html_fetches_displaylimit(large_result, lazy_config):
+    lazy_config.displaylimit = 3
+    rs = ResultSet(large_result, lazy_config)
+
+    html = rs._repr_html_()
+
+    # displaylimit rows + 1 to know if the result is truncated
+    assert rs.rows_fetched == 4
+    assert not rs.done_fetching
+    assert "Truncated to displaylimit of 3" in html
+    assert "<td>2</td>" in html
+    assert "<td>3</td>" not in html
+
+
+def test_lazy_resultset_detach(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+    rs[1]
+
+    rs._detach()
+
+    assert rs.truncated
+    assert rs.done_fetching
+    assert large_result.closed
+
+    with pytest.warns(UserWarning, match="only contain the 2 rows fetched"):
+        assert list(rs) == [(0,), (1,)]
+
+
+def test_lazy_resultset_detach_before_fetching(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+
+    rs._detach()
+
+    with pytest.warns(UserWarning, match="only contain the 0 rows fetched"):
+        assert len(rs) == 0
+
+
+def test_lazy_resultset_getitem(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+
+    assert rs[1] == (1,)
+    assert rs.rows_fetched == 2
+    assert rs[2:4] == [(2,), (3,)]
+    assert rs.rows_fetched == 4
+    assert rs[-1] == (9,)
+    assert rs.done_fetching
+
+
+def test_lazy_resultset_iter_fetches_in_batches(large_result, lazy_config):
+    rs = ResultSet(large_result, lazy_config)
+    it = iter(rs)
+
+    assert next(it) == (0,)
+    assert rs.rows_fetched == 2
+    assert list(it) == [(i,) for i in range(1, 10)]
+    assert rs.done_fetching
+
+
+def test_lazy_resultset_respects_autolimit(large_result, lazy_config):
+    lazy_config.autolimit = 3
+    rs = ResultSet(large_result, lazy_config)
+
+    assert list(rs) == [(0,), (1,), (2,)]
+    assert len(rs) == 3
+
+
+def test_resultset_closes_cursor_once_autolimit_is_reached(large_result, lazy_config):
+    lazy_config.autolimit = 3
+    rs = ResultSet(large_result, lazy_config)
+
+    rs[1]
+    assert not large_result.closed
+
+    rs[2]
+    assert rs.done_fetching
+    assert large_result.closed
+
+
+def test_lazy_resultset_dataframe(large_result, lazy_config, monkeypatch):
+    monkeypatch.setattr(run_module.Connection, "current", Mock())
+    rs = ResultSet(large_result, lazy_config)
+
+    assert rs.DataFrame().equals(pd.DataFrame({"range": range(10)}))
+
+
+def test_lazy_resultset_dataframe_uses_arrow(large_result, lazy_config, monkeypatch):
+    monkeypatch.setattr(run_module.Connection, "current", Mock())
+    fetchmany = Mock(wraps=large_result.fetchmany)
+    monkeypatch.setattr(large_result, "fetchmany", fetchmany)
+    rs = ResultSet(large_result, lazy_config)
+
+    df = rs.DataFrame()
+
+    fetchmany.assert_not_called()
+    assert df.equals(pd.DataFrame({"range": range(10)}))
+    assert rs.done_fetching
+    # rows are still available after fetching them in arrow format
+    assert rs[3] == (3,)
+    assert len(rs) == 10
+
+
+def test_lazy_resultset_polars_dataframe_uses_arrow(large_result, lazy_config):
+    lazy_config.autolimit = 4
+    lazy_config.polars_dataframe_kwargs = {}
+    rs = ResultSet(large_result, lazy_config)
+
+    df = rs.PolarsDataFrame()
+
+    assert df.frame_equal(pl.DataFrame({"range": range(4)}))
+
+
+def test_dataframe_falls_back_to_rows_if_rows_were_fetched(
+    large_result, lazy_config, monkeypatch
+):
+    monkeypatch.setattr(run_module.Connection, "current", Mock())
+    rs = ResultSet(large_result, lazy_config)
+    rs[0]
+
+    assert rs.DataFrame().equals(pd.DataFrame({"range": range(10)}))
+
+
+@pytest.mark.parametrize(
+    "path, read",
+    [
+        ["out.csv", lambda path: pd.read_csv(path)],
+        ["out.parquet", lambda path: pd.read_parquet(path)],
+        ["out.arrow", lambda path: pd.read_feather(path)],
+    ],
+)
+def test_lazy_resultset_export(large_result, lazy_config, tmp_empty, path, read):
+    rs = ResultSet(large_result, lazy_config)
+
+    rs.export(path)
+
+    assert read(path)["range"].tolist() == list(range(10))
+    assert rs.done_fetching
+
+    # rows are streamed to the file, not stored in the result set
+    with pytest.raises(UsageError) as excinfo:
+        len(rs)
+
+    assert "streamed to a file with .export()" in str(excinfo.value)
+
+    with pytest.raises(UsageError):
+        rs.export(path)
+
+
+def test_export_fetched_resultset_can_be_used_afterwards(result_set, tmp_empty):
+    result_set.export("out.csv")
+
+    assert len(result_set) == 3
+    assert pd.read_csv("out.csv")["x"].tolist() == [0, 1, 2]
+
+
+def test_lazy_resultset_csv_keeps_rows(large_result, lazy_config, tmp_empty):
+    lazy_config.displaylimit = 3
+    rs = ResultSet(large_result, lazy_config)
+    rs._repr_html_()
+
+    assert rs.csv().splitlines()[1:] == [str(i) for i in range(10)]
+    assert len(rs) == 10
+    assert "10 rows, truncated to displaylimit of 3" in rs._repr_html_()
+
+    rs.csv("out.csv")
+    assert len(rs) == 10
+
+
+@pytest.mark.parametrize("path", ["out.csv", "out.parquet"])
+def test_lazy_resultset_export_respects_autolimit(
+    large_result, lazy_config, tmp_empty, path
+):
+    lazy_config.autolimit = 3
+    rs = ResultSet(large_result, lazy_config)
+
+    rs.export(path)
+
+    df = pd.read_csv(path) if path.endswith(".csv") else pd.read_parquet(path)
+    assert df["range"].tolist() == [0, 1, 2]
+
+
+def test_export_includes_fetched_rows(large_result, lazy_config, tmp_empty):
+    rs = ResultSet(large_result, lazy_config)
+    rs[2]
+
+    rs.export("out.parquet", batch_size=4)
+
+    assert pd.read_parquet("out.parquet")["range"].tolist() == list(range(10))
+    assert rs.rows_fetched == 3
+
+
+def test_export_converts_rows_to_arrow(result_set, tmp_empty):
+    result_set.export("out.parquet", batch_size=2)
+
+    assert pd.read_parquet("out.parquet").equals(pd.DataFrame({"x": range(3)}))
+
+
+@pytest.fixture
+def result_with_nulls(config):
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    result = conn.execute(
+        sqlalchemy.text(
+            "select 1 as x, NULL as y union all select 2, NULL union all "
+            "select 3, 'a' union all select 4, 'b' union all select 5, NULL"
+        )
+    )
+    yield ResultSet(result, config)
+    conn.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "path, read",
+    [
+        ["out.parquet", lambda path: pd.read_parquet(path)],
+        ["out.arrow", lambda path: pd.read_feather(path)],
+    ],
+)
+def test_export_widens_null_columns(result_with_nulls, tmp_empty, path, read):
+    result_with_nulls.export(path, batch_size=2)
+
+    df = read(path)
+
+    assert df["x"].tolist() == [1, 2, 3, 4, 5]
+    assert df["y"].tolist() == [None, None, "a", "b", None]
+
+
+def test_export_removes_partial_file_on_failure(config, tmp_empty):
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    result = conn.execute(
+        sqlalchemy.text("select 1 as x union all select 2 union all select 'a'")
+    )
+    rs = ResultSet(result, config)
+
+    with pytest.raises(Exception):
+        rs.export("out.parquet", batch_size=2)
+
+    assert not Path("out.parquet").exists()
+    conn.close()
+
+
+def test_export_unknown_format(result_set):
+    with pytest.raises(UsageError) as excinfo:
+        result_set.export("out.txt")
+
+    assert "Cannot infer the export format from 'out.txt'" in str(excinfo.value)
+
+
+@pytest.fixture
+def columnar_config(config):
+    config.columnar_storage = True
+    return config
+
+
+def test_columnar_resultset(result, columnar_config, monkeypatch):
+    monkeypatch.setattr(run_module.Connection, "current", Mock())
+    rs = ResultSet(result, columnar_config)
+
+    assert rs == [(0,), (1,), (2,)]
+    assert rs[1] == (1,)
+    assert rs.dict() == {"x": (0, 1, 2)}
+    assert list(rs.dicts()) == [{"x": 0}, {"x": 1}, {"x": 2}]
+    assert rs.DataFrame().equals(pd.DataFrame({"x": range(3)}))
+
+
+def test_columnar_lazy_resultset(large_result, lazy_config):
+    lazy_config.columnar_storage = True
+    rs = ResultSet(large_result, lazy_config)
+
+    assert rs[3] == (3,)
+    assert rs.rows_fetched == 4
+    assert len(rs) == 10
+    assert rs._results.column(0).sum() == 45
+
+
+def test_columnar_guess_plot_columns(columnar_config):
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    result = conn.execute(
+        sqlalchemy.text("select 'a' as x, 1 as y union all select 'b', null")
+    )
+    rs = ResultSet(result, columnar_config)
+
+    rs.guess_pie_columns(xlabel_sep="-")
+
+    assert rs.ys == [[1, None]]
+    assert rs.ys[0].is_quantity
+    assert rs.xlabels == ["a", "b"]
+    # the NumPy array is used as is
+    assert np.shares_memory(rs.ys[0].values, rs._results.column(1))
+    assert np.isnan(np.asarray(rs.ys[0])).tolist() == [False, True]
+    conn.close()
+
+
+def test_columnar_plot(columnar_config):
+    engine = sqlalchemy.create_engine("sqlite://")
+    conn = engine.connect()
+    result = conn.execute(
+        sqlalchemy.text("select 1 as x, 2.5 as y union all select 2, null")
+    )
+    rs = ResultSet(result, columnar_config)
+
+    rs.plot()
+
+    assert rs.x.name == "x"
+    assert rs.x == [1, 2]
+
+    rs.bar()
+
+    assert rs.xlabels == ["1", "2"]
+    conn.close()
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 import pandas
 import polars
 import pytest
+import sqlalchemy
 
 import warnings
 
@@ -11,6 +12,7 @@ from IPython.core.error import UsageError
 from sql.connection import Connection
 from sql.run import (
     run,
+    run_batch,
     handle_postgres_special,
     is_postgres_or_redshift,
     select_df_type,
@@ -31,9 +33,13 @@ def mock_config():
     class Config:
         autopandas = None
         autopolars = None
+        columnar_storage = False
         autocommit = True
         feedback = True
         polars_dataframe_kwargs = {}
+        lazy_fetch = False
+        fetch_batch_size = 1000
+        stream_results = False
 
     return Config
 
@@ -63,6 +69,8 @@ def config_polars(mock_config):
 @pytest.fixture
 def mock_resultset():
     class ResultSet:
+        done_fetching = True
+
         def __init__(self, *args, **kwargs):
             ...
 
@@ -169,3 +177,114 @@ def test__commit_is_called(
     run(mock_conns, "\\", mock_config)
 
     mock__commit.assert_called()
+
+
+def test_stream_results(monkeypatch, mock_conns, mock_config):
+    mock__commit = Mock()
+    mock_resultset = Mock()
+    monkeypatch.setattr("sql.run._commit", mock__commit)
+    monkeypatch.setattr("sql.run.interpret_rowcount", Mock())
+    monkeypatch.setattr("sql.run.ResultSet", mock_resultset)
+    mock_config.stream_results = True
+
+    run(mock_conns, "SELECT * FROM numbers", mock_config)
+
+    statement = mock_conns.session.execute.call_args[0][0]
+    assert statement.get_execution_options() == {
+        "stream_results": True,
+        "max_row_buffer": 1000,
+    }
+    assert mock_resultset.call_args[1]["lazy"] is True
+    mock__commit.assert_not_called()
+
+
+def test_stream_results_does_not_set_autocommit(monkeypatch, mock_conns, mock_config):
+    mock_set_autocommit = Mock()
+    monkeypatch.setattr("sql.run.set_autocommit", mock_set_autocommit)
+    monkeypatch.setattr("sql.run.ResultSet", Mock())
+
+    run(mock_conns, "SELECT * FROM numbers", mock_config, stream=True)
+
+    mock_set_autocommit.assert_not_called()
+
+
+def test_stream_results_falls_back_to_regular_cursor_in_autocommit_mode(
+    monkeypatch, mock_conns, mock_config
+):
+    monkeypatch.setattr("sql.run.ResultSet", Mock())
+    mock_conns.session.get_execution_options.return_value = {
+        "isolation_level": "AUTOCOMMIT"
+    }
+    error = sqlalchemy.exc.ProgrammingError(
+        "SELECT", {}, Exception("can't use a named cursor outside of transactions")
+    )
+    mock_conns.session.execute.side_effect = [error, Mock()]
+
+    with pytest.warns(UserWarning, match="Couldn't use a server-side cursor"):
+        run(mock_conns, "SELECT * FROM numbers", mock_config, stream=True)
+
+    statement = mock_conns.session.execute.call_args[0][0]
+    assert statement.get_execution_options()["stream_results"] is False
+
+
+def test_stream_results_ignores_statements_that_are_not_queries(
+    monkeypatch, mock_conns, mock_config
+):
+    mock__commit = Mock()
+    monkeypatch.setattr("sql.run._commit", mock__commit)
+    monkeypatch.setattr("sql.run.interpret_rowcount", Mock())
+    monkeypatch.setattr("sql.run.ResultSet", Mock())
+
+    run(mock_conns, "INSERT INTO numbers VALUES (1)", mock_config, stream=True)
+
+    statement = mock_conns.session.execute.call_args[0][0]
+    assert statement.get_execution_options() == {}
+    mock__commit.assert_called()
+
+
+def test_transactions_are_checked_per_statement(monkeypatch, mock_conns, mock_config):
+    monkeypatch.setattr("sql.run._commit", Mock())
+    monkeypatch.setattr("sql.run.interpret_rowcount", Mock())
+    monkeypatch.setattr("sql.run.ResultSet", Mock())
+
+    with pytest.raises(UsageError, match="does not support transactions"):
+        run(mock_conns, "SELECT 1; BEGIN; SELECT 2", mock_config)
+
+
+def test_run_sets_autocommit_once(monkeypatch, mock_conns, mock_config):
+    mock_set_autocommit = Mock(return_value=True)
+    monkeypatch.setattr("sql.run.set_autocommit", mock_set_autocommit)
+    monkeypatch.setattr("sql.run._commit", Mock())
+    monkeypatch.setattr("sql.run.interpret_rowcount", Mock())
+    monkeypatch.setattr("sql.run.ResultSet", Mock())
+
+    run(mock_conns, "INSERT INTO a VALUES (1); INSERT INTO a VALUES (2)", mock_config)
+
+    mock_set_autocommit.assert_called_once()
+    assert mock_conns.session.execute.call_count == 2
+
+
+def test_run_batch(monkeypatch, mock_conns, mock_config):
+    mock__commit = Mock()
+    monkeypatch.setattr("sql.run._commit", mock__commit)
+    mock_conns.session.execute.return_value = Mock(rowcount=1, description=None)
+
+    results = run_batch(
+        mock_conns, "INSERT INTO a VALUES (1); INSERT INTO a VALUES (2);", mock_config
+    )
+
+    assert [result.statement for result in results] == [
+        "INSERT INTO a VALUES (1);",
+        "INSERT INTO a VALUES (2);",
+    ]
+    assert [result.rowcount for result in results] == [1, 1]
+    assert all(result.result is None for result in results)
+    assert results.elapsed >= 0
+    mock__commit.assert_called_once()
+
+
+def test_run_batch_checks_statements_before_running(mock_conns, mock_config):
+    with pytest.raises(UsageError, match="does not support transactions"):
+        run_batch(mock_conns, "SELECT 1; BEGIN", mock_config)
+
+    mock_conns.session.execute.assert_not_called()
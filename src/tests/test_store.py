@@ -1,8 +1,11 @@
+from unittest.mock import Mock
+
 import pytest
+import sql.store
 from sql.connection import Connection
 from IPython.core.error import UsageError
-from sql.store import SQLStore
-from sqlalchemy import create_engine
+from sql.store import SQLStore, SQLQuery
+from sqlalchemy import create_engine, text
 
 
 @pytest.fixture(autouse=True)
@@ -281,3 +284,207 @@ def test_branch(is_dialect_support_backtick, monkeypatch):
             identifier
         )
     )
+
+
+@pytest.fixture
+def sqlite_conn(clean_conns):
+    conn = Connection(engine=create_engine("sqlite://"))
+    conn.execute("CREATE TABLE numbers (x INT)")
+    conn.execute("INSERT INTO numbers VALUES (1), (2), (3)")
+    yield conn
+    Connection.close(conn)
+
+
+def _temp_tables(conn):
+    return sorted(
+        row[0] for row in conn.execute("SELECT name FROM sqlite_temp_master").fetchall()
+    )
+
+
+def test_materialize(sqlite_conn):
+    store = SQLStore()
+    store.materialize_snippets = True
+    store.store("first", "SELECT * FROM numbers WHERE x > 1")
+    store.store("second", "SELECT * FROM first WHERE x > 2", with_=["first"])
+
+    def select():
+        query = store.render("SELECT * FROM second", with_=["second"], conn=sqlite_conn)
+        return sqlite_conn.session.execute(text(str(query))).fetchall()
+
+    assert select() == [(3,)]
+    tables = _temp_tables(sqlite_conn)
+    assert [table.rsplit("_", 1)[0] for table in tables] == [
+        "jupysql_first",
+        "jupysql_second",
+    ]
+
+    # tables are reused
+    assert select() == [(3,)]
+    assert _temp_tables(sqlite_conn) == tables
+
+    # changing an upstream snippet rebuilds the downstream ones
+    store.store("first", "SELECT x + 1 AS x FROM numbers")
+    assert select() == [(3,), (4,)]
+    new_tables = _temp_tables(sqlite_conn)
+    assert len(new_tables) == 2
+    assert not set(tables) & set(new_tables)
+
+    # modifying the data rebuilds them
+    sqlite_conn.execute("INSERT INTO numbers VALUES (4)")
+    assert select() == [(3,), (4,), (5,)]
+    assert _temp_tables(sqlite_conn) == new_tables
+
+
+def test_materialize_falls_back_to_ctes(sqlite_conn):
+    store = SQLStore()
+    store.materialize_snippets = True
+    store.store("first", "SELECT * FROM missing")
+
+    with pytest.warns(UserWarning, match="using CTEs instead"):
+        query = store.render("SELECT * FROM first", with_=["first"], conn=sqlite_conn)
+
+    assert str(query) == "WITH `first` AS (SELECT * FROM missing)SELECT * FROM first"
+
+
+def test_store_detects_cycles():
+    store = SQLStore()
+    store.store("first", "SELECT * FROM a")
+    store.store("second", "SELECT * FROM first", with_=["first"])
+    store.store("third", "SELECT * FROM second", with_=["second"])
+
+    with pytest.raises(UsageError, match="'third' depends on 'first'"):
+        store.store("first", "SELECT * FROM third", with_=["third"])
+
+    # the snippet isn't modified
+    assert store["first"]._with_ == []
+
+
+def test_render_detects_cycles(monkeypatch):
+    monkeypatch.setattr(
+        Connection, "current", Mock(is_use_backtick_template=lambda: False)
+    )
+    store = SQLStore()
+    store["first"] = SQLQuery(store, "SELECT * FROM second", ["second"])
+    store["second"] = SQLQuery(store, "SELECT * FROM first", ["first"])
+
+    with pytest.raises(UsageError, match="second -> first -> second"):
+        str(store.render("SELECT * FROM second", with_=["second"]))
+
+
+def test_render_is_memoized(monkeypatch):
+    monkeypatch.setattr(
+        Connection, "current", Mock(is_use_backtick_template=lambda: False)
+    )
+    render = Mock(wraps=sql.store._WITH_TEMPLATE.render)
+    monkeypatch.setattr(sql.store._WITH_TEMPLATE, "render", render)
+    store = SQLStore()
+    store.store("first", "SELECT * FROM a")
+    store.store("second", "SELECT * FROM first", with_=["first"])
+
+    for _ in range(3):
+        query = str(store.render("SELECT * FROM second", with_=["second"]))
+
+    assert render.call_count == 1
+    assert query == (
+        "WITH first AS (SELECT * FROM a), second AS (SELECT * FROM first)"
+        "SELECT * FROM second"
+    )
+
+    # storing a snippet discards the cache
+    store.store("first", "SELECT * FROM b")
+    query = str(store.render("SELECT * FROM second", with_=["second"]))
+
+    assert render.call_count == 2
+    assert query.startswith("WITH first AS (SELECT * FROM b)")
+
+
+def test_render_long_chain(monkeypatch):
+    monkeypatch.setattr(
+        Connection, "current", Mock(is_use_backtick_template=lambda: False)
+    )
+    store = SQLStore()
+    store.store("s0", "SELECT 1 AS x")
+
+    for i in range(1, 1500):
+        store.store(f"s{i}", f"SELECT * FROM s{i - 1}", with_=[f"s{i - 1}"])
+
+    query = str(store.render("SELECT * FROM s1499", with_=["s1499"]))
+
+    assert query.startswith("WITH s0 AS (SELECT 1 AS x), s1 AS (SELECT * FROM s0)")
+    assert store.get_dependencies("s1499") == tuple(f"s{i}" for i in range(1499))
+
+
+@pytest.fixture(params=["snippets", "snippets.db"])
+def backend_path(request, tmp_path):
+    return tmp_path / request.param
+
+
+def test_backend_roundtrip(backend_path):
+    store = SQLStore(backend=backend_path)
+    store.store("first", "SELECT * FROM a")
+    store.store("second", "SELECT * FROM first", with_=["first"])
+
+    # e.g., a different kernel
+    another = SQLStore(backend=backend_path)
+
+    assert set(another) == {"first", "second"}
+    assert another["first"]._query == "SELECT * FROM a"
+    assert another["second"]._with_ == ["first"]
+    assert another.get_dependencies("second") == ("first",)
+
+
+def test_backend_loads_snippets_lazily(backend_path):
+    SQLStore(backend=backend_path).store("first", "SELECT * FROM a")
+
+    store = SQLStore(backend=backend_path)
+    load = Mock(wraps=store.backend.load)
+    store.backend.load = load
+
+    assert list(store) == ["first"]
+    load.assert_not_called()
+
+    assert store["first"]._query == "SELECT * FROM a"
+    assert store["first"]._query == "SELECT * FROM a"
+    load.assert_called_once_with("first")
+
+
+def test_backend_detects_changes_from_other_sessions(backend_path):
+    store = SQLStore(backend=backend_path)
+    another = SQLStore(backend=backend_path)
+
+    store.store("first", "SELECT * FROM a")
+    assert another["first"]._query == "SELECT * FROM a"
+
+    store.store("first", "SELECT * FROM b")
+    store.store("second", "SELECT * FROM first", with_=["first"])
+    assert another["first"]._query == "SELECT * FROM b"
+    assert "second" in another
+
+    del store["second"]
+    assert list(another) == ["first"]
+
+
+def test_set_backend_keeps_snippets(tmp_path):
+    store = SQLStore()
+    store.store("first", "SELECT * FROM a")
+    store.set_backend(tmp_path)
+
+    assert (tmp_path / "first.sql").read_text() == "SELECT * FROM a"
+
+    store.set_backend(None)
+    store.store("second", "SELECT * FROM b")
+
+    assert store["first"]._query == "SELECT * FROM a"
+    assert not (tmp_path / "second.sql").exists()
+
+
+def test_directory_backend_reads_dependencies(tmp_path):
+    (tmp_path / "first.sql").write_text("SELECT * FROM a")
+    (tmp_path / "second.sql").write_text("-- with: first\nSELECT * FROM first")
+    (tmp_path / "notes.txt").write_text("not a snippet")
+
+    store = SQLStore(backend=tmp_path)
+
+    assert set(store) == {"first", "second"}
+    assert store["second"]._query == "SELECT * FROM first"
+    assert store.get_dependencies("second") == ("first",)